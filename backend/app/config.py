@@ -16,17 +16,84 @@ class Settings(BaseSettings):
     port: int = 8000
     debug: bool = True
     
+    # Profiling (debug only): 请求头 X-Profile 携带该密钥时剖析单个请求
+    profile_secret: str = ""
+    profile_dir: str = "./profiles"
+    
     # API Keys
     gemini_api_key: str = ""
+    gemini_base_url: str = "https://generativelanguage.googleapis.com/v1beta"
+
+    # AI Search
+    local_parse_threshold: float = 0.85  # 本地解析置信度达到该值时跳过Gemini
+    ai_query_index_size: int = 2048  # 近似查询索引容量
+    ai_query_similarity_threshold: float = 0.5  # 近似查询复用的 Jaccard 阈值
+    ai_explanation_cache_size: int = 4096  # 评分解释缓存容量
+    ai_explain_concurrency: int = 4  # 批量生成解释时的并发上限
+    ai_precompute_top_n: int = 5  # 预计算时每条航线取评分最高的航班数
+    ai_precompute_days: int = 3  # 预计算只覆盖今天起这些天内出发的航班
+    admin_secret: str = ""  # 管理接口（如预计算）的 X-Admin-Token，为空时这些接口关闭
+    ai_explain_batch_window_ms: int = 0  # 解释请求微批处理窗口，0 表示关闭
+    ai_explain_batch_max_size: int = 8  # 单个批次最多合并的请求数
+    
+    # Flight search
+    mock_inventory_days: int = 30  # Mock库存覆盖的天数（从今天起）
+    flex_search_max_days: int = 7  # 灵活日期搜索允许的最大前后天数
+    min_connection_minutes: int = 45  # 中转最短衔接时间
+    max_connection_minutes: int = 360  # 中转最长衔接时间
+    flight_batch_max_size: int = 50  # 批量获取航班的最大ID数
+    flight_compare_max_size: int = 10  # 对比的最大航班数
+    search_default_fields: str = ""  # 搜索默认字段集（如 list），为空时返回完整模型
+    search_cache_size: int = 512  # 搜索响应缓存条目数（LRU）
+    search_snapshot_size: int = 2048  # 保留的搜索结果快照数（since=searchId 增量搜索，LRU）
+    live_queue_size: int = 64  # 实时推送每个连接的发送队列长度，满了即断开（慢消费者）
+    live_max_topics: int = 200  # 每个连接最多订阅的主题数
     
     # Amadeus Flight API
     amadeus_api_key: str = ""
     amadeus_api_secret: str = ""
     amadeus_base_url: str = "https://test.api.amadeus.com"
     
+    # Fare ingestion：后台定时调用 Amadeus 采集关注航线的票价快照（价格历史的数据来源）
+    fare_ingest_enabled: bool = False
+    fare_ingest_routes: str = "北京-上海,上海-北京,北京-广州,上海-广州,上海-成都,广州-北京"
+    fare_ingest_cabins: str = "economy"
+    fare_ingest_days_ahead: int = 14  # 采集今天起多少天的出发日期
+    fare_ingest_interval_seconds: int = 900
+    fare_ingest_concurrency: int = 4  # 同时进行的航线/日期查询数
+    fare_ingest_batch_size: int = 500  # 每次 executemany 写入的行数
+    
+    # Resilience (Gemini / Amadeus)
+    request_latency_budget_ms: int = 10000  # 单个API请求内上游调用的总预算
+    gemini_timeout_ms: int = 8000
+    amadeus_timeout_ms: int = 8000
+    gemini_hedge_enabled: bool = False
+    amadeus_hedge_enabled: bool = False
+    hedge_min_delay_ms: int = 50
+    breaker_failure_rate: float = 0.5
+    breaker_slow_call_ms: int = 5000
+    breaker_slow_call_rate: float = 0.8
+    breaker_window: int = 20
+    breaker_min_calls: int = 5
+    breaker_open_seconds: float = 30.0
+    
     # Cache
     redis_url: Optional[str] = None
     cache_ttl: int = 300  # 5 minutes
+    flight_detail_max_age: int = 30  # 航班详情 Cache-Control max-age（秒），过期后凭 ETag 条件请求
+    price_history_max_age: int = 60  # 价格历史 Cache-Control max-age（秒）
+    
+    # Response compression (br / zstd 需要安装 brotli / zstandard)
+    compression_enabled: bool = True
+    compression_min_size: int = 1024  # 小于该字节数的响应不压缩
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    
+    # Rate limiting: "前缀=每秒速率:桶容量"，取最长前缀匹配
+    rate_limit_enabled: bool = True
+    rate_limit_rules: str = "/v1/ai=0.5:10,/v1/flights/search=5:20,/v1/auth=1:10,/v1=20:60"
+    trust_proxy_headers: bool = False  # 是否信任 X-Forwarded-For
     
     # CORS
     cors_origins: str = "*"
@@ -3,7 +3,7 @@ AirEase Backend - Database Configuration
 SQLAlchemy + SQLite setup
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime
+from sqlalchemy import create_engine, text, Column, Integer, String, Boolean, DateTime, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -41,6 +41,25 @@ class UserDB(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class FareSnapshotDB(Base):
+    """Fare snapshot time series - one row per ingested offer per ingestion run"""
+    __tablename__ = "fare_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    fare_key = Column(String, nullable=False)  # 出发机场|到达机场|起飞日期|舱位，见 fare_history.fare_key
+    origin = Column(String, nullable=False)
+    destination = Column(String, nullable=False)
+    departure_date = Column(String, nullable=False)
+    price = Column(Float, nullable=False)
+    currency = Column(String, nullable=False, default="CNY")
+    seats_remaining = Column(Integer)
+    ts = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_fare_snapshots_fare_key_ts", "fare_key", "ts"),
+    )
+
+
 # ============================================================
 # Database Utilities
 # ============================================================
@@ -48,6 +67,9 @@ class UserDB(Base):
 def init_db():
     """Initialize database - create all tables"""
     Base.metadata.create_all(bind=engine)
+    # WAL：后台票价采集写入时，请求中的读取不被阻塞（设置持久保存在数据库文件中）
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA journal_mode=WAL"))
 
 
 def get_db():
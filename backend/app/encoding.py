@@ -0,0 +1,113 @@
+"""
+AirEase Backend - Response Encoding
+按 Accept 头协商响应格式
+
+- application/json（默认）
+- application/msgpack：二进制，编码/解码更快、体积更小（需要安装 msgpack）
+- application/vnd.airease.columnar+json / +msgpack：列式（struct-of-arrays），
+  每个字段路径只出现一次，适合大结果集，仅搜索接口提供
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+COLUMNAR_JSON = "application/vnd.airease.columnar+json"
+COLUMNAR_MSGPACK = "application/vnd.airease.columnar+msgpack"
+
+# 同义的媒体类型
+ALIASES = {"application/x-msgpack": MSGPACK}
+
+VARY = {"Vary": "Accept"}
+
+
+def media_types(columnar: bool = False) -> List[str]:
+    """可提供的媒体类型（按优先级，未安装 msgpack 时不含二进制格式）"""
+    types = [JSON, COLUMNAR_JSON] if columnar else [JSON]
+    if msgpack is not None:
+        types += [MSGPACK, COLUMNAR_MSGPACK] if columnar else [MSGPACK]
+    return types
+
+
+def negotiate(accept: Optional[str], columnar: bool = False) -> str:
+    """
+    按 Accept（含 q 值）选择媒体类型
+
+    没有可提供的类型时退回 JSON，不返回 406
+    """
+    if not accept:
+        return JSON
+    offers = media_types(columnar)
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        candidates.append((-quality, position, ALIASES.get(media_type.lower(), media_type.lower())))
+
+    for negative_quality, _, media_type in sorted(candidates):
+        if negative_quality >= 0:
+            break
+        if media_type in offers:
+            return media_type
+        if media_type in ("*/*", "application/*"):
+            return JSON
+    return JSON
+
+
+def is_columnar(media_type: str) -> bool:
+    return media_type in (COLUMNAR_JSON, COLUMNAR_MSGPACK)
+
+
+def to_columns(rows: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    行（嵌套 dict）转为列：点路径 -> 与行顺序一致的值列表
+
+    嵌套对象逐层展开，列表按值保存；某行缺少的路径填 None
+    """
+    flat = [_flatten(row, "", {}) for row in rows]
+    if not flat:
+        return {}
+    keys = list(flat[0])
+    if all(list(f) == keys for f in flat):
+        # 各行字段一致（常见情况）：直接转置
+        return dict(zip(keys, map(list, zip(*(f.values() for f in flat)))))
+    keys = list(dict.fromkeys(k for f in flat for k in f))
+    return {key: [f.get(key) for f in flat] for key in keys}
+
+
+def _flatten(row: Dict[str, Any], prefix: str, out: Dict[str, Any]) -> Dict[str, Any]:
+    for key, value in row.items():
+        if isinstance(value, dict):
+            _flatten(value, f"{prefix}{key}.", out)
+        else:
+            out[f"{prefix}{key}"] = value
+    return out
+
+
+class MsgpackResponse(Response):
+    """MessagePack 响应"""
+    media_type = MSGPACK
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def encode(media_type: str, content: Any) -> Response:
+    """按协商结果编码响应（content 为 JSON 原生类型）"""
+    if media_type in (MSGPACK, COLUMNAR_MSGPACK):
+        return MsgpackResponse(content, media_type=media_type, headers=VARY)
+    return JSONResponse(content, media_type=media_type, headers=VARY)
@@ -6,14 +6,23 @@ FastAPI 应用入口
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import time
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
 
 from app.config import settings
 from app.routes.flights import router as flights_router
 from app.routes.ai import router as ai_router
 from app.routes.auth import router as auth_router
+from app.routes.live import router as live_router
 from app.database import init_db
+from app.middleware import (
+    RateLimitMiddleware, MetricsMiddleware, ProcessTimeMiddleware, LatencyBudgetMiddleware,
+    ProfilingMiddleware, CompressionMiddleware
+)
+from app.metrics import registry, monitor_event_loop_lag
+from app.services.resilience import gemini_policy, amadeus_policy
+from app.services.fare_history import fare_history
+from app.services.fare_ingestion import fare_ingestion_job
 
 
 @asynccontextmanager
@@ -30,11 +39,26 @@ async def lifespan(app: FastAPI):
     print("   Initializing database...")
     init_db()
     print("   Database: ✓ ready")
+    snapshot_keys = await asyncio.to_thread(fare_history.load_latest)
+    print(f"   Fare history: {snapshot_keys} flights with recent snapshots")
+
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+
+    ingestion = None
+    if settings.fare_ingest_enabled:
+        ingestion = asyncio.create_task(fare_ingestion_job.run_forever())
+        print(
+            f"   Fare ingestion: ✓ {len(fare_ingestion_job.routes)} routes x "
+            f"{fare_ingestion_job.days_ahead} days every {settings.fare_ingest_interval_seconds}s"
+        )
 
     yield
     
     # Shutdown
     print("🛬 AirEase Backend shutting down...")
+    lag_monitor.cancel()
+    if ingestion is not None:
+        ingestion.cancel()
     from app.services.gemini_service import gemini_service
     await gemini_service.close()
 
@@ -76,15 +100,28 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Response compression - gzip/br/zstd by Accept-Encoding, above a size threshold
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware)
+
+# Rate limiting - token buckets keyed by user_id or client IP
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware)
+
+
+# Metrics - per-route latency histograms (wraps rate limiting so 429s are counted)
+app.add_middleware(MetricsMiddleware)
 
-# Request timing middleware
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(round(process_time * 1000, 2))
-    return response
+
+# Request timing - X-Process-Time header
+app.add_middleware(ProcessTimeMiddleware)
+
+# Request latency budget for upstream calls (Gemini / Amadeus)
+app.add_middleware(LatencyBudgetMiddleware)
+
+# Per-request profiling - only registered in debug mode with a secret configured
+if settings.debug and settings.profile_secret:
+    app.add_middleware(ProfilingMiddleware)
 
 
 # Exception handlers
@@ -104,6 +141,7 @@ async def global_exception_handler(request: Request, exc: Exception):
 app.include_router(auth_router)
 app.include_router(flights_router)
 app.include_router(ai_router)
+app.include_router(live_router)
 
 
 # Root endpoint
@@ -128,10 +166,20 @@ async def health_check():
             "api": "ok",
             "gemini": "ok" if settings.gemini_api_key else "not_configured",
             "amadeus": "ok" if settings.amadeus_api_key else "not_configured"
+        },
+        "circuits": {
+            "gemini": gemini_policy.status(),
+            "amadeus": amadeus_policy.status()
         }
     }
 
 
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Prometheus 指标"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # Run with: uvicorn app.main:app --reload
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,7 @@
+# Middleware Package
+# 所有中间件均为纯 ASGI 可调用对象（不使用 BaseHTTPMiddleware）
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.timing import ProcessTimeMiddleware, LatencyBudgetMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.compression import CompressionMiddleware
@@ -0,0 +1,190 @@
+"""
+AirEase Backend - Compression Middleware
+按 Accept-Encoding 压缩响应（gzip；安装 brotli / zstandard 后支持 br / zstd）
+
+- 只压缩单块响应体且不小于 COMPRESSION_MIN_SIZE 的可压缩类型（JSON、文本、MessagePack）
+- 流式响应（SSE 等 more_body 分块）原样透传，不做缓冲
+- 已带 Content-Encoding 的响应（如搜索缓存中预压缩的条目）不再处理
+- 压缩后的表示与原始字节不同，强 ETag 追加 "-编码" 后缀（"abc" -> "abc-gzip"）；
+  路由比较 If-None-Match 前用 strip_etag_encoding 去掉后缀，304 响应回显客户端持有的后缀形式
+"""
+
+import gzip
+from typing import Callable, Dict, List, Optional
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+
+def _codecs() -> Dict[str, Callable[[bytes], bytes]]:
+    """编码名 -> 压缩函数（按服务端偏好排序）"""
+    codecs: Dict[str, Callable[[bytes], bytes]] = {}
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=settings.compression_zstd_level)
+        codecs["zstd"] = compressor.compress
+    if brotli is not None:
+        codecs["br"] = lambda data: brotli.compress(data, quality=settings.compression_brotli_quality)
+    codecs["gzip"] = lambda data: gzip.compress(data, compresslevel=settings.compression_gzip_level, mtime=0)
+    return codecs
+
+
+CODECS = _codecs()
+
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "application/vnd.airease.", "text/")
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    按 Accept-Encoding（含 q 值）选择编码
+
+    客户端 q 值相同时按服务端偏好（zstd > br > gzip）；没有可用编码时为None
+    """
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in CODECS:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+# 所有可能出现在 ETag 后缀中的编码（与是否安装对应库无关）
+ETAG_ENCODINGS = ("zstd", "br", "gzip")
+
+
+def etag_with_encoding(etag: str, encoding: str) -> str:
+    """在 ETag 引号内追加编码后缀：abc -> abc-gzip（弱 ETag 同样处理）"""
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_etag_encoding(etag: str) -> str:
+    """去掉 ETag 的压缩编码后缀：abc-gzip -> abc"""
+    for encoding in ETAG_ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    return CODECS[encoding](body)
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _header(headers: List, name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+class CompressionMiddleware:
+    """纯 ASGI 响应压缩中间件"""
+
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = settings.compression_min_size if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = scope.get("headers", [])
+        encoding = choose_encoding(_header(request_headers, b"accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                if message["status"] == 304:
+                    passthrough = True
+                    await send(self._not_modified(message, request_headers, encoding))
+                    return
+                content_type = _header(headers, b"content-type") or ""
+                if _header(headers, b"content-encoding") or not is_compressible(content_type):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            # 第一块响应体：决定是否压缩
+            body = message.get("body", b"")
+            passthrough = True
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers = [
+                (key, value) for key, value in start_message.get("headers", [])
+                if key.lower() not in (b"content-length", b"vary", b"etag")
+            ]
+            vary = _header(start_message.get("headers", []), b"vary")
+            etag = _header(start_message.get("headers", []), b"etag")
+            if etag:
+                headers.append((b"etag", etag_with_encoding(etag, encoding).encode("latin-1")))
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", f"{vary}, Accept-Encoding".encode() if vary else b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _not_modified(message, request_headers: List, encoding: str):
+        """304 响应：客户端缓存的是压缩表示时，回显带编码后缀的 ETag"""
+        etag = _header(message.get("headers", []), b"etag")
+        if_none_match = _header(request_headers, b"if-none-match")
+        if not etag or not if_none_match:
+            return message
+        encoded = etag_with_encoding(etag, encoding)
+        if encoded not in if_none_match:
+            return message
+        headers = [(key, value) for key, value in message["headers"] if key.lower() != b"etag"]
+        headers.append((b"etag", encoded.encode("latin-1")))
+        return {**message, "headers": headers}
@@ -0,0 +1,40 @@
+"""
+AirEase Backend - Metrics Middleware
+按路由模板、方法、状态码记录请求延迟
+"""
+
+import time
+
+from app.metrics import http_request_duration, http_requests_in_flight
+
+
+class MetricsMiddleware:
+    """纯 ASGI 指标中间件"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            # 路由匹配后 scope 中才有 route；未匹配的路径归为一类，避免标签爆炸
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - start, scope["method"], route, str(status_code)
+            )
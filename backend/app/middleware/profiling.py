@@ -0,0 +1,116 @@
+"""
+AirEase Backend - Request Profiling Middleware
+调试用：对单个请求做性能剖析
+
+仅在 settings.debug 且配置了 profile_secret 时注册，未注册时零开销。
+请求头 X-Profile 携带密钥即可剖析该请求：
+
+- X-Profile-Mode: cprofile（默认，确定性剖析，保存 .pstats）
+- X-Profile-Mode: sampling（采样事件循环线程的调用栈，保存 .collapsed 火焰图格式）
+
+结果写入 profile_dir，响应头 X-Profile-Id / X-Profile-Path 指向文件。
+剖析期间同一线程上的其他请求也会被计入，请在低流量环境使用。
+"""
+
+import asyncio
+import cProfile
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+from app.config import settings
+
+
+class StackSampler:
+    """后台线程周期性采样目标线程的调用栈，输出 collapsed stacks"""
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfilingMiddleware:
+    """纯 ASGI 剖析中间件"""
+
+    def __init__(self, app, secret: Optional[str] = None, profile_dir: Optional[str] = None):
+        self.app = app
+        self.secret = (secret or settings.profile_secret).encode("utf-8")
+        self.profile_dir = profile_dir or settings.profile_dir
+        # cProfile 同一时间只能有一个活动的剖析器
+        self._lock = asyncio.Lock()
+
+    def _requested_mode(self, scope) -> Optional[str]:
+        headers = dict(scope.get("headers") or [])
+        token = headers.get(b"x-profile")
+        if not token or not self.secret or not hmac.compare_digest(token, self.secret):
+            return None
+        mode = headers.get(b"x-profile-mode", b"cprofile").decode("latin-1").lower()
+        return mode if mode in ("cprofile", "sampling") else "cprofile"
+
+    async def __call__(self, scope, receive, send):
+        mode = self._requested_mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        extension = "pstats" if mode == "cprofile" else "collapsed"
+        path = os.path.join(self.profile_dir, f"{profile_id}.{extension}")
+
+        async def send_with_profile_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode()),
+                    (b"x-profile-path", path.encode()),
+                ]
+            await send(message)
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        async with self._lock:
+            if mode == "cprofile":
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, send_with_profile_headers)
+                finally:
+                    profiler.disable()
+                    profiler.dump_stats(path)
+            else:
+                sampler = StackSampler(threading.get_ident())
+                sampler.start()
+                try:
+                    await self.app(scope, receive, send_with_profile_headers)
+                finally:
+                    sampler.stop()
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(sampler.collapsed())
+        print(f"Profiled {scope['method']} {scope['path']} -> {path}")
@@ -0,0 +1,248 @@
+"""
+AirEase Backend - Rate Limiting Middleware
+令牌桶限流（按 JWT user_id 或客户端 IP，按路由分组）
+"""
+
+import json
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.auth_service import auth_service
+
+
+class RateLimitRule:
+    """路由分组限流规则：每秒补充 rate 个令牌，桶容量 burst"""
+
+    def __init__(self, prefix: str, rate: float, burst: int):
+        self.prefix = prefix
+        self.rate = rate
+        self.burst = burst
+        # 令牌从空到满所需时间，空闲超过该时间的桶等价于不存在
+        self.idle_seconds = burst / rate if rate > 0 else float("inf")
+
+
+def parse_rules(spec: str) -> List[RateLimitRule]:
+    """
+    解析限流规则
+
+    格式: "前缀=每秒速率:桶容量,..."，例如 "/v1/ai=0.5:10,/v1=20:60"；
+    匹配时取最长前缀
+    """
+    rules = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        prefix, _, limits = item.partition("=")
+        rate, _, burst = limits.partition(":")
+        rules.append(RateLimitRule(prefix.strip(), float(rate), int(burst)))
+    rules.sort(key=lambda rule: len(rule.prefix), reverse=True)
+    return rules
+
+
+# ============================================================
+# Backends
+# ============================================================
+
+class InMemoryRateLimitBackend:
+    """
+    进程内令牌桶
+
+    按 key 哈希分片，每个分片一把锁，检查为 O(1)；
+    每个分片定期清理已补满的空闲桶。
+    """
+
+    def __init__(self, shards: int = 16, sweep_interval: float = 60.0):
+        self._shards: List[Dict[str, List[float]]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._last_sweep = [time.monotonic()] * shards
+        self.sweep_interval = sweep_interval
+
+    async def acquire(self, key: str, rule: RateLimitRule, cost: float = 1.0) -> Tuple[bool, float, float]:
+        """
+        尝试取令牌
+
+        返回 (是否放行, 剩余令牌, 需等待秒数)
+        """
+        index = hash(key) % len(self._shards)
+        shard = self._shards[index]
+        now = time.monotonic()
+        with self._locks[index]:
+            bucket = shard.get(key)
+            if bucket is None:
+                tokens = float(rule.burst)
+            else:
+                tokens = min(rule.burst, bucket[0] + (now - bucket[1]) * rule.rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                allowed, wait = True, 0.0
+            else:
+                allowed = False
+                wait = (cost - tokens) / rule.rate if rule.rate > 0 else float("inf")
+
+            if bucket is None:
+                shard[key] = [tokens, now, rule.idle_seconds]
+            else:
+                bucket[0], bucket[1] = tokens, now
+
+            if now - self._last_sweep[index] >= self.sweep_interval:
+                self._sweep(shard, now)
+                self._last_sweep[index] = now
+
+        return allowed, tokens, wait
+
+    @staticmethod
+    def _sweep(shard: Dict[str, List[float]], now: float) -> None:
+        idle = [key for key, (_, updated, idle_seconds) in shard.items() if now - updated >= idle_seconds]
+        for key in idle:
+            del shard[key]
+
+    def clear(self) -> None:
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                shard.clear()
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class RedisRateLimitBackend:
+    """
+    Redis 共享令牌桶（多 worker 部署）
+
+    需要安装 redis（requirements.txt 中为可选依赖）
+    """
+
+    _SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(self._SCRIPT)
+
+    async def acquire(self, key: str, rule: RateLimitRule, cost: float = 1.0) -> Tuple[bool, float, float]:
+        allowed, tokens = await self._script(
+            keys=[f"ratelimit:{key}"],
+            args=[rule.rate, rule.burst, time.time(), cost]
+        )
+        tokens = float(tokens)
+        wait = 0.0 if allowed else (cost - tokens) / rule.rate
+        return bool(allowed), tokens, wait
+
+
+def create_backend() -> Any:
+    """有 redis_url 且安装了 redis 时使用共享存储，否则使用进程内令牌桶"""
+    if settings.redis_url:
+        try:
+            return RedisRateLimitBackend(settings.redis_url)
+        except ImportError:
+            print("   Rate limit: redis not installed, using in-memory buckets")
+    return InMemoryRateLimitBackend()
+
+
+# ============================================================
+# ASGI Middleware
+# ============================================================
+
+class RateLimitMiddleware:
+    """纯 ASGI 限流中间件"""
+
+    def __init__(self, app, rules: Optional[List[RateLimitRule]] = None, backend: Any = None):
+        self.app = app
+        self.rules = rules if rules is not None else parse_rules(settings.rate_limit_rules)
+        self.backend = backend if backend is not None else rate_limit_backend
+
+    def _match(self, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if path.startswith(rule.prefix):
+                return rule
+        return None
+
+    @staticmethod
+    def _client_key(scope) -> str:
+        """已登录用户按 user_id，否则按客户端 IP"""
+        headers = dict(scope.get("headers") or [])
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if authorization.startswith("Bearer "):
+            payload = auth_service.decode_token(authorization[7:])
+            if payload and payload.get("user_id") is not None:
+                return f"user:{payload['user_id']}"
+
+        if settings.trust_proxy_headers:
+            forwarded = headers.get(b"x-forwarded-for")
+            if forwarded:
+                return f"ip:{forwarded.decode('latin-1').split(',')[0].strip()}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self._match(scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{rule.prefix}|{self._client_key(scope)}"
+        allowed, remaining, wait = await self.backend.acquire(key, rule)
+        reset = math.ceil((rule.burst - remaining) / rule.rate) if rule.rate > 0 else 0
+        rate_headers = [
+            (b"x-ratelimit-limit", str(rule.burst).encode()),
+            (b"x-ratelimit-remaining", str(int(remaining)).encode()),
+            (b"x-ratelimit-reset", str(reset).encode()),
+        ]
+
+        if not allowed:
+            retry_after = max(1, math.ceil(wait))
+            body = json.dumps({
+                "error": "Too Many Requests",
+                "detail": f"请求过于频繁，请在{retry_after}秒后重试",
+                "code": 429
+            }, ensure_ascii=False).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": rate_headers + [
+                    (b"retry-after", str(retry_after).encode()),
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + rate_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+# Singleton instance
+rate_limit_backend = create_backend()
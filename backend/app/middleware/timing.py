@@ -0,0 +1,49 @@
+"""
+AirEase Backend - Timing Middleware
+请求耗时头与上游延迟预算
+"""
+
+import time
+
+from app.config import settings
+from app.services.resilience import latency_budget
+
+
+class ProcessTimeMiddleware:
+    """纯 ASGI：在 http.response.start 时写入 X-Process-Time（毫秒）"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_with_process_time(message):
+            if message["type"] == "http.response.start":
+                elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-process-time", str(elapsed_ms).encode())
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_process_time)
+
+
+class LatencyBudgetMiddleware:
+    """纯 ASGI：为每个请求设置上游调用（Gemini / Amadeus）的延迟预算"""
+
+    def __init__(self, app, budget_ms: int = None):
+        self.app = app
+        self.budget = (budget_ms or settings.request_latency_budget_ms) / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with latency_budget(self.budget):
+            await self.app(scope, receive, send)
@@ -4,7 +4,7 @@ AirEase Backend - Pydantic Models
 """
 
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime, date
 from enum import Enum
 
@@ -203,6 +203,118 @@ class FlightSearchResponse(BaseModel):
     meta: SearchMeta
 
 
+class FlightChange(BaseModel):
+    """增量搜索中价格/余座发生变化的航班"""
+    id: str
+    price: float
+    seats_remaining: Optional[int] = Field(default=None, alias="seatsRemaining")
+
+    class Config:
+        populate_by_name = True
+
+
+class SearchDelta(BaseModel):
+    """增量搜索响应：相对 since 快照新增、移除和价格/余座变化的航班"""
+    since: str
+    added: List[FlightWithScore]
+    removed: List[str]
+    changed: List[FlightChange]
+    meta: SearchMeta
+
+
+class FlightBatchRequest(BaseModel):
+    """批量获取航班请求"""
+    ids: List[str] = Field(min_length=1)
+
+
+class FlightBatchItem(BaseModel):
+    """批量结果中的航班（priceHistory 仅在 include=priceHistory 时返回）"""
+    flight: Flight
+    score: FlightScore
+    facilities: FlightFacilities
+    price_history: Optional[PriceHistory] = Field(default=None, alias="priceHistory")
+    
+    class Config:
+        populate_by_name = True
+
+
+class FlightBatchResponse(BaseModel):
+    """批量获取航班响应"""
+    flights: List[FlightBatchItem]
+    missing: List[str] = []
+
+
+class ComparisonMetric(BaseModel):
+    """对比指标（一列，values/deltas 与 flightIds 顺序一致）"""
+    name: str
+    higher_is_better: bool = Field(alias="higherIsBetter")
+    values: List[float]
+    best: float
+    winners: List[str]
+    deltas: List[float]
+    
+    class Config:
+        populate_by_name = True
+
+
+class FlightComparison(BaseModel):
+    """多航班对比结果"""
+    persona: str
+    weights: Dict[str, float]
+    flight_ids: List[str] = Field(alias="flightIds")
+    metrics: List[ComparisonMetric]
+    weighted_totals: List[float] = Field(alias="weightedTotals")
+    rank: List[str]
+    
+    class Config:
+        populate_by_name = True
+
+
+class Itinerary(BaseModel):
+    """行程（直飞或中转）"""
+    id: str
+    segments: List[Flight]
+    stops: int
+    connection_airports: List[str] = Field(default=[], alias="connectionAirports")
+    layover_minutes: List[int] = Field(default=[], alias="layoverMinutes")
+    total_price: float = Field(alias="totalPrice")
+    total_duration_minutes: int = Field(alias="totalDurationMinutes")
+    score: float
+    departure_time: datetime = Field(alias="departureTime")
+    arrival_time: datetime = Field(alias="arrivalTime")
+    
+    class Config:
+        populate_by_name = True
+
+
+class ItinerarySearchResponse(BaseModel):
+    """行程搜索响应"""
+    itineraries: List[Itinerary]
+    total: int
+
+
+class CalendarDay(BaseModel):
+    """低价日历中的一天"""
+    date: str
+    min_price: Optional[float] = Field(default=None, alias="minPrice")
+    
+    class Config:
+        populate_by_name = True
+
+
+class PriceCalendar(BaseModel):
+    """低价日历"""
+    from_city: str = Field(alias="from")
+    to_city: str = Field(alias="to")
+    cabin: str
+    month: str
+    currency: str = "CNY"
+    days: List[CalendarDay]
+    
+    class Config:
+        populate_by_name = True
+
+
 class AISearchRequest(BaseModel):
     """AI搜索请求"""
     query: str
@@ -0,0 +1,128 @@
+"""
+AirEase Backend - Field Projection
+稀疏字段集：?fields=flight.price,flight.departureTime,score.overallScore
+
+字段路径（camelCase 别名）按模型定义编译为投影，结果缓存；
+序列化时直接从模型属性取值生成 dict，不再构建完整响应模型。
+"""
+
+from datetime import date, datetime
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+# 预定义的字段集
+PROFILES: Dict[str, str] = {
+    # 列表页：不含评分解释和大部分设施字段
+    "list": ",".join([
+        "flight.id", "flight.flightNumber", "flight.airline", "flight.airlineCode",
+        "flight.departureCity", "flight.departureAirportCode", "flight.departureTime",
+        "flight.arrivalCity", "flight.arrivalAirportCode", "flight.arrivalTime",
+        "flight.durationMinutes", "flight.stops", "flight.cabin",
+        "flight.price", "flight.currency", "flight.seatsRemaining",
+        "score.overallScore", "score.highlights",
+        "facilities.hasWifi", "facilities.hasPower", "facilities.mealIncluded",
+    ]),
+}
+
+
+def _plain(value: Any) -> Any:
+    """叶子值转为 JSON 原生类型"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _model_of(annotation: Any) -> Optional[Type[BaseModel]]:
+    """字段类型中的模型类（支持 Optional[Model] / List[Model]）"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    if get_origin(annotation) in (Union, list, List):
+        for arg in get_args(annotation):
+            model = _model_of(arg)
+            if model is not None:
+                return model
+    return None
+
+
+def _field_names(model: Type[BaseModel]) -> Dict[str, Tuple[str, Any]]:
+    """别名/字段名 -> (属性名, 类型)"""
+    names = {}
+    for name, field in model.model_fields.items():
+        names[name] = (name, field.annotation)
+        if field.alias:
+            names[field.alias] = (name, field.annotation)
+    return names
+
+
+class Projection:
+    """编译后的投影：[(输出键, 属性名, 子投影)]，子投影为None时输出整个值"""
+
+    def __init__(self, fields: List[Tuple[str, str, Optional["Projection"]]]):
+        self.fields = fields
+        self.keys = {key for key, _, _ in fields}
+
+    def apply(self, obj: Any) -> Dict[str, Any]:
+        result = {}
+        for key, attr, child in self.fields:
+            value = getattr(obj, attr)
+            if child is None or value is None:
+                result[key] = _plain(value)
+            elif isinstance(value, list):
+                result[key] = [child.apply(item) for item in value]
+            else:
+                result[key] = child.apply(value)
+        return result
+
+
+def _compile(paths: List[List[str]], model: Type[BaseModel]) -> Projection:
+    names = _field_names(model)
+    # 输出键 -> 子路径列表（None 表示整个字段）
+    tree: Dict[str, Optional[List[List[str]]]] = {}
+    for head, *rest in paths:
+        if head not in names:
+            raise ValueError(f"未知字段: {head}")
+        if not rest:
+            tree[head] = None
+        elif tree.get(head, []) is not None:
+            tree.setdefault(head, []).append(rest)
+
+    fields = []
+    for key, subpaths in tree.items():
+        attr, annotation = names[key]
+        child = None
+        if subpaths is not None:
+            submodel = _model_of(annotation)
+            if submodel is None:
+                raise ValueError(f"字段 {key} 没有子字段")
+            child = _compile(subpaths, submodel)
+        fields.append((key, attr, child))
+    return Projection(fields)
+
+
+@lru_cache(maxsize=256)
+def compile_fields(spec: str, model: Type[BaseModel]) -> Projection:
+    """
+    编译字段选择（逗号分隔的点路径，或 PROFILES 中的名称）
+
+    未知字段抛 ValueError
+    """
+    spec = PROFILES.get(spec.strip(), spec)
+    paths = [part.strip().split(".") for part in spec.split(",") if part.strip()]
+    if not paths:
+        raise ValueError("fields 不能为空")
+    return _compile(paths, model)
+
+
+def project(items: List[Any], projection: Projection) -> List[Dict[str, Any]]:
+    """按投影序列化一组对象"""
+    apply: Callable[[Any], Dict[str, Any]] = projection.apply
+    return [apply(item) for item in items]
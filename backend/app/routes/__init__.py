@@ -1,3 +1,4 @@
 # Routes Package
 from app.routes.flights import router as flights_router
 from app.routes.ai import router as ai_router
+from app.routes.live import router as live_router
@@ -3,21 +3,38 @@ AirEase Backend - AI Search API Routes
 AI智能搜索API路由
 """
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+from contextlib import aclosing
+import hmac
+import json
 
+from fastapi import APIRouter, HTTPException, Header, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+from app.config import settings
 from app.models import AISearchRequest, AISearchResponse
 from app.services.gemini_service import gemini_service
+from app.services.mock_service import mock_flight_service
+from app.services.explanation_service import (
+    PERSONAS, explanation_request, schedule_precompute
+)
+
+# Maximum number of items in one explain batch
+MAX_EXPLAIN_BATCH = 50
 
 router = APIRouter(prefix="/v1/ai", tags=["AI Search"])
 
 
 class ChatRequest(BaseModel):
     """对话请求"""
-    message: str
+    message: str = ""
     persona: Optional[str] = None
     context: Optional[str] = None
+    flight_id: Optional[str] = Field(default=None, alias="flightId")
+
+    class Config:
+        populate_by_name = True
 
 
 class ChatResponse(BaseModel):
@@ -26,6 +43,36 @@ class ChatResponse(BaseModel):
     parsed_query: Optional[dict] = None
 
 
+class ExplainBatchRequest(BaseModel):
+    """批量解释请求"""
+    items: List[ChatRequest] = Field(max_length=MAX_EXPLAIN_BATCH)
+
+
+class ExplainBatchResponse(BaseModel):
+    """批量解释响应"""
+    replies: List[str]
+
+
+def _explanation_args(request: ChatRequest) -> dict:
+    """
+    解析解释请求参数
+
+    传入 flightId 时由服务端生成规范化的航班/评分描述，
+    与预计算任务使用同一内容地址
+    """
+    persona = request.persona or "business"
+    if request.flight_id:
+        fws = mock_flight_service.get_flight(request.flight_id)
+        if not fws:
+            raise HTTPException(status_code=404, detail="航班不存在")
+        return explanation_request(fws, persona)
+    return {
+        "flight_info": request.message,
+        "score_info": request.context or "",
+        "persona": persona
+    }
+
+
 @router.post(
     "/search",
     response_model=AISearchResponse,
@@ -74,14 +121,12 @@ async def ai_explain(request: ChatRequest):
     """
     生成AI评分解释
     
-    根据用户画像生成个性化的航班评分解释
+    根据用户画像生成个性化的航班评分解释。
+    传入 flightId 可直接命中预计算的解释缓存。
     """
+    args = _explanation_args(request)
     try:
-        explanation = await gemini_service.generate_score_explanation(
-            flight_info=request.message,
-            score_info=request.context or "",
-            persona=request.persona or "business"
-        )
+        explanation = await gemini_service.generate_score_explanation(**args)
         
         return ChatResponse(reply=explanation)
         
@@ -89,6 +134,91 @@ async def ai_explain(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"AI生成失败: {str(e)}")
 
 
+def _sse_event(event: str, data: dict) -> str:
+    """编码一条 Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post(
+    "/explain/stream",
+    summary="AI评分解释（流式）",
+    description="以 Server-Sent Events 逐块返回评分解释：chunk 事件携带增量文本，done 事件携带完整文本",
+    response_class=StreamingResponse
+)
+async def ai_explain_stream(request: ChatRequest, http_request: Request):
+    """
+    流式生成AI评分解释
+
+    客户端断开时停止转发并关闭到Gemini的上游连接
+    """
+    args = _explanation_args(request)
+
+    async def event_stream():
+        chunks = []
+        async with aclosing(gemini_service.stream_score_explanation(**args)) as stream:
+            async for chunk in stream:
+                if await http_request.is_disconnected():
+                    return
+                chunks.append(chunk)
+                yield _sse_event("chunk", {"text": chunk})
+        yield _sse_event("done", {"reply": "".join(chunks).strip()})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post(
+    "/explain/batch",
+    response_model=ExplainBatchResponse,
+    summary="批量AI评分解释",
+    description=f"一次请求生成多条评分解释（最多{MAX_EXPLAIN_BATCH}条），并发受限"
+)
+async def ai_explain_batch(request: ExplainBatchRequest):
+    """
+    批量生成AI评分解释
+
+    结果顺序与请求顺序一致，已缓存的条目不会再调用Gemini
+    """
+    items = [_explanation_args(item) for item in request.items]
+    try:
+        replies = await gemini_service.generate_score_explanations(items)
+        return ExplainBatchResponse(replies=replies)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI生成失败: {str(e)}")
+
+
+@router.post(
+    "/explain/precompute",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="预计算热门航班AI解释",
+    description="后台为每条航线近期评分最高的航班预生成各画像的评分解释（需要 X-Admin-Token）"
+)
+async def ai_explain_precompute(
+    top_n: Optional[int] = Query(None, alias="topN", ge=1, le=50, description="每条航线取前N个航班"),
+    personas: Optional[List[str]] = Query(None, description="用户画像：business/family/student"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    调度预计算任务
+
+    每次运行会调用数百次Gemini，只对管理员开放；同一时间只运行一个任务，
+    已有任务在运行时返回 409。立即返回，任务在后台以有限并发执行
+    """
+    secret = settings.admin_secret.encode("utf-8")
+    token = (x_admin_token or "").encode("utf-8")
+    if not secret or not hmac.compare_digest(token, secret):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="需要管理员权限")
+    selected = [p for p in (personas or PERSONAS) if p in PERSONAS]
+    if not selected:
+        raise HTTPException(status_code=400, detail="无效的用户画像")
+    if schedule_precompute(top_n=top_n, personas=selected) is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="预计算任务正在运行")
+    return {"status": "scheduled", "topN": top_n, "personas": selected}
+
+
 @router.get(
     "/health",
     summary="AI服务健康检查",
@@ -4,26 +4,217 @@ AirEase Backend - Flight API Routes
 """
 
 from fastapi import APIRouter, HTTPException, Query, Header
-from typing import Optional
-import uuid
+from fastapi.responses import Response
+from pydantic import BaseModel
+from typing import Any, List, Optional, Tuple, Union
+from datetime import date as date_type, datetime
+import asyncio
+import calendar
+import hashlib
 
 from app.models import (
     FlightSearchResponse, FlightDetail, PriceHistory,
-    FlightWithScore, SearchMeta, ErrorResponse
+    FlightWithScore, SearchMeta, ErrorResponse,
+    PriceCalendar, CalendarDay, ItinerarySearchResponse,
+    FlightBatchRequest, FlightBatchItem, FlightBatchResponse,
+    FlightComparison, FlightChange, SearchDelta
 )
 from app.services.mock_service import mock_flight_service
+from app.services.compare_service import PERSONA_WEIGHTS, compare_flights
 from app.services.auth_service import auth_service
 from app.config import settings
+from app.projection import Projection, compile_fields, project
+from app.encoding import VARY, encode, is_columnar, negotiate, to_columns
+from app.middleware.compression import choose_encoding, strip_etag_encoding
+from app.services.search_cache import CachedResponse, search_cache
+from app.services.search_snapshots import SearchSnapshot, search_snapshots
 
 # Maximum number of results for non-authenticated users
 MAX_FREE_RESULTS = 3
 
+FIELDS_DESCRIPTION = "只返回指定字段（逗号分隔的点路径，如 flight.price,score.overallScore；或预定义的 list）"
+ACCEPT_DESCRIPTION = "响应格式：application/json（默认）或 application/msgpack"
+
 router = APIRouter(prefix="/v1/flights", tags=["Flights"])
 
 
+def _projection(fields: Optional[str], model) -> Optional[Projection]:
+    """编译 fields 参数，未指定时为None（返回完整模型）"""
+    if not fields:
+        return None
+    try:
+        return compile_fields(fields, model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _respond(accept: Optional[str], content: Any) -> Response:
+    """按 Accept 编码响应，content 为模型或 JSON 原生类型"""
+    if isinstance(content, BaseModel):
+        content = content.model_dump(mode="json", by_alias=True)
+    return encode(negotiate(accept), content)
+
+
+def _etag(flight_id: str, *variant: str) -> Optional[str]:
+    """
+    航班资源的强 ETag，航班不存在时为None
+
+    由进程标识、航班版本、当天日期（价格历史按日期滚动）和表示（接口、媒体类型、字段集，
+    含价格历史时还有最近一次快照时间）决定，不构建任何模型
+    """
+    version = mock_flight_service.flight_version(flight_id)
+    if version is None:
+        return None
+    key = "|".join((mock_flight_service.epoch, flight_id, str(version), date_type.today().isoformat(), *variant))
+    return f'"{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}"'
+
+
+def _not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，忽略压缩编码后缀）"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if strip_etag_encoding(tag) == etag:
+            return True
+    return False
+
+
+def _validators(etag: str, max_age: int) -> dict:
+    return {"ETag": etag, "Cache-Control": f"public, max-age={max_age}", **VARY}
+
+
+def _conditional(
+    flight_id: str,
+    if_none_match: Optional[str],
+    max_age: int,
+    *variant: str
+) -> Tuple[str, Optional[Response]]:
+    """
+    条件 GET：返回 (ETag, 304 响应或None)
+
+    航班不存在时 404；If-None-Match 命中时直接返回 304，调用方无需构建响应
+    """
+    etag = _etag(flight_id, *variant)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="航班不存在")
+    if _not_modified(if_none_match, etag):
+        return etag, Response(status_code=304, headers=_validators(etag, max_age))
+    return etag, None
+
+
+def _run_search(query: Tuple, is_authenticated: bool) -> Tuple[List[FlightWithScore], int]:
+    """执行搜索，返回 (可见航班, 总数)"""
+    from_city, to_city, date, cabin, flex_days = query[:5]
+    # 使用Mock服务（可切换为Amadeus服务）
+    all_flights = mock_flight_service.search_flights(
+        from_city=from_city,
+        to_city=to_city,
+        date=date,
+        cabin=cabin,
+        flex_days=flex_days
+    )
+
+    # Limit results for non-authenticated users
+    visible_flights = all_flights if is_authenticated else all_flights[:MAX_FREE_RESULTS]
+    return visible_flights, len(all_flights)
+
+
+def _search_meta(snapshot: SearchSnapshot, is_authenticated: bool) -> dict:
+    restricted_count = 0 if is_authenticated else max(0, snapshot.total - MAX_FREE_RESULTS)
+    meta = SearchMeta(
+        total=snapshot.total,
+        searchId=snapshot.search_id,
+        cachedAt=datetime.now(),
+        restrictedCount=restricted_count,
+        isAuthenticated=is_authenticated
+    )
+    return meta.model_dump(mode="json", by_alias=True)
+
+
+def _rows(flights: List[FlightWithScore], projection: Optional[Projection]) -> List[dict]:
+    if projection is not None:
+        return project(flights, projection)
+    return [fws.model_dump(mode="json", by_alias=True) for fws in flights]
+
+
+async def _off_loop(history_tag: str, func, *args):
+    """有采集快照时价格历史要查询 SQLite，放到线程池中执行；否则为纯内存计算，直接调用"""
+    if history_tag:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+def _search_body(
+    query: Tuple,
+    projection: Optional[Projection],
+    media_type: str,
+    is_authenticated: bool
+) -> Tuple[bytes, str]:
+    """执行搜索、保存结果快照并编码响应体，返回 (响应体, searchId)"""
+    version = mock_flight_service.version
+    visible_flights, total = _run_search(query, is_authenticated)
+    snapshot = search_snapshots.create(query, version, total, visible_flights)
+    rows = _rows(visible_flights, projection)
+    meta_json = _search_meta(snapshot, is_authenticated)
+    if is_columnar(media_type):
+        body = encode(media_type, {"columns": to_columns(rows), "meta": meta_json}).body
+    else:
+        body = encode(media_type, {"flights": rows, "meta": meta_json}).body
+    return body, snapshot.search_id
+
+
+def _search_delta(
+    since: SearchSnapshot,
+    query: Tuple,
+    projection: Optional[Projection],
+    is_authenticated: bool
+) -> dict:
+    """
+    相对 since 快照的增量
+
+    库存版本未变时不重新搜索；没有变化时沿用原 searchId，不产生新快照
+    """
+    added: List[FlightWithScore] = []
+    removed: List[str] = []
+    changed: List[FlightChange] = []
+    snapshot = since
+    version = mock_flight_service.version
+    if since.version != version:
+        visible_flights, total = _run_search(query, is_authenticated)
+        added, removed, changed = since.diff(visible_flights)
+        if added or removed or changed:
+            snapshot = search_snapshots.create(query, version, total, visible_flights)
+        else:
+            since.version, since.total = version, total
+    return {
+        "since": since.search_id,
+        "added": _rows(added, projection),
+        "removed": removed,
+        "changed": [change.model_dump(mode="json", by_alias=True) for change in changed],
+        "meta": _search_meta(snapshot, is_authenticated),
+    }
+
+
+def _cached_response(entry: CachedResponse, accept_encoding: Optional[str]) -> Response:
+    """缓存条目 -> 响应；客户端支持压缩且响应足够大时直接使用预压缩字节"""
+    encoding = choose_encoding(accept_encoding) if settings.compression_enabled else None
+    if encoding is None or len(entry.body) < settings.compression_min_size:
+        return Response(entry.body, media_type=entry.media_type, headers=VARY)
+    return Response(
+        entry.compressed(encoding),
+        media_type=entry.media_type,
+        headers={"Vary": "Accept, Accept-Encoding", "Content-Encoding": encoding}
+    )
+
+
 @router.get(
     "/search",
-    response_model=FlightSearchResponse,
+    response_model=Union[FlightSearchResponse, SearchDelta],
     summary="搜索航班",
     description="根据出发地、目的地、日期和舱位搜索航班。未登录用户只能看到前3条结果。"
 )
@@ -32,7 +223,17 @@ async def search_flights(
     to_city: str = Query(..., alias="to", description="到达城市"),
     date: str = Query(..., description="出发日期（YYYY-MM-DD）"),
     cabin: str = Query("economy", description="舱位：economy/business/first 或 经济舱/公务舱/头等舱"),
-    authorization: Optional[str] = Header(None, description="JWT Bearer token")
+    flex_days: int = Query(
+        0, alias="flexDays", ge=0, le=settings.flex_search_max_days,
+        description="灵活日期：同时搜索前后各N天"
+    ),
+    fields: Optional[str] = Query(settings.search_default_fields or None, description=FIELDS_DESCRIPTION),
+    authorization: Optional[str] = Header(None, description="JWT Bearer token"),
+    accept: Optional[str] = Header(
+        None, description=ACCEPT_DESCRIPTION + "，或列式 application/vnd.airease.columnar+json / +msgpack"
+    ),
+    accept_encoding: Optional[str] = Header(None, description="响应压缩：gzip / br / zstd"),
+    since: Optional[str] = Query(None, description="上次搜索的 searchId：只返回新增、移除和价格/余座变化的航班")
 ):
     """
     搜索航班
@@ -41,49 +242,220 @@ async def search_flights(
     - **to**: 到达城市名称或代码
     - **date**: 出发日期，格式 YYYY-MM-DD
     - **cabin**: 舱位类型
+    - **flexDays**: 灵活日期天数（可选，默认只搜索当天）
+    - **fields**: 稀疏字段集（可选，如 `fields=list` 不返回评分解释）
+    - **Accept**: 响应格式（可选），列式格式中 flights 变为 columns：字段路径 -> 值数组
     - **Authorization**: Bearer token（可选，未登录用户只能看到前3条结果）
+    - **since**: 上次响应的 meta.searchId（可选），返回增量（added / removed / changed）而不是完整列表；
+      快照已被淘汰时返回 410，客户端应重新完整搜索
 
     返回匹配的航班列表，包含评分和设施信息
     """
+    projection = _projection(fields, FlightWithScore)
+    media_type = negotiate(accept, columnar=True)
+
+    # Check authentication status
+    is_authenticated = False
+    if authorization and authorization.startswith("Bearer "):
+        token = authorization.split(" ")[1]
+        payload = auth_service.decode_token(token)
+        is_authenticated = payload is not None
+
+    query = (from_city, to_city, date, cabin, flex_days, is_authenticated)
+    snapshot = None
+    if since:
+        snapshot = search_snapshots.get(since)
+        if snapshot is None:
+            raise HTTPException(status_code=410, detail="searchId 已过期，请重新搜索")
+        if snapshot.query != query:
+            raise HTTPException(status_code=400, detail="since 对应的搜索条件与本次请求不一致")
+
+    try:
+        if snapshot is not None:
+            return _respond(accept, _search_delta(snapshot, query, projection, is_authenticated))
+
+        # 相同查询、相同库存版本直接返回缓存的（预压缩）响应体
+        cache_key = (*query, fields, media_type, mock_flight_service.version)
+        entry = search_cache.get(cache_key)
+        # 快照已被淘汰时缓存的 searchId 无法用于 since=，重新生成条目
+        if entry is None or not search_snapshots.touch(entry.search_id):
+            body, search_id = _search_body(query, projection, media_type, is_authenticated)
+            entry = search_cache.put(cache_key, body, media_type, search_id)
+        return _cached_response(entry, accept_encoding)
+
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式应为 YYYY-MM-DD")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get(
+    "/calendar",
+    response_model=PriceCalendar,
+    summary="低价日历",
+    description="返回航线在指定月份每天的最低价"
+)
+async def get_price_calendar(
+    from_city: str = Query(..., alias="from", description="出发城市（如：北京、上海）"),
+    to_city: str = Query(..., alias="to", description="到达城市"),
+    month: Optional[str] = Query(None, description="月份（YYYY-MM），默认本月"),
+    cabin: str = Query("economy", description="舱位：economy/business/first 或 经济舱/公务舱/头等舱"),
+    accept: Optional[str] = Header(None, description=ACCEPT_DESCRIPTION)
+):
+    """
+    低价日历
+
+    由预计算的 (航线, 舱位, 日期) 最低价表直接生成，
+    不需要逐日搜索；没有航班的日期 minPrice 为 null
+    """
+    try:
+        start = datetime.strptime(month, "%Y-%m").date() if month else date_type.today().replace(day=1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="月份格式应为 YYYY-MM")
+
+    days_in_month = calendar.monthrange(start.year, start.month)[1]
+    prices = mock_flight_service.price_calendar(from_city, to_city, cabin, start, days_in_month)
+
+    return _respond(accept, PriceCalendar(
+        from_city=from_city,
+        to_city=to_city,
+        cabin=cabin,
+        month=start.strftime("%Y-%m"),
+        days=[
+            CalendarDay(date=day.strftime("%Y-%m-%d"), min_price=price)
+            for day, price in prices
+        ]
+    ))
+
+
+@router.get(
+    "/itineraries",
+    response_model=ItinerarySearchResponse,
+    summary="搜索中转行程",
+    description="返回直飞和一次中转的 Pareto 最优行程（价格/总时长/评分）"
+)
+async def search_itineraries(
+    from_city: str = Query(..., alias="from", description="出发城市（如：北京、上海）"),
+    to_city: str = Query(..., alias="to", description="到达城市"),
+    date: str = Query(..., description="出发日期（YYYY-MM-DD）"),
+    cabin: str = Query("economy", description="舱位：economy/business/first 或 经济舱/公务舱/头等舱"),
+    max_stops: int = Query(1, alias="maxStops", ge=0, le=1, description="最多中转次数"),
+    limit: int = Query(20, ge=1, le=100, description="最多返回行程数"),
+    accept: Optional[str] = Header(None, description=ACCEPT_DESCRIPTION)
+):
+    """
+    搜索中转行程
+
+    中转行程由直飞航段在中转机场拼接，衔接时间在
+    MIN_CONNECTION_MINUTES ~ MAX_CONNECTION_MINUTES 之间；
+    只返回在价格、总时长、评分上不被其他行程同时超越的行程
+    """
     try:
-        # Check authentication status
-        is_authenticated = False
-        if authorization and authorization.startswith("Bearer "):
-            token = authorization.split(" ")[1]
-            payload = auth_service.decode_token(token)
-            is_authenticated = payload is not None
-
-        # 使用Mock服务（可切换为Amadeus服务）
-        all_flights = mock_flight_service.search_flights(
-            from_city=from_city,
-            to_city=to_city,
-            date=date,
-            cabin=cabin
+        itineraries = mock_flight_service.search_itineraries(
+            from_city, to_city, date, cabin, max_stops=max_stops, limit=limit
         )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式应为 YYYY-MM-DD")
 
-        total_count = len(all_flights)
-        restricted_count = 0
+    return _respond(accept, ItinerarySearchResponse(itineraries=itineraries, total=len(itineraries)))
 
-        # Limit results for non-authenticated users
-        if is_authenticated:
-            visible_flights = all_flights
-        else:
-            visible_flights = all_flights[:MAX_FREE_RESULTS]
-            restricted_count = max(0, total_count - MAX_FREE_RESULTS)
-
-        return FlightSearchResponse(
-            flights=visible_flights,
-            meta=SearchMeta(
-                total=total_count,
-                searchId=f"search-{uuid.uuid4().hex[:8]}",
-                cachedAt=None,
-                restrictedCount=restricted_count,
-                isAuthenticated=is_authenticated
-            )
+
+@router.post(
+    "/batch",
+    response_model=FlightBatchResponse,
+    summary="批量获取航班",
+    description=f"一次请求获取多个航班（最多{settings.flight_batch_max_size}个），用于收藏夹、对比等页面"
+)
+async def get_flights_batch(
+    request: FlightBatchRequest,
+    include: Optional[str] = Query(None, description="附加内容，逗号分隔：priceHistory"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    accept: Optional[str] = Header(None, description=ACCEPT_DESCRIPTION)
+):
+    """
+    批量获取航班
+
+    按ID索引一次解析全部航班，结果顺序与请求一致（重复ID只返回一次），
+    不存在的ID列在 missing 中；include=priceHistory 时附带价格历史
+    """
+    flight_ids = list(dict.fromkeys(request.ids))
+    if len(flight_ids) > settings.flight_batch_max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次最多获取{settings.flight_batch_max_size}个航班"
         )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    includes = {part.strip() for part in include.split(",")} if include else set()
+    unknown = includes - {"priceHistory"}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的 include: {', '.join(sorted(unknown))}")
+
+    projection = _projection(fields, FlightBatchItem)
+    found = mock_flight_service.get_flights(flight_ids)
+    with_history = "priceHistory" in includes
+    found_ids = {fws.flight.id for fws in found}
+    missing = [flight_id for flight_id in flight_ids if flight_id not in found_ids]
+
+    # 不需要价格历史时直接投影库存对象
+    if projection is not None and "priceHistory" not in projection.keys:
+        return _respond(accept, {"flights": project(found, projection), "missing": missing})
+
+    histories = {}
+    if with_history:
+        # 任一航班有采集快照就整批放到线程池中读取
+        history_tag = "".join(mock_flight_service.price_history_tag(fws.flight.id) for fws in found)
+        histories = await _off_loop(
+            history_tag,
+            lambda: {fws.flight.id: mock_flight_service.get_price_history(fws.flight.id) for fws in found}
+        )
+
+    items = [
+        FlightBatchItem(
+            flight=fws.flight,
+            score=fws.score,
+            facilities=fws.facilities,
+            priceHistory=histories.get(fws.flight.id)
+        )
+        for fws in found
+    ]
+    if projection is not None:
+        return _respond(accept, {"flights": project(items, projection), "missing": missing})
+    return _respond(accept, FlightBatchResponse(flights=items, missing=missing))
+
+
+@router.get(
+    "/compare",
+    response_model=FlightComparison,
+    summary="航班PK对比",
+    description=f"对比2~{settings.flight_compare_max_size}个航班的各评分维度、价格和时长"
+)
+async def compare(
+    ids: str = Query(..., description="航班ID，逗号分隔"),
+    persona: Optional[str] = Query(None, description="画像：business/family/student，决定加权总分的权重"),
+    accept: Optional[str] = Header(None, description=ACCEPT_DESCRIPTION)
+):
+    """
+    航班PK对比
+
+    返回按指标分列的紧凑结果：每列的数值、最优值、最优航班和各航班与最优值的差距，
+    以及按画像权重计算的加权总分和排名（第一个为推荐航班）
+    """
+    flight_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not 2 <= len(flight_ids) <= settings.flight_compare_max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"请选择2~{settings.flight_compare_max_size}个航班进行对比"
+        )
+    if persona is not None and persona not in PERSONA_WEIGHTS:
+        raise HTTPException(status_code=400, detail=f"不支持的画像: {persona}")
+
+    flights = mock_flight_service.get_flights(flight_ids)
+    if len(flights) != len(flight_ids):
+        found = {fws.flight.id for fws in flights}
+        missing = [flight_id for flight_id in flight_ids if flight_id not in found]
+        raise HTTPException(status_code=404, detail=f"航班不存在: {', '.join(missing)}")
+
+    return _respond(accept, compare_flights(flights, persona))
 
 
 @router.get(
@@ -92,7 +464,12 @@ async def search_flights(
     summary="获取航班详情",
     description="获取指定航班的完整详情，包括评分、设施和价格历史"
 )
-async def get_flight_detail(flight_id: str):
+async def get_flight_detail(
+    flight_id: str,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    accept: Optional[str] = Header(None, description=ACCEPT_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None, description="上次响应的 ETag，未变化时返回 304")
+):
     """
     获取航班详情
     
@@ -101,13 +478,29 @@ async def get_flight_detail(flight_id: str):
     - AirEase体验评分（4维度）
     - 机上设施详情
     - 7天价格历史
+
+    指定 fields 且不含 priceHistory 时不生成价格历史。
+    响应带强 ETag（价格/余座/评分变化时改变），If-None-Match 命中时返回 304
     """
-    detail = mock_flight_service.get_flight_detail(flight_id)
-    
-    if not detail:
-        raise HTTPException(status_code=404, detail="航班不存在")
-    
-    return detail
+    projection = _projection(fields, FlightDetail)
+    with_history = projection is None or "priceHistory" in projection.keys
+    history_tag = mock_flight_service.price_history_tag(flight_id) if with_history else ""
+    max_age = settings.flight_detail_max_age
+    etag, not_modified = _conditional(
+        flight_id, if_none_match, max_age, "detail", negotiate(accept), fields or "", history_tag
+    )
+    if not_modified is not None:
+        return not_modified
+
+    if not with_history:
+        content = projection.apply(mock_flight_service.get_flight(flight_id))
+    else:
+        detail = await _off_loop(history_tag, mock_flight_service.get_flight_detail, flight_id)
+        content = projection.apply(detail) if projection is not None else detail
+
+    response = _respond(accept, content)
+    response.headers.update(_validators(etag, max_age))
+    return response
 
 
 @router.get(
@@ -116,15 +509,26 @@ async def get_flight_detail(flight_id: str):
     summary="获取价格历史",
     description="获取航班的7天价格走势"
 )
-async def get_price_history(flight_id: str):
+async def get_price_history(
+    flight_id: str,
+    accept: Optional[str] = Header(None, description=ACCEPT_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None, description="上次响应的 ETag，未变化时返回 304")
+):
     """
     获取航班价格历史
     
-    返回最近7天的价格变化和趋势分析
+    返回最近7天的价格变化和趋势分析（来自后台采集的票价快照，没有快照时为模拟数据），
+    支持 ETag 条件请求
     """
-    history = mock_flight_service.get_price_history(flight_id)
-    
-    if not history:
-        raise HTTPException(status_code=404, detail="航班不存在")
-    
-    return history
+    max_age = settings.price_history_max_age
+    history_tag = mock_flight_service.price_history_tag(flight_id)
+    etag, not_modified = _conditional(
+        flight_id, if_none_match, max_age, "price-history", negotiate(accept), history_tag
+    )
+    if not_modified is not None:
+        return not_modified
+
+    history = await _off_loop(history_tag, mock_flight_service.get_price_history, flight_id)
+    response = _respond(accept, history)
+    response.headers.update(_validators(etag, max_age))
+    return response
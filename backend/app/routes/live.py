@@ -0,0 +1,128 @@
+"""
+AirEase Backend - Live Price Routes
+航班价格/余座实时推送（WebSocket）
+"""
+
+import asyncio
+import json
+from typing import List, Tuple
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.services.live_prices import (
+    Subscriber, flight_topic, live_hub, price_message, route_topic
+)
+from app.services.location_index import location_index
+from app.services.mock_service import mock_flight_service
+
+router = APIRouter(prefix="/v1/flights", tags=["Live"])
+
+# 慢消费者被断开时的关闭码（1013 Try Again Later）
+SLOW_CONSUMER_CLOSE_CODE = 1013
+# 收到二进制帧时的关闭码（1003 Unsupported Data）
+UNSUPPORTED_DATA_CLOSE_CODE = 1003
+
+
+def _route_topics(routes: List[str]) -> List[str]:
+    """航线（北京-上海 或 PEK-SHA）展开为各机场对的主题"""
+    topics = []
+    for route in routes:
+        origin, sep, destination = route.partition("-")
+        if not sep or not origin or not destination:
+            raise ValueError(f"航线格式应为 出发-到达：{route}")
+        topics += [route_topic(o, d) for o, d in location_index.airport_pairs(origin, destination)]
+    return topics
+
+
+def _parse(raw: str) -> Tuple[str, List[str], List[str]]:
+    """校验客户端消息，返回 (action, 航班ID, 航线)；格式错误时抛出 ValueError"""
+    message = json.loads(raw)
+    if not isinstance(message, dict):
+        raise ValueError("消息应为 JSON 对象")
+    lists = []
+    for key in ("flightIds", "routes"):
+        values = message.get(key) or []
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise ValueError(f"{key} 应为字符串数组")
+        lists.append(values)
+    return message.get("action"), lists[0], lists[1]
+
+
+def _topics(flight_ids: List[str], routes: List[str]) -> List[str]:
+    return [flight_topic(i) for i in flight_ids] + _route_topics(routes)
+
+
+async def _send_loop(websocket: WebSocket, subscriber: Subscriber) -> None:
+    """把队列中的消息发给客户端；被判定为慢消费者时关闭连接"""
+    while True:
+        text = await subscriber.next_message()
+        if text is None:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="slow consumer")
+            return
+        await websocket.send_text(text)
+
+
+async def _handle(websocket: WebSocket, subscriber: Subscriber, raw: str) -> None:
+    if subscriber.dropped:
+        return
+    try:
+        action, flight_ids, routes = _parse(raw)
+        if action == "subscribe":
+            # 只订阅存在的航班，并附带其当前价格/余座，客户端无需再请求一次详情
+            flights = mock_flight_service.get_flights(flight_ids)
+            found = [fws.flight.id for fws in flights]
+            found_ids = set(found)
+            live_hub.subscribe(subscriber, _topics(found, routes))
+            reply = {
+                "type": "subscribed",
+                "flights": [
+                    price_message(fws.flight, mock_flight_service.flight_version(fws.flight.id))
+                    for fws in flights
+                ],
+                "missing": [i for i in flight_ids if i not in found_ids],
+            }
+        elif action == "unsubscribe":
+            live_hub.unsubscribe(subscriber, _topics(flight_ids, routes))
+            reply = {"type": "unsubscribed"}
+        else:
+            raise ValueError("action 应为 subscribe 或 unsubscribe")
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        return
+
+    reply["topics"] = sorted(subscriber.topics)
+    await websocket.send_json(reply)
+
+
+@router.websocket("/live")
+async def live_prices(websocket: WebSocket):
+    """
+    实时价格/余座推送
+
+    客户端发送：
+    - {"action": "subscribe", "flightIds": [...], "routes": ["北京-上海", "PEK-SHA"]}
+    - {"action": "unsubscribe", "flightIds": [...], "routes": [...]}
+
+    服务端推送 {"type": "price", "flightId", "route", "cabin", "price", "seatsRemaining", "version", "ts"}，
+    订阅航线时还推送票价采集得到的 {"type": "fare", "route", "date", "cabin", "lowestPrice", "currency", "ts"}；
+    发送队列积压超过 LIVE_QUEUE_SIZE 条时以 1013 关闭连接，客户端应重连并重新订阅；
+    只接受文本帧，收到二进制帧时以 1003 关闭
+    """
+    await websocket.accept()
+    subscriber = live_hub.connect()
+    sender = asyncio.create_task(_send_loop(websocket, subscriber))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            text = message.get("text")
+            if text is None:
+                await websocket.close(code=UNSUPPORTED_DATA_CLOSE_CODE, reason="text frames only")
+                break
+            await _handle(websocket, subscriber, text)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_hub.disconnect(subscriber)
+        sender.cancel()
@@ -3,11 +3,14 @@ AirEase Backend - Amadeus Flight API Service
 真实航班数据服务（Amadeus API）
 """
 
+import asyncio
 import httpx
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 
 from app.config import settings
+from app.services.location_index import location_index
+from app.services.resilience import amadeus_policy, CircuitOpenError
 from app.models import (
     Flight, FlightScore, FlightFacilities, FlightWithScore,
     FlightDetail, PriceHistory, ScoreDimensions, ScoreExplanation
@@ -37,7 +40,7 @@ class AmadeusService:
         
         auth_url = f"{self.base_url}/v1/security/oauth2/token"
         
-        response = await self.client.post(
+        response = await amadeus_policy.call(lambda: self.client.post(
             auth_url,
             data={
                 "grant_type": "client_credentials",
@@ -45,7 +48,7 @@ class AmadeusService:
                 "client_secret": self.api_secret
             },
             headers={"Content-Type": "application/x-www-form-urlencoded"}
-        )
+        ))
         
         if response.status_code != 200:
             raise Exception(f"Amadeus auth failed: {response.text}")
@@ -66,20 +69,24 @@ class AmadeusService:
         """
         搜索航班
         
-        使用 Amadeus Flight Offers Search API
+        使用 Amadeus Flight Offers Search API。
+        熔断打开、超过截止时间或网络错误时返回空列表
         """
+        try:
+            return await self._search_flights(from_city, to_city, date, cabin)
+        except (CircuitOpenError, asyncio.TimeoutError, httpx.HTTPError) as e:
+            print(f"Amadeus search unavailable: {e}")
+            return []
+    
+    async def _search_flights(
+        self,
+        from_city: str,
+        to_city: str,
+        date: str,
+        cabin: str
+    ) -> List[FlightWithScore]:
         token = await self._get_access_token()
         
-        # 城市代码映射
-        city_codes = {
-            "北京": "PEK", "上海": "SHA", "广州": "CAN",
-            "深圳": "SZX", "成都": "CTU", "杭州": "HGH",
-            "武汉": "WUH", "西安": "XIY", "南京": "NKG"
-        }
-        
-        origin = city_codes.get(from_city, from_city)
-        destination = city_codes.get(to_city, to_city)
-        
         cabin_map = {
             "economy": "ECONOMY", "经济舱": "ECONOMY",
             "business": "BUSINESS", "公务舱": "BUSINESS",
@@ -87,6 +94,39 @@ class AmadeusService:
         }
         travel_class = cabin_map.get(cabin.lower(), "ECONOMY")
         
+        # 城市群展开为全部机场对（如 上海 -> SHA/PVG），并发查询
+        pairs = location_index.airport_pairs(from_city, to_city)
+        responses = await asyncio.gather(
+            *(self._search_pair(token, origin, destination, date, travel_class)
+              for origin, destination in pairs),
+            return_exceptions=True
+        )
+        
+        failures = [r for r in responses if isinstance(r, BaseException)]
+        if failures and len(failures) == len(responses):
+            raise failures[0]
+        
+        results = []
+        for (origin, destination), data in zip(pairs, responses):
+            if isinstance(data, BaseException):
+                print(f"Amadeus search {origin}-{destination} failed: {data}")
+                continue
+            # 多个机场对的 offer id 会重复，需要加上机场对前缀
+            id_prefix = f"amadeus-{origin}{destination}" if len(pairs) > 1 else "amadeus"
+            results.extend(self._transform_amadeus_response(data, from_city, to_city, cabin, id_prefix))
+        
+        results.sort(key=lambda f: f.flight.departure_time)
+        return results
+    
+    async def _search_pair(
+        self,
+        token: str,
+        origin: str,
+        destination: str,
+        date: str,
+        travel_class: str
+    ) -> Dict[str, Any]:
+        """查询单个机场对（非200时返回空结果，网络/熔断异常向上抛出）"""
         search_url = f"{self.base_url}/v2/shopping/flight-offers"
         
         params = {
@@ -99,43 +139,46 @@ class AmadeusService:
             "max": 20
         }
         
-        response = await self.client.get(
+        response = await amadeus_policy.call(lambda: self.client.get(
             search_url,
             params=params,
             headers={
                 "Authorization": f"Bearer {token}",
                 "Accept": "application/json"
             }
-        )
+        ))
         
         if response.status_code != 200:
             print(f"Amadeus search error: {response.text}")
-            return []
+            return {}
         
-        data = response.json()
-        return self._transform_amadeus_response(data, from_city, to_city, cabin)
+        return response.json()
     
     def _transform_amadeus_response(
         self,
         data: Dict[str, Any],
         from_city: str,
         to_city: str,
-        cabin: str
+        cabin: str,
+        id_prefix: str = "amadeus"
     ) -> List[FlightWithScore]:
         """转换Amadeus响应为内部格式"""
         results = []
         
         for i, offer in enumerate(data.get("data", [])):
             try:
-                segment = offer["itineraries"][0]["segments"][0]
+                segments = offer["itineraries"][0]["segments"]
+                segment, last = segments[0], segments[-1]
                 price = float(offer["price"]["total"])
                 
+                # 中转报价：起飞取首段，到达取末段，经停城市取各中间航段的到达机场
                 departure_dt = datetime.fromisoformat(segment["departure"]["at"].replace("Z", "+00:00"))
-                arrival_dt = datetime.fromisoformat(segment["arrival"]["at"].replace("Z", "+00:00"))
+                arrival_dt = datetime.fromisoformat(last["arrival"]["at"].replace("Z", "+00:00"))
+                stop_cities = [self._city_name(s["arrival"]["iataCode"]) for s in segments[:-1]]
                 duration_minutes = int((arrival_dt - departure_dt).total_seconds() / 60)
                 
                 flight = Flight(
-                    id=f"amadeus-{offer['id']}",
+                    id=f"{id_prefix}-{offer['id']}",
                     flightNumber=f"{segment['carrierCode']}{segment['number']}",
                     airline=segment.get("carrierCode", "Unknown"),
                     airlineCode=segment["carrierCode"],
@@ -145,12 +188,13 @@ class AmadeusService:
                     departureAirportCode=segment["departure"]["iataCode"],
                     departureTime=departure_dt,
                     arrivalCity=to_city,
-                    arrivalCityCode=segment["arrival"]["iataCode"],
-                    arrivalAirport=segment["arrival"]["iataCode"],
-                    arrivalAirportCode=segment["arrival"]["iataCode"],
+                    arrivalCityCode=last["arrival"]["iataCode"],
+                    arrivalAirport=last["arrival"]["iataCode"],
+                    arrivalAirportCode=last["arrival"]["iataCode"],
                     arrivalTime=arrival_dt,
                     durationMinutes=duration_minutes,
-                    stops=len(offer["itineraries"][0]["segments"]) - 1,
+                    stops=len(segments) - 1,
+                    stopCities=stop_cities or None,
                     cabin=cabin,
                     aircraftModel=segment.get("aircraft", {}).get("code"),
                     price=price,
@@ -173,6 +217,12 @@ class AmadeusService:
         
         return results
     
+    @staticmethod
+    def _city_name(iata_code: str) -> str:
+        """机场代码 -> 城市名（未收录的机场原样返回代码）"""
+        airport = location_index.airport(iata_code)
+        return airport.city if airport else iata_code
+    
     def _generate_score(self, flight: Flight) -> FlightScore:
         """基于航班属性生成评分"""
         # 简化评分逻辑
@@ -0,0 +1,81 @@
+"""
+AirEase Backend - Compare Service
+多航班PK对比：按列（各评分维度、价格、时长）一次计算最优者、差距、加权总分和排名
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from app.models import ComparisonMetric, FlightComparison, FlightWithScore
+
+# 各画像的维度权重（与客户端 UserPersona.scoreWeights 一致）
+PERSONA_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "default": {"safety": 0.25, "comfort": 0.30, "service": 0.20, "value": 0.25},
+    "business": {"safety": 0.25, "comfort": 0.35, "service": 0.25, "value": 0.15},
+    "family": {"safety": 0.35, "comfort": 0.30, "service": 0.25, "value": 0.10},
+    "student": {"safety": 0.20, "comfort": 0.20, "service": 0.15, "value": 0.45},
+}
+
+DIMENSIONS = ("safety", "comfort", "service", "value")
+
+
+class Column(NamedTuple):
+    """对比的一列"""
+    name: str
+    higher_is_better: bool
+    values: List[float]
+
+
+def _columns(flights: Sequence[FlightWithScore]) -> List[Column]:
+    """每个对比指标取出一列"""
+    dimensions = [fws.score.dimensions for fws in flights]
+    columns = [
+        Column(name, True, [getattr(d, name) for d in dimensions])
+        for name in DIMENSIONS
+    ]
+    columns.append(Column("overallScore", True, [fws.score.overall_score for fws in flights]))
+    columns.append(Column("price", False, [fws.flight.price for fws in flights]))
+    columns.append(Column("durationMinutes", False, [float(fws.flight.duration_minutes) for fws in flights]))
+    return columns
+
+
+def compare_flights(flights: Sequence[FlightWithScore], persona: Optional[str] = None) -> FlightComparison:
+    """
+    对比多个航班
+
+    每列求最优值、并列最优的航班和各航班与最优值的差距（均 >= 0）；
+    按画像权重对四个评分维度加权得到总分，总分相同时价格低者靠前
+    """
+    persona = persona or "default"
+    weights = PERSONA_WEIGHTS[persona]
+    ids = [fws.flight.id for fws in flights]
+    columns = _columns(flights)
+
+    metrics = []
+    for column in columns:
+        best = max(column.values) if column.higher_is_better else min(column.values)
+        metrics.append(ComparisonMetric(
+            name=column.name,
+            higherIsBetter=column.higher_is_better,
+            values=column.values,
+            best=best,
+            winners=[i for i, v in zip(ids, column.values) if v == best],
+            deltas=[round(abs(v - best), 2) for v in column.values]
+        ))
+
+    totals = [0.0] * len(flights)
+    for column in columns[:len(DIMENSIONS)]:
+        weight = weights[column.name]
+        totals = [total + weight * value for total, value in zip(totals, column.values)]
+    totals = [round(total, 2) for total in totals]
+
+    prices = columns[-2].values
+    order = sorted(range(len(flights)), key=lambda i: (-totals[i], prices[i]))
+
+    return FlightComparison(
+        persona=persona,
+        weights=weights,
+        flightIds=ids,
+        metrics=metrics,
+        weightedTotals=totals,
+        rank=[ids[i] for i in order]
+    )
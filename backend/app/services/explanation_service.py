@@ -0,0 +1,86 @@
+"""
+AirEase Backend - Score Explanation Service
+AI评分解释：航班描述规范化 + 热门航线批量预计算
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.models import FlightWithScore
+from app.services.gemini_service import gemini_service
+from app.services.mock_service import mock_flight_service
+
+PERSONAS = ["business", "family", "student"]
+
+# 正在运行的预计算任务（同一时间只运行一个）
+_precompute_task: Optional[asyncio.Task] = None
+
+
+def format_flight_info(fws: FlightWithScore) -> str:
+    """航班信息文本（同一航班总是得到相同文本，便于命中缓存）"""
+    flight = fws.flight
+    stops = "直飞" if flight.stops == 0 else f"经停{'、'.join(flight.stop_cities or [])}"
+    return (
+        f"{flight.airline} {flight.flight_number}，"
+        f"{flight.departure_city}({flight.departure_airport_code}) → "
+        f"{flight.arrival_city}({flight.arrival_airport_code})，"
+        f"{flight.departure_time.strftime('%H:%M')}-{flight.arrival_time.strftime('%H:%M')}，"
+        f"{flight.duration_minutes}分钟，{stops}，{flight.cabin}，"
+        f"机型{flight.aircraft_model or '未知'}，¥{flight.price:.0f}"
+    )
+
+
+def format_score_info(fws: FlightWithScore) -> str:
+    """评分信息文本"""
+    score = fws.score
+    dims = score.dimensions
+    highlights = "、".join(h for h in score.highlights if h) or "无"
+    return (
+        f"综合{score.overall_score}分；安全{dims.safety}、舒适{dims.comfort}、"
+        f"服务{dims.service}、性价比{dims.value}；亮点：{highlights}"
+    )
+
+
+def explanation_request(fws: FlightWithScore, persona: str) -> Dict[str, str]:
+    """构造 generate_score_explanation 的参数"""
+    return {
+        "flight_info": format_flight_info(fws),
+        "score_info": format_score_info(fws),
+        "persona": persona
+    }
+
+
+async def precompute_popular_explanations(
+    top_n: Optional[int] = None,
+    personas: Optional[List[str]] = None,
+    concurrency: Optional[int] = None
+) -> int:
+    """
+    为每条航线近期（AI_PRECOMPUTE_DAYS 天内出发）评分最高的航班预生成各画像的AI解释
+
+    作为后台任务运行，返回处理的 (航班, 画像) 数量
+    """
+    flights = mock_flight_service.top_flights_by_route(
+        top_n or settings.ai_precompute_top_n, days=settings.ai_precompute_days
+    )
+    items = [
+        explanation_request(fws, persona)
+        for fws in flights
+        for persona in (personas or PERSONAS)
+    ]
+    await gemini_service.generate_score_explanations(items, concurrency=concurrency)
+    print(f"Precomputed {len(items)} AI explanations")
+    return len(items)
+
+
+def schedule_precompute(
+    top_n: Optional[int] = None,
+    personas: Optional[List[str]] = None
+) -> Optional[asyncio.Task]:
+    """启动预计算后台任务；上一次任务仍在运行时不重复启动，返回None"""
+    global _precompute_task
+    if _precompute_task is not None and not _precompute_task.done():
+        return None
+    _precompute_task = asyncio.create_task(precompute_popular_explanations(top_n=top_n, personas=personas))
+    return _precompute_task
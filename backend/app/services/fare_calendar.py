@@ -0,0 +1,92 @@
+"""
+AirEase Backend - Fare Calendar
+低价日历：(出发机场, 到达机场, 舱位, 日期) -> 最低价
+
+库存或价格变化时增量更新；只有当前最低价的航班涨价或下架时才重算该格。
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.models import Flight
+
+CellKey = Tuple[str, str, str, date]
+
+
+class FareCalendar:
+    """按天的航线最低价表"""
+
+    def __init__(self):
+        # 每格：航班ID -> 价格
+        self._cells: Dict[CellKey, Dict[str, float]] = {}
+        self._min: Dict[CellKey, float] = {}
+        self._flight_cells: Dict[str, CellKey] = {}
+
+    @staticmethod
+    def cell_key(flight: Flight) -> CellKey:
+        return (
+            flight.departure_airport_code,
+            flight.arrival_airport_code,
+            flight.cabin,
+            flight.departure_time.date()
+        )
+
+    def rebuild(self, flights: Sequence[Flight]) -> None:
+        """全量重建"""
+        self._cells.clear()
+        self._min.clear()
+        self._flight_cells.clear()
+        for flight in flights:
+            self.upsert(flight)
+
+    def upsert(self, flight: Flight) -> None:
+        """新增航班或更新价格"""
+        key = self.cell_key(flight)
+        if self._flight_cells.get(flight.id, key) != key:
+            self.remove(flight.id)
+
+        cell = self._cells.setdefault(key, {})
+        previous = cell.get(flight.id)
+        cell[flight.id] = flight.price
+        self._flight_cells[flight.id] = key
+
+        current_min = self._min.get(key)
+        if current_min is None or flight.price <= current_min:
+            self._min[key] = flight.price
+        elif previous == current_min:
+            # 原最低价航班涨价
+            self._min[key] = min(cell.values())
+
+    def remove(self, flight_id: str) -> None:
+        """航班下架"""
+        key = self._flight_cells.pop(flight_id, None)
+        if key is None:
+            return
+        cell = self._cells[key]
+        price = cell.pop(flight_id)
+        if not cell:
+            del self._cells[key]
+            del self._min[key]
+        elif price == self._min[key]:
+            self._min[key] = min(cell.values())
+
+    def min_price(self, origin: str, destination: str, cabin: str, day: date) -> Optional[float]:
+        return self._min.get((origin, destination, cabin, day))
+
+    def calendar(
+        self,
+        pairs: Sequence[Tuple[str, str]],
+        cabin: str,
+        start: date,
+        days: int
+    ) -> List[Tuple[date, Optional[float]]]:
+        """连续 days 天每天的最低价（跨全部机场对），无航班的日期为None"""
+        results = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            prices = [
+                price for price in (self._min.get((o, d, cabin, day)) for o, d in pairs)
+                if price is not None
+            ]
+            results.append((day, min(prices) if prices else None))
+        return results
@@ -0,0 +1,163 @@
+"""
+AirEase Backend - Fare History
+票价快照时间序列（airease.db 的 fare_snapshots 表）
+
+- 按 (fare_key, ts) 索引，单个航班一段时间内的快照只走索引范围扫描
+- 批量写入使用 executemany，按 FARE_INGEST_BATCH_SIZE 分块，整批一个事务
+- fare_key 是航线市场（出发机场|到达机场|起飞日期|舱位），不是单个航班号：
+  采集到的报价与 Mock 库存的航班号/时刻对不上，但航线、日期和舱位一致，
+  价格历史因此是该市场每天的最低价走势，同市场的所有航班共享
+- 价格历史按天取当天最后一轮采集中的最低价；表不存在或没有数据时返回None，由调用方退回模拟数据
+- 每个 fare_key 最近一次快照时间保存在内存中（写入后更新，启动时加载）：
+  ETag 计算和"有没有快照"的判断不访问数据库，没有快照的航班不查询
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+from app.database import FareSnapshotDB, engine
+from app.models import Flight, PriceHistory, PricePoint, PriceTrend
+
+PRICE_HISTORY_DAYS = 7
+# 首尾价格变化超过该比例视为上涨/下跌
+TREND_THRESHOLD = 0.03
+
+TABLE = FareSnapshotDB.__table__
+
+
+def fare_key(flight: Flight) -> str:
+    """
+    航班所在市场在多次采集、不同数据源之间稳定的键：出发机场|到达机场|起飞日期|舱位
+
+    Amadeus 的 offer id 只是单次响应内的序号；航班号和时刻在 Mock 库存与上游之间不一致，
+    都不能用作时间序列的键
+    """
+    return (
+        f"{flight.departure_airport_code}|{flight.arrival_airport_code}"
+        f"|{flight.departure_time:%Y-%m-%d}|{flight.cabin}"
+    )
+
+
+def trend_of(prices: Sequence[float]) -> PriceTrend:
+    if len(prices) < 2 or prices[0] <= 0:
+        return PriceTrend.STABLE
+    change = (prices[-1] - prices[0]) / prices[0]
+    if change > TREND_THRESHOLD:
+        return PriceTrend.RISING
+    if change < -TREND_THRESHOLD:
+        return PriceTrend.FALLING
+    return PriceTrend.STABLE
+
+
+class FareHistoryStore:
+    """fare_snapshots 表的读写"""
+
+    def __init__(self, engine: Engine, batch_size: int):
+        self.engine = engine
+        self.batch_size = batch_size
+        # fare_key -> 最近一次快照时间（只保留价格历史窗口内的）
+        self._latest: Dict[str, datetime] = {}
+
+    def insert_snapshots(self, flights: Sequence[Flight], ts: datetime) -> int:
+        """批量写入一轮采集的快照（同步，采集任务在线程池中调用）"""
+        rows = [
+            {
+                "fare_key": fare_key(flight),
+                "origin": flight.departure_airport_code,
+                "destination": flight.arrival_airport_code,
+                "departure_date": flight.departure_time.strftime("%Y-%m-%d"),
+                "price": flight.price,
+                "currency": flight.currency,
+                "seats_remaining": flight.seats_remaining,
+                "ts": ts,
+            }
+            for flight in flights
+        ]
+        with self.engine.begin() as conn:
+            for start in range(0, len(rows), self.batch_size):
+                conn.execute(TABLE.insert(), rows[start:start + self.batch_size])
+        # 提交后再更新（单个 dict 赋值在 GIL 下是原子的，可在线程池中执行）
+        for row in rows:
+            if ts > self._latest.get(row["fare_key"], datetime.min):
+                self._latest[row["fare_key"]] = ts
+        self._prune()
+        return len(rows)
+
+    def load_latest(self) -> int:
+        """从数据库加载价格历史窗口内各 fare_key 的最近快照时间（启动时在线程池中调用）"""
+        query = (
+            select(TABLE.c.fare_key, func.max(TABLE.c.ts))
+            .where(TABLE.c.ts >= self._window_start())
+            .group_by(TABLE.c.fare_key)
+        )
+        try:
+            with self.engine.connect() as conn:
+                self._latest.update({key: ts for key, ts in conn.execute(query)})
+        except OperationalError:
+            return 0
+        return len(self._latest)
+
+    @staticmethod
+    def _window_start(days: int = PRICE_HISTORY_DAYS) -> datetime:
+        return datetime.combine(datetime.now().date() - timedelta(days=days - 1), datetime.min.time())
+
+    def _prune(self) -> None:
+        cutoff = self._window_start()
+        stale = [key for key, ts in list(self._latest.items()) if ts < cutoff]
+        for key in stale:
+            self._latest.pop(key, None)
+
+    def snapshots(self, flight: Flight, since: datetime) -> List[tuple]:
+        """航班所在市场的快照 (ts, price, seats_remaining)，按时间升序"""
+        query = (
+            select(TABLE.c.ts, TABLE.c.price, TABLE.c.seats_remaining)
+            .where(TABLE.c.fare_key == fare_key(flight), TABLE.c.ts >= since)
+            .order_by(TABLE.c.ts)
+        )
+        try:
+            with self.engine.connect() as conn:
+                return [tuple(row) for row in conn.execute(query)]
+        except OperationalError:
+            # 表尚未创建（未运行 init_db）
+            return []
+
+    def latest_ts(self, flight: Flight) -> Optional[datetime]:
+        """该航班最近一次快照时间（内存中，用于价格历史的 ETag，不访问数据库）"""
+        return self._latest.get(fare_key(flight))
+
+    def price_history(self, flight: Flight, days: int = PRICE_HISTORY_DAYS) -> Optional[PriceHistory]:
+        """
+        最近 days 天该市场每天最后一轮采集的最低价，没有快照时为None
+
+        有快照时查询数据库，请求路径上应在线程池中调用
+        """
+        if fare_key(flight) not in self._latest:
+            return None
+        since = self._window_start(days)
+        # 日期 -> (该天最后一轮采集时间, 该轮最低价)
+        daily: Dict[str, tuple] = {}
+        for ts, price, _ in self.snapshots(flight, since):
+            day = ts.strftime("%Y-%m-%d")
+            last = daily.get(day)
+            if last is None or ts > last[0]:
+                daily[day] = (ts, price)
+            elif ts == last[0]:
+                daily[day] = (ts, min(price, last[1]))
+        if not daily:
+            return None
+        prices = [price for _, price in daily.values()]
+        return PriceHistory(
+            flightId=flight.id,
+            points=[PricePoint(date=day, price=price) for day, (_, price) in daily.items()],
+            currentPrice=flight.price,
+            trend=trend_of(prices)
+        )
+
+
+# Singleton instance
+fare_history = FareHistoryStore(engine, settings.fare_ingest_batch_size)
@@ -0,0 +1,148 @@
+"""
+AirEase Backend - Fare Ingestion
+后台票价快照采集：定时对关注的航线/日期调用 AmadeusService.search_flights，批量写入 fare_snapshots
+
+- 每个 (航线, 日期, 舱位) 一次查询，同时进行的查询数受 FARE_INGEST_CONCURRENCY 限制
+  （城市群在 Amadeus 服务内部再展开为机场对）
+- SQLite 写入在线程池中执行，事件循环上只等待网络 I/O，不阻塞请求处理
+- 单次查询失败只记录日志；整轮失败等待下一周期重试
+- 航线市场（航线/日期/舱位）最低价与上一轮不同时推送给实时订阅者（航线主题）
+- AMADEUS_BASE_URL 指向本地桩服务（python -m tests.stubs amadeus）即可离线运行
+"""
+
+import asyncio
+from datetime import date as date_type, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.amadeus_service import amadeus_service
+from app.models import Flight
+from app.services.fare_history import FareHistoryStore, fare_history, fare_key
+from app.services.live_prices import LiveHub, live_hub
+from app.services.mock_service import CABIN_NAMES
+
+# (出发, 到达, 日期, 舱位)
+Target = Tuple[str, str, str, str]
+
+
+def parse_routes(spec: str) -> List[Tuple[str, str]]:
+    """逗号分隔的 出发-到达（如 北京-上海,PEK-CAN）-> [(出发, 到达)]"""
+    routes = []
+    for item in spec.split(","):
+        origin, sep, destination = item.strip().partition("-")
+        if sep and origin and destination:
+            routes.append((origin.strip(), destination.strip()))
+        elif item.strip():
+            print(f"⚠️ Fare ingestion: ignoring route {item.strip()!r}")
+    return routes
+
+
+class FareIngestionJob:
+    """定时票价快照采集"""
+
+    def __init__(
+        self,
+        source,
+        store: FareHistoryStore,
+        routes: List[Tuple[str, str]],
+        cabins: List[str],
+        days_ahead: int,
+        interval_seconds: float,
+        concurrency: int,
+        hub: Optional[LiveHub] = None
+    ):
+        # source 需提供 async search_flights(from_city, to_city, date, cabin)
+        self.source = source
+        self.store = store
+        self.routes = routes
+        # 统一为中文舱位名，与 Mock 库存的 fare_key 一致
+        self.cabins = [CABIN_NAMES.get(cabin.strip().lower(), cabin.strip()) for cabin in cabins if cabin.strip()]
+        self.days_ahead = days_ahead
+        self.interval_seconds = interval_seconds
+        self.concurrency = concurrency
+        self.hub = hub or live_hub
+        # fare_key -> 上一轮采集到的最低价
+        self._lowest: Dict[str, float] = {}
+        self.runs = 0
+        self.last_run: Optional[datetime] = None
+        self.last_count = 0
+
+    def targets(self, today: date_type) -> List[Target]:
+        dates = [(today + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(self.days_ahead)]
+        return [
+            (origin, destination, day, cabin)
+            for origin, destination in self.routes
+            for day in dates
+            for cabin in self.cabins
+        ]
+
+    async def run_once(self, today: Optional[date_type] = None) -> int:
+        """采集一轮，返回写入的快照数"""
+        targets = self.targets(today or date_type.today())
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(target: Target):
+            async with semaphore:
+                try:
+                    return await self.source.search_flights(*target)
+                except Exception as e:
+                    print(f"⚠️ Fare ingestion {'/'.join(target)} failed: {e}")
+                    return []
+
+        results = await asyncio.gather(*(fetch(target) for target in targets))
+        flights = [fws.flight for batch in results for fws in batch]
+        count = 0
+        if flights:
+            count = await asyncio.to_thread(self.store.insert_snapshots, flights, datetime.now())
+            self._publish_changes(flights)
+        self.runs += 1
+        self.last_run = datetime.now()
+        self.last_count = count
+        print(f"📈 Fare ingestion: {count} snapshots from {len(targets)} searches")
+        return count
+
+    def _publish_changes(self, flights: List[Flight]) -> int:
+        """推送最低价与上一轮不同的航线市场，返回推送数"""
+        lowest: Dict[str, Flight] = {}
+        for flight in flights:
+            key = fare_key(flight)
+            if key not in lowest or flight.price < lowest[key].price:
+                lowest[key] = flight
+        previous = self._lowest
+        # 只保留本轮采集到的市场，过期的出发日期不会一直留在内存中
+        self._lowest = {key: flight.price for key, flight in lowest.items()}
+        published = 0
+        for key, flight in lowest.items():
+            if previous.get(key) == flight.price:
+                continue
+            self.hub.publish_fare(
+                flight.departure_airport_code,
+                flight.arrival_airport_code,
+                flight.departure_time.strftime("%Y-%m-%d"),
+                flight.cabin,
+                flight.price,
+                flight.currency
+            )
+            published += 1
+        return published
+
+    async def run_forever(self) -> None:
+        """按 interval_seconds 周期运行（在 lifespan 中作为后台任务启动）"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"⚠️ Fare ingestion run failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+
+# Singleton instance
+fare_ingestion_job = FareIngestionJob(
+    amadeus_service,
+    fare_history,
+    parse_routes(settings.fare_ingest_routes),
+    settings.fare_ingest_cabins.split(","),
+    settings.fare_ingest_days_ahead,
+    settings.fare_ingest_interval_seconds,
+    settings.fare_ingest_concurrency
+)
@@ -3,31 +3,67 @@ AirEase Backend - Gemini AI Service
 Gemini LLM 智能搜索服务
 """
 
+import asyncio
+import hashlib
 import httpx
 import json
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, List, AsyncIterator, Set, Tuple
 
 from app.config import settings
+from app.metrics import record_cache
 from app.models import SearchQuery
+from app.services.query_parser import query_parser
+from app.services.query_index import query_index
+from app.services.resilience import gemini_policy, CircuitOpenError
+
+EXPLANATION_UNAVAILABLE = "暂无AI解释"
+
+PERSONA_NAMES = {
+    "business": "商务出行者",
+    "family": "家庭出行者",
+    "student": "学生旅客"
+}
 
 
 class GeminiService:
     """Gemini AI 服务 - 自然语言解析"""
     
-    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
     MODEL = "gemini-3-flash-preview-exp"
     
     def __init__(self):
         self.api_key = settings.gemini_api_key
+        self.base_url = settings.gemini_base_url
         self.client = httpx.AsyncClient(timeout=30.0)
+        # 评分解释缓存：内容哈希 -> 解释文本（LRU）
+        self._explanation_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._explanation_inflight: Dict[str, asyncio.Future] = {}
+        # 评分解释微批处理：窗口内收集的 ((flight_info, score_info, persona), future)
+        self._explanation_batch: List[Tuple[Tuple[str, str, str], asyncio.Future]] = []
+        self._explanation_batch_timer: Optional[asyncio.TimerHandle] = None
+        self._explanation_batch_tasks: Set[asyncio.Task] = set()
     
     async def parse_flight_query(self, natural_language: str) -> Dict[str, Any]:
         """
         解析自然语言搜索请求
         
         例如: "下周三北京到上海的公务舱" -> SearchQuery
+
+        先走本地规则解析，置信度足够时直接返回，不调用Gemini；
+        其次查近似查询索引，复用相同实体的已解析结果
         """
+        local_result = query_parser.parse(natural_language)
+        local_hit = local_result["confidence"] >= settings.local_parse_threshold
+        record_cache("ai_local_parse", local_hit)
+        if local_hit:
+            return local_result
+
+        cached = query_index.lookup(natural_language)
+        record_cache("ai_query_index", cached is not None)
+        if cached is not None:
+            return cached
+
         today = datetime.now().strftime("%Y-%m-%d")
         
         system_prompt = f"""你是一个航班搜索助手。用户会用自然语言描述他们想要搜索的航班。
@@ -44,7 +80,7 @@ class GeminiService:
 如果某个字段无法确定，请设为null。
 只返回JSON，不要有其他文字。"""
         
-        endpoint = f"{self.BASE_URL}/models/{self.MODEL}:generateContent?key={self.api_key}"
+        endpoint = f"{self.base_url}/models/{self.MODEL}:generateContent?key={self.api_key}"
         
         request_body = {
             "contents": [
@@ -62,11 +98,11 @@ class GeminiService:
         }
         
         try:
-            response = await self.client.post(
+            response = await gemini_policy.call(lambda: self.client.post(
                 endpoint,
                 json=request_body,
                 headers={"Content-Type": "application/json"}
-            )
+            ))
             
             if response.status_code != 200:
                 print(f"Gemini API error: {response.status_code} - {response.text}")
@@ -79,7 +115,7 @@ class GeminiService:
             text = text.replace("```json", "").replace("```", "").strip()
             
             parsed = json.loads(text)
-            return {
+            result = {
                 "parsed_query": {
                     "from": parsed.get("fromCity"),
                     "to": parsed.get("toCity"),
@@ -90,6 +126,8 @@ class GeminiService:
                 "original_query": natural_language,
                 "suggestions": []
             }
+            query_index.add(natural_language, result)
+            return result
             
         except Exception as e:
             print(f"Gemini parse error: {e}")
@@ -101,22 +139,264 @@ class GeminiService:
         score_info: str,
         persona: str = "business"
     ) -> str:
-        """生成航班评分解释"""
-        persona_map = {
-            "business": "商务出行者",
-            "family": "家庭出行者",
-            "student": "学生旅客"
+        """
+        生成航班评分解释
+
+        输出只取决于航班信息、评分信息和用户画像，按内容哈希缓存；
+        相同内容的并发请求共享同一次Gemini调用；
+        开启微批处理时，窗口内的请求合并为一次Gemini调用
+        """
+        key = self._explanation_key(flight_info, score_info, persona)
+        cached = self._explanation_cache.get(key)
+        record_cache("ai_explanation", cached is not None)
+        if cached is not None:
+            self._explanation_cache.move_to_end(key)
+            return cached
+
+        pending = self._explanation_inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._explanation_inflight[key] = future
+        try:
+            text = await self._dispatch_explanation(flight_info, score_info, persona)
+            if text != EXPLANATION_UNAVAILABLE:
+                self._store_explanation(key, text)
+            future.set_result(text)
+            return text
+        finally:
+            self._explanation_inflight.pop(key, None)
+            if not future.done():
+                future.set_result(EXPLANATION_UNAVAILABLE)
+
+    async def generate_score_explanations(
+        self,
+        items: List[Dict[str, str]],
+        concurrency: Optional[int] = None
+    ) -> List[str]:
+        """
+        批量生成评分解释
+
+        items 每项包含 flight_info / score_info / persona，
+        最多 concurrency 个请求同时在途，结果顺序与输入一致
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.ai_explain_concurrency)
+
+        async def run(item: Dict[str, str]) -> str:
+            async with semaphore:
+                return await self.generate_score_explanation(
+                    flight_info=item["flight_info"],
+                    score_info=item.get("score_info", ""),
+                    persona=item.get("persona") or "business"
+                )
+
+        return await asyncio.gather(*(run(item) for item in items))
+
+    def _explanation_key(self, flight_info: str, score_info: str, persona: str) -> str:
+        """评分解释的内容地址"""
+        payload = json.dumps([self.MODEL, persona, flight_info, score_info], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _store_explanation(self, key: str, text: str) -> None:
+        self._explanation_cache[key] = text
+        self._explanation_cache.move_to_end(key)
+        while len(self._explanation_cache) > settings.ai_explanation_cache_size:
+            self._explanation_cache.popitem(last=False)
+
+    async def _dispatch_explanation(self, flight_info: str, score_info: str, persona: str) -> str:
+        """单独请求，或在开启微批处理时进入当前批处理窗口"""
+        window_ms = settings.ai_explain_batch_window_ms
+        if window_ms <= 0:
+            return await self._request_score_explanation(flight_info, score_info, persona)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._explanation_batch.append(((flight_info, score_info, persona), future))
+        if len(self._explanation_batch) >= settings.ai_explain_batch_max_size:
+            self._flush_explanation_batch()
+        elif self._explanation_batch_timer is None:
+            self._explanation_batch_timer = loop.call_later(window_ms / 1000, self._flush_explanation_batch)
+        return await future
+
+    def _flush_explanation_batch(self) -> None:
+        """结束当前窗口，后台发出合并请求"""
+        if self._explanation_batch_timer is not None:
+            self._explanation_batch_timer.cancel()
+            self._explanation_batch_timer = None
+        batch, self._explanation_batch = self._explanation_batch, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run_explanation_batch(batch))
+        self._explanation_batch_tasks.add(task)
+        task.add_done_callback(self._explanation_batch_tasks.discard)
+
+    async def _run_explanation_batch(
+        self,
+        batch: List[Tuple[Tuple[str, str, str], asyncio.Future]]
+    ) -> None:
+        """执行一个批次并把结果分发给各个等待者，解析失败的条目单独重试"""
+        try:
+            if len(batch) == 1:
+                results: List[Optional[str]] = [await self._request_score_explanation(*batch[0][0])]
+            else:
+                results = await self._request_score_explanations_combined([args for args, _ in batch])
+
+            missing = [i for i, text in enumerate(results) if text is None]
+            if missing:
+                retried = await asyncio.gather(*(
+                    self._request_score_explanation(*batch[i][0]) for i in missing
+                ))
+                for i, text in zip(missing, retried):
+                    results[i] = text
+
+            for (_, future), text in zip(batch, results):
+                if not future.done():
+                    future.set_result(text)
+        finally:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(EXPLANATION_UNAVAILABLE)
+
+    async def _request_score_explanations_combined(
+        self,
+        items: List[Tuple[str, str, str]]
+    ) -> List[Optional[str]]:
+        """
+        一次Gemini调用生成多条评分解释
+
+        要求模型返回 [{"id": 编号, "explanation": 文本}]；
+        请求失败或某条缺失/无法解析时对应位置为None
+        """
+        sections = []
+        for index, (flight_info, score_info, persona) in enumerate(items):
+            sections.append(
+                f"[id={index}] 用户身份: {PERSONA_NAMES.get(persona, '旅客')}\n"
+                f"航班信息:\n{flight_info}\n评分信息:\n{score_info}"
+            )
+        prompt = f"""你是AirEase航班体验评分系统的解说员。
+下面有{len(items)}个航班，请分别用简洁友好的语言解释每个航班的评分。
+根据每项标注的用户身份，突出与他们最相关的信息，每条限制在100字以内。
+只返回JSON数组，格式为 [{{"id": 编号, "explanation": "解释"}}]，不要有其他文字。
+
+""" + "\n\n".join(sections)
+
+        endpoint = f"{self.base_url}/models/{self.MODEL}:generateContent?key={self.api_key}"
+        request_body = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "temperature": 0.7,
+                "maxOutputTokens": min(256 * len(items), 8192),
+                "responseMimeType": "application/json"
+            }
         }
-        persona_name = persona_map.get(persona, "旅客")
+
+        try:
+            response = await gemini_policy.call(lambda: self.client.post(
+                endpoint,
+                json=request_body,
+                headers={"Content-Type": "application/json"}
+            ))
+            if response.status_code != 200:
+                return [None] * len(items)
+
+            text = self._candidate_text(response.json())
+            text = text.replace("```json", "").replace("```", "").strip()
+            parsed = json.loads(text)
+
+            explanations: Dict[int, str] = {}
+            for entry in parsed if isinstance(parsed, list) else []:
+                if not isinstance(entry, dict):
+                    continue
+                explanation = entry.get("explanation")
+                if isinstance(explanation, str) and explanation.strip():
+                    try:
+                        explanations[int(entry.get("id"))] = explanation.strip()
+                    except (TypeError, ValueError):
+                        continue
+            return [explanations.get(i) for i in range(len(items))]
+
+        except Exception as e:
+            print(f"Gemini batch explanation error: {e}")
+            return [None] * len(items)
+
+    async def stream_score_explanation(
+        self,
+        flight_info: str,
+        score_info: str,
+        persona: str = "business"
+    ) -> AsyncIterator[str]:
+        """
+        流式生成航班评分解释
+
+        使用 streamGenerateContent (SSE) 逐块返回文本；已缓存时一次性返回。
+        消费方提前关闭生成器时会同时关闭上游连接。
+        """
+        key = self._explanation_key(flight_info, score_info, persona)
+        cached = self._explanation_cache.get(key)
+        record_cache("ai_explanation", cached is not None)
+        if cached is not None:
+            self._explanation_cache.move_to_end(key)
+            yield cached
+            return
+
+        endpoint = f"{self.base_url}/models/{self.MODEL}:streamGenerateContent?alt=sse&key={self.api_key}"
+        request_body = self._explanation_request_body(flight_info, score_info, persona)
+        chunks: List[str] = []
+        
+        try:
+            request = self.client.build_request(
+                "POST",
+                endpoint,
+                json=request_body,
+                headers={"Content-Type": "application/json"}
+            )
+            response = await gemini_policy.call(
+                lambda: self.client.send(request, stream=True),
+                allow_hedge=False
+            )
+            try:
+                if response.status_code != 200:
+                    yield EXPLANATION_UNAVAILABLE
+                    return
+                
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    text = self._candidate_text(json.loads(line[5:].strip()))
+                    if text:
+                        chunks.append(text)
+                        yield text
+            finally:
+                await response.aclose()
+                        
+        except (httpx.HTTPError, json.JSONDecodeError, CircuitOpenError, asyncio.TimeoutError) as e:
+            print(f"Gemini stream error: {e}")
+            if not chunks:
+                yield EXPLANATION_UNAVAILABLE
+            return
+        
+        full_text = "".join(chunks).strip()
+        if full_text:
+            self._store_explanation(key, full_text)
+        elif not chunks:
+            yield EXPLANATION_UNAVAILABLE
+
+    def _explanation_request_body(
+        self,
+        flight_info: str,
+        score_info: str,
+        persona: str
+    ) -> Dict[str, Any]:
+        """评分解释的Gemini请求体"""
+        persona_name = PERSONA_NAMES.get(persona, "旅客")
         
         system_prompt = f"""你是AirEase航班体验评分系统的解说员。
 请用简洁友好的语言解释这个航班的评分。
 根据用户的{persona_name}身份，突出与他们最相关的信息。
 限制在100字以内。"""
         
-        endpoint = f"{self.BASE_URL}/models/{self.MODEL}:generateContent?key={self.api_key}"
-        
-        request_body = {
+        return {
             "contents": [
                 {
                     "role": "user",
@@ -128,24 +408,37 @@ class GeminiService:
                 "maxOutputTokens": 256
             }
         }
+
+    @staticmethod
+    def _candidate_text(data: Dict[str, Any]) -> str:
+        """取第一个候选的文本"""
+        return data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+
+    async def _request_score_explanation(
+        self,
+        flight_info: str,
+        score_info: str,
+        persona: str
+    ) -> str:
+        """调用Gemini生成评分解释"""
+        endpoint = f"{self.base_url}/models/{self.MODEL}:generateContent?key={self.api_key}"
+        request_body = self._explanation_request_body(flight_info, score_info, persona)
         
         try:
-            response = await self.client.post(
+            response = await gemini_policy.call(lambda: self.client.post(
                 endpoint,
                 json=request_body,
                 headers={"Content-Type": "application/json"}
-            )
+            ))
             
             if response.status_code != 200:
-                return "暂无AI解释"
+                return EXPLANATION_UNAVAILABLE
             
-            data = response.json()
-            text = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-            return text.strip()
+            return self._candidate_text(response.json()).strip()
             
         except Exception as e:
             print(f"Gemini explanation error: {e}")
-            return "暂无AI解释"
+            return EXPLANATION_UNAVAILABLE
     
     def _map_cabin(self, cabin: str) -> str:
         """映射舱位到英文"""
@@ -160,48 +453,8 @@ class GeminiService:
         return mapping.get(cabin, "economy")
     
     def _fallback_parse(self, query: str) -> Dict[str, Any]:
-        """后备解析 - 关键词匹配"""
-        cities = ["北京", "上海", "广州", "深圳", "成都", "杭州", "武汉", "西安", "南京", "重庆"]
-        
-        from_city = None
-        to_city = None
-        cabin = "economy"
-        date = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
-        
-        # 尝试匹配城市
-        for city in cities:
-            if city in query:
-                if from_city is None:
-                    from_city = city
-                elif to_city is None and city != from_city:
-                    to_city = city
-        
-        # 匹配舱位
-        if "公务" in query or "商务" in query:
-            cabin = "business"
-        elif "头等" in query:
-            cabin = "first"
-        
-        # 匹配日期关键词
-        if "明天" in query:
-            date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-        elif "后天" in query:
-            date = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d")
-        elif "下周" in query:
-            days_until_next_week = 7 - datetime.now().weekday()
-            date = (datetime.now() + timedelta(days=days_until_next_week)).strftime("%Y-%m-%d")
-        
-        return {
-            "parsed_query": {
-                "from": from_city,
-                "to": to_city,
-                "date": date,
-                "cabin": cabin
-            } if from_city and to_city else None,
-            "confidence": 0.5 if from_city and to_city else 0.0,
-            "original_query": query,
-            "suggestions": ["请输入出发城市和目的地城市"] if not (from_city and to_city) else []
-        }
+        """后备解析 - 本地规则解析器"""
+        return query_parser.parse(query)
     
     async def close(self):
         """关闭HTTP客户端"""
@@ -0,0 +1,218 @@
+"""
+AirEase Backend - Itinerary Service
+中转行程构建：由直飞库存拼接一次中转的行程
+
+- 航线图：(出发机场, 舱位) -> 可达机场；每条 (出发, 到达, 舱位) 的航段按起飞时间排序
+- 每个首段在中转机场形成一个到达时间标签，次段在
+  [到达 + 最短衔接时间, 到达 + 最长衔接时间] 内二分截取
+- 首段固定时，被其他次段在 价格/到达时间/评分 上支配的次段直接剪枝
+- 中转机场、首段的行程下界已被现有结果支配时跳过（标签剪枝）
+- 结果按 价格 / 总时长 / 评分 取 Pareto 最优
+"""
+
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Sequence, Set, Tuple, TypeVar
+
+from app.models import FlightWithScore, Itinerary
+
+T = TypeVar("T")
+
+RouteKey = Tuple[str, str, str]
+# (价格, 总时长秒, -平均评分, 序号, 航段)
+Candidate = Tuple[float, float, float, int, Tuple[FlightWithScore, ...]]
+
+
+def _skyline(rows: Sequence[Tuple]) -> List[Tuple]:
+    """
+    三目标非支配集：rows 的前三个分量为目标（越小越好），且已按字典序排序
+
+    已入选者的第一分量必然不大于当前行，只需比较后两个分量；后面的行不可能支配前面的行
+    """
+    front: List[Tuple[float, float]] = []
+    results: List[Tuple] = []
+    for row in rows:
+        second, third = row[1], row[2]
+        for kept_second, kept_third in front:
+            if kept_second <= second and kept_third <= third:
+                break
+        else:
+            front.append((second, third))
+            results.append(row)
+    return results
+
+
+def pareto_front(items: Sequence[T], key: Callable[[T], Tuple[float, float, float]]) -> List[T]:
+    """三目标非支配集（key 的各分量越小越好），按 key 排序返回"""
+    rows = sorted(((*key(item), index) for index, item in enumerate(items)))
+    return [items[row[3]] for row in _skyline(rows)]
+
+
+def _dominated(front: Sequence[Tuple], bound: Tuple[float, float, float]) -> bool:
+    """front 中是否有行在三个目标上都不差于 bound"""
+    price, duration, negative_score = bound
+    for row in front:
+        if row[0] <= price and row[1] <= duration and row[2] <= negative_score:
+            return True
+    return False
+
+
+def _score(segments: Sequence[FlightWithScore]) -> float:
+    """行程评分：各航段评分的平均值（对每个航段单调，剪枝依赖这一点）"""
+    return round(sum(s.score.overall_score for s in segments) / len(segments), 1)
+
+
+class _Legs:
+    """
+    一条 (出发, 到达, 舱位) 航线的直飞航段
+
+    按起飞时间排序，数值列预先取出，搜索时只做二分和数值比较
+    """
+
+    __slots__ = (
+        "flights", "departures", "arrivals", "prices", "scores",
+        "min_price", "min_duration", "max_score"
+    )
+
+    def __init__(self, flights: List[FlightWithScore]):
+        self.flights = flights
+        self.departures = [f.flight.departure_time.timestamp() for f in flights]
+        self.arrivals = [f.flight.arrival_time.timestamp() for f in flights]
+        self.prices = [f.flight.price for f in flights]
+        self.scores = [f.score.overall_score for f in flights]
+        # 剪枝下界
+        self.min_price = min(self.prices)
+        self.min_duration = min(a - d for d, a in zip(self.departures, self.arrivals))
+        self.max_score = max(self.scores)
+
+    def between(self, start: float, end: float) -> range:
+        """起飞时间在 [start, end) 内的航段下标"""
+        return range(bisect_left(self.departures, start), bisect_left(self.departures, end))
+
+
+class ConnectionBuilder:
+    """中转行程引擎（库存变化时重建）"""
+
+    def __init__(self, min_connection_minutes: int = 45, max_connection_minutes: int = 360):
+        self.min_connection = timedelta(minutes=min_connection_minutes)
+        self.max_connection = timedelta(minutes=max_connection_minutes)
+        self._legs: Dict[RouteKey, _Legs] = {}
+        self._outbound: Dict[Tuple[str, str], Set[str]] = {}
+
+    def rebuild(self, route_index: Dict[RouteKey, List[FlightWithScore]]) -> None:
+        """由 (出发机场, 到达机场, 舱位) -> 按起飞时间排序的航班 构建航线图，只使用直飞航段"""
+        legs: Dict[RouteKey, _Legs] = {}
+        outbound: Dict[Tuple[str, str], Set[str]] = {}
+        for (origin, destination, cabin), flights in route_index.items():
+            direct = [f for f in flights if f.flight.stops == 0]
+            if direct:
+                legs[(origin, destination, cabin)] = _Legs(direct)
+                outbound.setdefault((origin, cabin), set()).add(destination)
+        self._legs = legs
+        self._outbound = outbound
+
+    def search(
+        self,
+        origins: Sequence[str],
+        destinations: Sequence[str],
+        cabin: str,
+        window: Tuple[datetime, datetime],
+        max_stops: int = 1,
+        limit: int = 20
+    ) -> List[Itinerary]:
+        """
+        搜索 window 内起飞的直飞和一次中转行程
+
+        origins/destinations 为机场代码（城市群已展开），返回 Pareto 最优行程，按价格、时长排序
+        """
+        start, end = window[0].timestamp(), window[1].timestamp()
+        min_connection = self.min_connection.total_seconds()
+        max_connection = self.max_connection.total_seconds()
+        origin_set, destination_set = set(origins), set(destinations)
+
+        # 候选行：(价格, 总时长, -平均评分, 序号, 航段)；front 始终是当前的非支配集
+        front: List[Candidate] = []
+        rows: List[Candidate] = []
+        for origin in origins:
+            for destination in destinations:
+                legs = self._legs.get((origin, destination, cabin))
+                if legs is None:
+                    continue
+                for i in legs.between(start, end):
+                    rows.append((
+                        legs.prices[i], legs.arrivals[i] - legs.departures[i], -legs.scores[i],
+                        len(rows), (legs.flights[i],)
+                    ))
+        front = _skyline(sorted(rows))
+        if max_stops < 1:
+            return [self._itinerary(row[4]) for row in front[:limit]]
+
+        for origin in origins:
+            for hub in self._outbound.get((origin, cabin), ()):
+                if hub in origin_set or hub in destination_set:
+                    continue
+                onward = [
+                    self._legs[(hub, destination, cabin)] for destination in destinations
+                    if (hub, destination, cabin) in self._legs
+                ]
+                if not onward:
+                    continue
+                first_legs = self._legs[(origin, hub, cabin)]
+                onward_price = min(legs.min_price for legs in onward)
+                onward_duration = min(legs.min_duration for legs in onward) + min_connection
+                onward_score = max(legs.max_score for legs in onward)
+                # 经该中转机场的行程下界已被现有结果支配时整体跳过
+                if _dominated(front, (
+                    first_legs.min_price + onward_price,
+                    first_legs.min_duration + onward_duration,
+                    -(first_legs.max_score + onward_score) / 2
+                )):
+                    continue
+
+                rows = list(front)
+                for i in first_legs.between(start, end):
+                    departure, arrival = first_legs.departures[i], first_legs.arrivals[i]
+                    price, score = first_legs.prices[i], first_legs.scores[i]
+                    if _dominated(front, (
+                        price + onward_price,
+                        arrival + onward_duration - departure,
+                        -(score + onward_score) / 2
+                    )):
+                        continue
+                    # 首段固定时，次段按 价格/到达时间/评分 剪枝
+                    seconds = _skyline(sorted(
+                        (legs.prices[j], legs.arrivals[j], -legs.scores[j], k, j)
+                        for k, legs in enumerate(onward)
+                        for j in legs.between(arrival + min_connection, arrival + max_connection + 1)
+                    ))
+                    first = first_legs.flights[i]
+                    for second_price, second_arrival, negative_score, k, j in seconds:
+                        rows.append((
+                            price + second_price,
+                            second_arrival - departure,
+                            (negative_score - score) / 2,
+                            len(rows),
+                            (first, onward[k].flights[j])
+                        ))
+                front = _skyline(sorted(rows))
+
+        return [self._itinerary(row[4]) for row in front[:limit]]
+
+    @staticmethod
+    def _itinerary(segments: Tuple[FlightWithScore, ...]) -> Itinerary:
+        first, last = segments[0].flight, segments[-1].flight
+        return Itinerary(
+            id="+".join(s.flight.id for s in segments),
+            segments=[s.flight for s in segments],
+            stops=len(segments) - 1,
+            connectionAirports=[s.flight.arrival_airport_code for s in segments[:-1]],
+            layoverMinutes=[
+                int((b.flight.departure_time - a.flight.arrival_time).total_seconds() // 60)
+                for a, b in zip(segments, segments[1:])
+            ],
+            totalPrice=sum(s.flight.price for s in segments),
+            totalDurationMinutes=int((last.arrival_time - first.departure_time).total_seconds() // 60),
+            score=_score(segments),
+            departureTime=first.departure_time,
+            arrivalTime=last.arrival_time
+        )
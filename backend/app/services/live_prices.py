@@ -0,0 +1,215 @@
+"""
+AirEase Backend - Live Prices
+航班价格/余座实时推送的发布订阅中心
+
+- 主题：flight:<航班ID>、route:<出发机场>-<到达机场>
+- 发布方：库存价格/余座变化（航班+航线主题），后台票价采集发现航线市场最低价变化（航线主题）
+- 每个连接一个有界发送队列；队列满（慢消费者）时断开该连接，不拖慢发布方和其他订阅者
+- 空闲订阅只占用主题表中的集合项和一个阻塞在队列上的协程，没有轮询
+- 发布经由可替换的 broker：默认进程内直接投递；多 worker 部署时可换成跨进程实现
+  （如 Redis pub/sub），由其在每个 worker 上调用 LiveHub.deliver
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from app.config import settings
+from app.metrics import live_connections, live_dropped
+from app.models import Flight
+
+Deliver = Callable[[Tuple[str, ...], dict], None]
+
+
+def flight_topic(flight_id: str) -> str:
+    return f"flight:{flight_id}"
+
+
+def route_topic(origin: str, destination: str) -> str:
+    return f"route:{origin.upper()}-{destination.upper()}"
+
+
+def price_message(flight: Flight, version: Optional[int] = None) -> dict:
+    """推送给客户端的价格/余座消息"""
+    return {
+        "type": "price",
+        "flightId": flight.id,
+        "route": f"{flight.departure_airport_code}-{flight.arrival_airport_code}",
+        "cabin": flight.cabin,
+        "price": flight.price,
+        "seatsRemaining": flight.seats_remaining,
+        "version": version,
+        "ts": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def fare_message(
+    origin: str,
+    destination: str,
+    departure_date: str,
+    cabin: str,
+    lowest_price: float,
+    currency: str
+) -> dict:
+    """推送给客户端的航线市场最低价消息（来自票价采集）"""
+    return {
+        "type": "fare",
+        "route": f"{origin.upper()}-{destination.upper()}",
+        "date": departure_date,
+        "cabin": cabin,
+        "lowestPrice": lowest_price,
+        "currency": currency,
+        "ts": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+class Subscriber:
+    """一个连接的订阅状态和发送队列"""
+
+    __slots__ = ("queue", "topics", "loop", "dropped")
+
+    def __init__(self, queue_size: int):
+        self.queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=queue_size)
+        self.topics: Set[str] = set()
+        self.loop = asyncio.get_running_loop()
+        self.dropped = False
+
+    async def next_message(self) -> Optional[str]:
+        """下一条待发送的消息（JSON 文本）；被判定为慢消费者后为None"""
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """进程内 broker：发布即投递给本进程的订阅者"""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    def attach(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    def publish(self, topics: Tuple[str, ...], message: dict) -> None:
+        if self._deliver is not None:
+            self._deliver(topics, message)
+
+
+class LiveHub:
+    """主题 -> 订阅者 的发布订阅中心"""
+
+    def __init__(self, queue_size: int, max_topics: int, broker=None):
+        self.queue_size = queue_size
+        self.max_topics = max_topics
+        self._topics: Dict[str, Set[Subscriber]] = {}
+        self._subscribers: Set[Subscriber] = set()
+        self.broker = broker or InProcessBroker()
+        self.broker.attach(self.deliver)
+
+    # ------------------------------------------------------------
+    # 连接与订阅（在连接所在的事件循环中调用）
+    # ------------------------------------------------------------
+
+    def connect(self) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        live_connections.inc()
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        if subscriber not in self._subscribers:
+            return
+        self._subscribers.discard(subscriber)
+        self.unsubscribe(subscriber, list(subscriber.topics))
+        live_connections.dec()
+
+    def subscribe(self, subscriber: Subscriber, topics: Iterable[str]) -> None:
+        """订阅主题，超过每连接上限时抛出 ValueError（不做部分订阅）"""
+        new_topics = set(topics) - subscriber.topics
+        if len(subscriber.topics) + len(new_topics) > self.max_topics:
+            raise ValueError(f"每个连接最多订阅 {self.max_topics} 个主题")
+        for topic in new_topics:
+            self._topics.setdefault(topic, set()).add(subscriber)
+        subscriber.topics |= new_topics
+
+    def unsubscribe(self, subscriber: Subscriber, topics: Iterable[str]) -> None:
+        for topic in topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[topic]
+            subscriber.topics.discard(topic)
+
+    # ------------------------------------------------------------
+    # 发布与投递
+    # ------------------------------------------------------------
+
+    def publish_flight(self, flight: Flight, version: Optional[int] = None) -> None:
+        """发布航班价格/余座变化（航班主题和航线主题）"""
+        topics = (
+            flight_topic(flight.id),
+            route_topic(flight.departure_airport_code, flight.arrival_airport_code),
+        )
+        self.broker.publish(topics, price_message(flight, version))
+
+    def publish_fare(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: str,
+        cabin: str,
+        lowest_price: float,
+        currency: str = "CNY"
+    ) -> None:
+        """发布航线市场（航线/日期/舱位）最低价变化（航线主题）"""
+        self.broker.publish(
+            (route_topic(origin, destination),),
+            fare_message(origin, destination, departure_date, cabin, lowest_price, currency)
+        )
+
+    def deliver(self, topics: Tuple[str, ...], message: dict) -> None:
+        """
+        投递给本进程中订阅了任一主题的连接（每个连接最多一次）
+
+        消息只序列化一次；订阅者属于其他线程的事件循环时经 call_soon_threadsafe 投递
+        """
+        targets: Set[Subscriber] = set()
+        for topic in topics:
+            targets.update(self._topics.get(topic, ()))
+        if not targets:
+            return
+        text = json.dumps(message, ensure_ascii=False)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for subscriber in targets:
+            if subscriber.loop is running:
+                self._offer(subscriber, text)
+            else:
+                subscriber.loop.call_soon_threadsafe(self._offer, subscriber, text)
+
+    def _offer(self, subscriber: Subscriber, text: str) -> None:
+        if subscriber.dropped:
+            return
+        try:
+            subscriber.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        """慢消费者：取消全部订阅，清空队列并放入结束标记"""
+        subscriber.dropped = True
+        self.disconnect(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+        live_dropped.inc()
+        print(f"⚠️ Live prices: dropped slow consumer ({self.queue_size} messages queued)")
+
+    def stats(self) -> Dict[str, int]:
+        return {"connections": len(self._subscribers), "topics": len(self._topics)}
+
+
+# Singleton instance
+live_hub = LiveHub(settings.live_queue_size, settings.live_max_topics)
@@ -0,0 +1,280 @@
+"""
+AirEase Backend - Location Index
+城市/机场统一解析索引（中文名、IATA城市/机场代码、拼音、英文名）
+
+- 精确查找：规范化后查哈希表，O(1)
+- 前缀查找：有序键 + 二分（仅用于输入联想，搜索时不做前缀补全）
+- 容错查找：拼音/英文名的删除变体索引（SymSpell），再用编辑距离校验
+"""
+
+from bisect import bisect_left
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+
+class Airport(NamedTuple):
+    """机场"""
+    code: str
+    name: str
+    city: str
+    aliases: Tuple[str, ...] = ()
+
+
+class City(NamedTuple):
+    """城市（airports 第一个为主机场）"""
+    name: str
+    code: str
+    pinyin: str
+    english: Tuple[str, ...]
+    airports: Tuple[Airport, ...]
+
+
+class Location(NamedTuple):
+    """解析结果：指向具体机场时 airport 不为None"""
+    city: City
+    airport: Optional[Airport] = None
+
+    @property
+    def airports(self) -> Tuple[Airport, ...]:
+        """该位置覆盖的机场"""
+        return (self.airport,) if self.airport else self.city.airports
+
+
+def _city(name: str, code: str, pinyin: str, english: Tuple[str, ...], *airports) -> City:
+    return City(
+        name=name,
+        code=code,
+        pinyin=pinyin,
+        english=english,
+        airports=tuple(Airport(a_code, a_name, name, aliases) for a_code, a_name, aliases in airports)
+    )
+
+
+# ============================================================
+# Location Data
+# ============================================================
+
+CITIES = [
+    _city("北京", "BJS", "beijing", ("Beijing", "Peking"),
+          ("PEK", "首都国际机场", ("首都机场",)),
+          ("PKX", "大兴国际机场", ("大兴机场",))),
+    _city("上海", "SHA", "shanghai", ("Shanghai",),
+          ("SHA", "虹桥国际机场", ("虹桥", "虹桥机场")),
+          ("PVG", "浦东国际机场", ("浦东", "浦东机场"))),
+    _city("广州", "CAN", "guangzhou", ("Guangzhou", "Canton"),
+          ("CAN", "白云国际机场", ("白云机场",))),
+    _city("深圳", "SZX", "shenzhen", ("Shenzhen",),
+          ("SZX", "宝安国际机场", ("宝安机场",))),
+    _city("成都", "CTU", "chengdu", ("Chengdu",),
+          ("CTU", "双流国际机场", ("双流机场",)),
+          ("TFU", "天府国际机场", ("天府机场",))),
+    _city("杭州", "HGH", "hangzhou", ("Hangzhou",),
+          ("HGH", "萧山国际机场", ("萧山机场",))),
+    _city("武汉", "WUH", "wuhan", ("Wuhan",),
+          ("WUH", "天河国际机场", ("天河机场",))),
+    _city("西安", "SIA", "xian", ("Xi'an",),
+          ("XIY", "咸阳国际机场", ("咸阳机场",))),
+    _city("南京", "NKG", "nanjing", ("Nanjing",),
+          ("NKG", "禄口国际机场", ("禄口机场",))),
+    _city("重庆", "CKG", "chongqing", ("Chongqing",),
+          ("CKG", "江北国际机场", ("江北机场",))),
+    _city("厦门", "XMN", "xiamen", ("Xiamen", "Amoy"),
+          ("XMN", "高崎国际机场", ("高崎机场",))),
+    _city("昆明", "KMG", "kunming", ("Kunming",),
+          ("KMG", "长水国际机场", ("长水机场",))),
+    _city("青岛", "TAO", "qingdao", ("Qingdao", "Tsingtao"),
+          ("TAO", "胶东国际机场", ("胶东机场",))),
+    _city("长沙", "CSX", "changsha", ("Changsha",),
+          ("CSX", "黄花国际机场", ("黄花机场",))),
+    _city("三亚", "SYX", "sanya", ("Sanya",),
+          ("SYX", "凤凰国际机场", ("凤凰机场",))),
+    _city("天津", "TSN", "tianjin", ("Tianjin",),
+          ("TSN", "滨海国际机场", ("滨海机场",))),
+    _city("大连", "DLC", "dalian", ("Dalian",),
+          ("DLC", "周水子国际机场", ("周水子机场",))),
+    _city("郑州", "CGO", "zhengzhou", ("Zhengzhou",),
+          ("CGO", "新郑国际机场", ("新郑机场",))),
+    _city("海口", "HAK", "haikou", ("Haikou",),
+          ("HAK", "美兰国际机场", ("美兰机场",))),
+    _city("沈阳", "SHE", "shenyang", ("Shenyang",),
+          ("SHE", "桃仙国际机场", ("桃仙机场",))),
+]
+
+# 容错查找只用于不短于该长度的拼音/英文键
+FUZZY_MIN_LENGTH = 4
+
+_IGNORED_CHARS = str.maketrans("", "", " '’-·_")
+
+
+def normalize(text: str) -> str:
+    """规范化查找键：去空白/撇号/连字符，ASCII转小写，去掉"市"后缀"""
+    key = text.strip().translate(_IGNORED_CHARS).casefold()
+    if len(key) > 2 and key.endswith("市"):
+        key = key[:-1]
+    return key
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """带相邻换位的编辑距离（OSA），超过 limit 时提前返回 limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _max_typos(key: str) -> int:
+    return 1 if len(key) < 7 else 2
+
+
+def _deletes(key: str, distance: int) -> Set[str]:
+    """key 删除至多 distance 个字符得到的所有变体（含自身）"""
+    variants = {key}
+    frontier = {key}
+    for _ in range(distance):
+        frontier = {v[:i] + v[i + 1:] for v in frontier for i in range(len(v))}
+        variants |= frontier
+    return variants
+
+
+# ============================================================
+# Location Index
+# ============================================================
+
+class LocationIndex:
+    """城市/机场解析索引（启动时一次性构建，之后只读）"""
+
+    def __init__(self, cities: List[City] = CITIES):
+        self._cities: Dict[str, City] = {}
+        self._airports: Dict[str, Airport] = {}
+        self._exact: Dict[str, Location] = {}
+        self._aliases: List[Tuple[str, str]] = []
+        self._fuzzy: Dict[str, Set[str]] = {}
+
+        for city in cities:
+            self._cities[city.name] = city
+            city_location = Location(city)
+            for key in (city.name, city.code, city.pinyin) + city.english:
+                self._add(key, city_location)
+            for airport in city.airports:
+                self._airports[airport.code] = airport
+                airport_location = Location(city, airport)
+                for key in (airport.code, airport.name, f"{city.name}{airport.name}") + airport.aliases:
+                    # 城市代码与机场代码相同时（如 SHA），按机场解析
+                    self._add(key, airport_location, override=True)
+
+        self._sorted_keys = sorted(self._exact)
+
+    def _add(self, key: str, location: Location, override: bool = False) -> None:
+        self._aliases.append((key, location.city.name))
+        normalized = normalize(key)
+        if override or normalized not in self._exact:
+            self._exact[normalized] = location
+        if normalized.isascii() and len(normalized) >= FUZZY_MIN_LENGTH:
+            for variant in _deletes(normalized, _max_typos(normalized)):
+                self._fuzzy.setdefault(variant, set()).add(normalized)
+
+    # ------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------
+
+    def lookup(self, text: str) -> Optional[Location]:
+        """精确查找"""
+        return self._exact.get(normalize(text))
+
+    def prefix(self, text: str, limit: int = 10) -> List[Location]:
+        """前缀查找，按键的字典序返回去重后的位置"""
+        key = normalize(text)
+        if not key:
+            return []
+        results: List[Location] = []
+        index = bisect_left(self._sorted_keys, key)
+        while index < len(self._sorted_keys) and len(results) < limit:
+            candidate = self._sorted_keys[index]
+            if not candidate.startswith(key):
+                break
+            location = self._exact[candidate]
+            if location not in results:
+                results.append(location)
+            index += 1
+        return results
+
+    def fuzzy(self, text: str) -> Optional[Location]:
+        """容错查找（拼音/英文名的拼写错误），有多个同样接近的城市时返回None"""
+        key = normalize(text)
+        if not key.isascii() or len(key) < FUZZY_MIN_LENGTH - 1:
+            return None
+        best: Dict[str, int] = {}
+        for variant in _deletes(key, 2):
+            for candidate in self._fuzzy.get(variant, ()):
+                if candidate in best:
+                    continue
+                limit = _max_typos(candidate)
+                distance = _edit_distance(key, candidate, limit)
+                if distance <= limit:
+                    best[candidate] = distance
+        if not best:
+            return None
+        closest = min(best.values())
+        locations = {self._exact[c] for c, d in best.items() if d == closest}
+        if len({location.city.name for location in locations}) != 1:
+            return None
+        return min(locations, key=lambda location: location.airport is not None)
+
+    def resolve(self, text: str) -> Optional[Location]:
+        """
+        依次尝试精确、容错查找，无法确定时返回None
+
+        不做前缀补全：搜索时 "dali" 会被补全成大连、"上" 会被补全成上海，
+        悄悄搜索了错误的航线；前缀查找只用于输入联想（prefix）
+        """
+        location = self.lookup(text)
+        if location is not None:
+            return location
+        return self.fuzzy(text)
+
+    # ------------------------------------------------------------
+    # Accessors
+    # ------------------------------------------------------------
+
+    def city(self, name: str) -> Optional[City]:
+        return self._cities.get(name)
+
+    def airport(self, code: str) -> Optional[Airport]:
+        return self._airports.get(code.upper())
+
+    def airports(self) -> List[Airport]:
+        return list(self._airports.values())
+
+    def aliases(self) -> Iterator[Tuple[str, str]]:
+        """全部 (名称/代码/拼音/别名, 城市名)，用于自由文本词典匹配"""
+        return iter(self._aliases)
+
+    def airport_pairs(self, from_text: str, to_text: str) -> List[Tuple[str, str]]:
+        """
+        出发/到达城市群展开后的全部机场对
+
+        如 上海 -> 北京 展开为 SHA/PVG x PEK/PKX；无法解析的一侧原样使用
+        """
+        origins = self._airport_codes(from_text)
+        destinations = self._airport_codes(to_text)
+        return [(o, d) for o in origins for d in destinations if o != d]
+
+    def _airport_codes(self, text: str) -> List[str]:
+        location = self.resolve(text)
+        if location is None:
+            return [text]
+        return [airport.code for airport in location.airports]
+
+
+# Singleton instance
+location_index = LocationIndex()
@@ -3,116 +3,173 @@ AirEase Backend - Mock Data Service
 模拟航班数据服务
 """
 
-from datetime import datetime, timedelta
-from typing import List, Optional
+from bisect import bisect_left
+from datetime import date as date_type, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import heapq
 import random
 import uuid
 
 from app.models import (
     Flight, FlightScore, FlightFacilities, FlightWithScore,
     FlightDetail, PriceHistory, PricePoint, PriceTrend,
-    ScoreDimensions, ScoreExplanation
+    ScoreDimensions, ScoreExplanation, Itinerary
 )
+from app.config import settings
+from app.services.fare_calendar import FareCalendar
+from app.services.fare_history import fare_history
+from app.services.itinerary_service import ConnectionBuilder
+from app.services.live_prices import live_hub
+from app.services.location_index import Location, location_index
+
+CABIN_NAMES = {
+    "economy": "经济舱",
+    "business": "公务舱",
+    "first": "头等舱",
+    "经济舱": "经济舱",
+    "公务舱": "公务舱",
+    "头等舱": "头等舱"
+}
+
+
+def cabin_name(cabin: str) -> str:
+    """舱位参数 -> 库存中的舱位名，未知时为经济舱"""
+    return CABIN_NAMES.get(cabin, "经济舱")
 
 
 class MockFlightService:
     """Mock航班数据服务"""
     
+    AIRLINES = [
+        ("CA", "中国国航"),
+        ("MU", "东方航空"),
+        ("CZ", "南方航空"),
+        ("HU", "海南航空"),
+        ("3U", "四川航空"),
+        ("ZH", "深圳航空"),
+        ("FM", "上海航空"),
+        ("MF", "厦门航空"),
+    ]
+    
+    CABINS = ["经济舱", "公务舱", "头等舱"]
+    
+    AIRCRAFTS = [
+        "Boeing 787-9", "Boeing 737-800", "Boeing 777-300",
+        "Airbus A320", "Airbus A330", "Airbus A350", "Airbus A321"
+    ]
+    
+    # 合成大规模库存使用的机场（城市, 代码, 机场名）
+    SYNTHETIC_AIRPORTS = [(a.city, a.code, a.name) for a in location_index.airports()]
+    
     def __init__(self):
         self._flights: List[FlightWithScore] = []
+        # (出发机场, 到达机场, 舱位) -> 按起飞时间排序的航班
+        self._route_index: Dict[Tuple[str, str, str], List[FlightWithScore]] = {}
+        # 航班ID -> 航班
+        self._by_id: Dict[str, FlightWithScore] = {}
+        # 库存版本：库存或价格/余座变化时递增（用作响应缓存键的一部分）
+        self.version = 0
+        # 航班ID -> 该航班最后一次变化时的库存版本（用于生成 ETag）
+        self._flight_versions: Dict[str, int] = {}
+        # 进程内实例标识：模拟库存每次启动随机生成，版本号不能跨进程比较
+        self.epoch = uuid.uuid4().hex[:8]
+        self.fare_calendar = FareCalendar()
+        self.connections = ConnectionBuilder(
+            settings.min_connection_minutes, settings.max_connection_minutes
+        )
         self._generate_mock_flights()
+        self._index_inventory()
     
     def _generate_mock_flights(self):
         """生成模拟航班数据"""
-        airlines = [
-            ("CA", "中国国航"),
-            ("MU", "东方航空"),
-            ("CZ", "南方航空"),
-            ("HU", "海南航空"),
-            ("3U", "四川航空"),
-            ("ZH", "深圳航空"),
-            ("FM", "上海航空"),
-            ("MF", "厦门航空"),
-        ]
-        
         routes = [
-            ("北京", "PEK", "首都国际机场", "上海", "SHA", "虹桥国际机场"),
-            ("北京", "PEK", "首都国际机场", "上海", "PVG", "浦东国际机场"),
-            ("上海", "SHA", "虹桥国际机场", "北京", "PEK", "首都国际机场"),
-            ("广州", "CAN", "白云国际机场", "北京", "PEK", "首都国际机场"),
-            ("深圳", "SZX", "宝安国际机场", "上海", "SHA", "虹桥国际机场"),
-            ("成都", "TFU", "天府国际机场", "北京", "PEK", "首都国际机场"),
-            ("杭州", "HGH", "萧山国际机场", "北京", "PEK", "首都国际机场"),
-            ("武汉", "WUH", "天河国际机场", "上海", "SHA", "虹桥国际机场"),
-        ]
-        
-        cabins = ["经济舱", "公务舱", "头等舱"]
-        aircrafts = [
-            "Boeing 787-9", "Boeing 737-800", "Boeing 777-300",
-            "Airbus A320", "Airbus A330", "Airbus A350", "Airbus A321"
+            ("PEK", "SHA"), ("PEK", "PVG"), ("SHA", "PEK"), ("CAN", "PEK"),
+            ("SZX", "SHA"), ("TFU", "PEK"), ("HGH", "PEK"), ("WUH", "SHA"),
         ]
         
         flight_id = 1
-        base_date = datetime.now() + timedelta(days=3)
+        today = datetime.now()
         
-        for route in routes:
-            from_city, from_code, from_airport, to_city, to_code, to_airport = route
-            
-            for _ in range(random.randint(3, 6)):
-                airline_code, airline_name = random.choice(airlines)
-                flight_number = f"{airline_code}{random.randint(1000, 9999)}"
-                
-                hour = random.randint(6, 21)
-                minute = random.choice([0, 15, 30, 45])
-                departure_time = base_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-                
-                duration = random.randint(120, 200)
-                arrival_time = departure_time + timedelta(minutes=duration)
-                
-                cabin = random.choice(cabins)
-                base_price = {
-                    "经济舱": random.randint(800, 1500),
-                    "公务舱": random.randint(2500, 4500),
-                    "头等舱": random.randint(5000, 8000)
-                }[cabin]
-                
-                stops = random.choices([0, 1], weights=[85, 15])[0]
-                
-                flight = Flight(
-                    id=f"flight-{flight_id}",
-                    flightNumber=flight_number,
-                    airline=airline_name,
-                    airlineCode=airline_code,
-                    departureCity=from_city,
-                    departureCityCode=from_code,
-                    departureAirport=from_airport,
-                    departureAirportCode=from_code,
-                    departureTime=departure_time,
-                    arrivalCity=to_city,
-                    arrivalCityCode=to_code,
-                    arrivalAirport=to_airport,
-                    arrivalAirportCode=to_code,
-                    arrivalTime=arrival_time,
-                    durationMinutes=duration,
-                    stops=stops,
-                    stopCities=["武汉"] if stops > 0 else None,
-                    cabin=cabin,
-                    aircraftModel=random.choice(aircrafts),
-                    price=float(base_price),
-                    currency="CNY",
-                    seatsRemaining=random.randint(1, 50)
-                )
-                
-                score = self._generate_score(flight)
-                facilities = self._generate_facilities(cabin)
-                
-                self._flights.append(FlightWithScore(
-                    flight=flight,
-                    score=score,
-                    facilities=facilities
-                ))
-                
-                flight_id += 1
+        for from_code, to_code in routes:
+            origin = location_index.airport(from_code)
+            destination = location_index.airport(to_code)
+            route = (origin.city, origin.code, origin.name, destination.city, destination.code, destination.name)
+            # 从今天起 mock_inventory_days 天，每天 3-6 个航班
+            for day in range(settings.mock_inventory_days):
+                base_date = today + timedelta(days=day)
+                for _ in range(random.randint(3, 6)):
+                    self._flights.append(self._build_flight(flight_id, route, base_date))
+                    flight_id += 1
+    
+    def _index_inventory(self) -> None:
+        """库存变化后重建索引"""
+        route_index: Dict[Tuple[str, str, str], List[FlightWithScore]] = {}
+        self._by_id = {fws.flight.id: fws for fws in self._flights}
+        for fws in self._flights:
+            flight = fws.flight
+            key = (flight.departure_airport_code, flight.arrival_airport_code, flight.cabin)
+            route_index.setdefault(key, []).append(fws)
+        for flights in route_index.values():
+            flights.sort(key=lambda f: f.flight.departure_time)
+        self._route_index = route_index
+        self.version += 1
+        self._flight_versions = dict.fromkeys(self._by_id, self.version)
+        self.fare_calendar.rebuild([fws.flight for fws in self._flights])
+        self.connections.rebuild(route_index)
+    
+    def _build_flight(self, flight_id: int, route: tuple, base_date: datetime) -> FlightWithScore:
+        """生成一个随机航班（含评分和设施）"""
+        from_city, from_code, from_airport, to_city, to_code, to_airport = route
+        
+        airline_code, airline_name = random.choice(self.AIRLINES)
+        flight_number = f"{airline_code}{random.randint(1000, 9999)}"
+        
+        hour = random.randint(6, 21)
+        minute = random.choice([0, 15, 30, 45])
+        departure_time = base_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        
+        duration = random.randint(120, 200)
+        arrival_time = departure_time + timedelta(minutes=duration)
+        
+        cabin = random.choice(self.CABINS)
+        base_price = {
+            "经济舱": random.randint(800, 1500),
+            "公务舱": random.randint(2500, 4500),
+            "头等舱": random.randint(5000, 8000)
+        }[cabin]
+        
+        flight = Flight(
+            id=f"flight-{flight_id}",
+            flightNumber=flight_number,
+            airline=airline_name,
+            airlineCode=airline_code,
+            departureCity=from_city,
+            departureCityCode=from_code,
+            departureAirport=from_airport,
+            departureAirportCode=from_code,
+            departureTime=departure_time,
+            arrivalCity=to_city,
+            arrivalCityCode=to_code,
+            arrivalAirport=to_airport,
+            arrivalAirportCode=to_code,
+            arrivalTime=arrival_time,
+            durationMinutes=duration,
+            stops=0,
+            cabin=cabin,
+            aircraftModel=random.choice(self.AIRCRAFTS),
+            price=float(base_price),
+            currency="CNY",
+            seatsRemaining=random.randint(1, 50)
+        )
+        
+        score = self._generate_score(flight)
+        facilities = self._generate_facilities(cabin)
+        
+        return FlightWithScore(
+            flight=flight,
+            score=score,
+            facilities=facilities
+        )
     
     def _generate_score(self, flight: Flight) -> FlightScore:
         """生成航班评分"""
@@ -189,19 +246,20 @@ class MockFlightService:
         )
     
     def _generate_price_history(self, flight: Flight) -> PriceHistory:
-        """生成价格历史"""
+        """生成价格历史（同一航班版本结果固定，ETag 才有意义）"""
+        rng = random.Random(f"{flight.id}:{self._flight_versions.get(flight.id)}")
         points = []
         base_date = datetime.now()
-        trend = random.choice([PriceTrend.RISING, PriceTrend.FALLING, PriceTrend.STABLE])
+        trend = rng.choice([PriceTrend.RISING, PriceTrend.FALLING, PriceTrend.STABLE])
         
         for i in range(7, 0, -1):
             date = base_date - timedelta(days=i)
             if trend == PriceTrend.RISING:
-                variation = (7 - i) * random.uniform(15, 25)
+                variation = (7 - i) * rng.uniform(15, 25)
             elif trend == PriceTrend.FALLING:
-                variation = -(7 - i) * random.uniform(15, 25)
+                variation = -(7 - i) * rng.uniform(15, 25)
             else:
-                variation = random.uniform(-30, 30)
+                variation = rng.uniform(-30, 30)
             
             price = max(flight.price + variation, flight.price * 0.7)
             points.append(PricePoint(
@@ -225,58 +283,234 @@ class MockFlightService:
         from_city: str,
         to_city: str,
         date: str,
-        cabin: str = "economy"
+        cabin: str = "economy",
+        flex_days: int = 0
     ) -> List[FlightWithScore]:
-        """搜索航班"""
-        cabin_map = {
-            "economy": "经济舱",
-            "business": "公务舱",
-            "first": "头等舱",
-            "经济舱": "经济舱",
-            "公务舱": "公务舱",
-            "头等舱": "头等舱"
-        }
-        target_cabin = cabin_map.get(cabin, "经济舱")
+        """
+        搜索航班
+
+        城市按城市群展开为全部机场对（如 上海 -> SHA/PVG），
+        逐对查索引后按起飞时间归并；无法解析的城市退回线性扫描。
+        date 为空时不限日期，flex_days > 0 时搜索 date 前后各 flex_days 天。
+        日期格式错误时抛 ValueError
+        """
+        target_cabin = cabin_name(cabin)
+        window = self._date_window(date, flex_days)
+        
+        # 每次搜索只解析一次城市/机场
+        origin = location_index.resolve(from_city)
+        destination = location_index.resolve(to_city)
+        
+        if origin is not None and destination is not None:
+            streams = [
+                self._in_window(self._route_index.get((o.code, d.code, target_cabin), []), window)
+                for o in origin.airports
+                for d in destination.airports
+                if o.code != d.code
+            ]
+            return list(heapq.merge(*streams, key=lambda f: f.flight.departure_time))
         
         results = []
         for fws in self._flights:
             flight = fws.flight
             
             # 匹配城市
-            from_match = (
-                from_city in flight.departure_city or
-                from_city == flight.departure_city_code
+            from_match = self._location_match(
+                origin, from_city, flight.departure_city, flight.departure_city_code
             )
-            to_match = (
-                to_city in flight.arrival_city or
-                to_city == flight.arrival_city_code
+            to_match = self._location_match(
+                destination, to_city, flight.arrival_city, flight.arrival_city_code
             )
             cabin_match = flight.cabin == target_cabin
+            date_match = window is None or window[0] <= flight.departure_time < window[1]
             
-            if from_match and to_match and cabin_match:
+            if from_match and to_match and cabin_match and date_match:
                 results.append(fws)
         
         return results
     
+    @staticmethod
+    def _date_window(date: str, flex_days: int) -> Optional[Tuple[datetime, datetime]]:
+        """[起始时刻, 结束时刻)，date 为空时为None"""
+        if not date:
+            return None
+        day = datetime.strptime(date, "%Y-%m-%d")
+        return day - timedelta(days=flex_days), day + timedelta(days=flex_days + 1)
+    
+    @staticmethod
+    def _in_window(
+        flights: List[FlightWithScore],
+        window: Optional[Tuple[datetime, datetime]]
+    ) -> List[FlightWithScore]:
+        """按起飞时间排序的航班中二分截取日期窗口"""
+        if window is None:
+            return flights
+        key = lambda f: f.flight.departure_time
+        return flights[bisect_left(flights, window[0], key=key):bisect_left(flights, window[1], key=key)]
+    
+    @staticmethod
+    def _location_match(location: Optional[Location], text: str, city: str, code: str) -> bool:
+        """航班城市/代码是否匹配解析结果；无法解析时退回精确匹配（不做子串匹配，避免 "上" 匹配上海）"""
+        if location is None:
+            return text == city or text == code
+        if location.airport is not None:
+            return code == location.airport.code
+        return city == location.city.name
+    
+    def generate_synthetic_inventory(
+        self,
+        size: int,
+        seed: int = 0,
+        days: int = 1
+    ) -> List[FlightWithScore]:
+        """
+        生成合成库存（基准测试用）
+
+        在 SYNTHETIC_AIRPORTS 的不同城市之间随机连线，航班分布在 days 天内；
+        使用独立随机种子，结果可复现
+        """
+        state = random.getstate()
+        random.seed(seed)
+        try:
+            base_date = datetime.now() + timedelta(days=3)
+            flights = []
+            for flight_id in range(1, size + 1):
+                origin, destination = random.sample(self.SYNTHETIC_AIRPORTS, 2)
+                while origin[0] == destination[0]:
+                    origin, destination = random.sample(self.SYNTHETIC_AIRPORTS, 2)
+                day = base_date + timedelta(days=random.randrange(days))
+                flights.append(self._build_flight(flight_id, origin + destination, day))
+            return flights
+        finally:
+            random.setstate(state)
+    
+    def replace_inventory(self, flights: List[FlightWithScore]) -> None:
+        """替换全部库存"""
+        self._flights = list(flights)
+        self._index_inventory()
+    
+    def search_itineraries(
+        self,
+        from_city: str,
+        to_city: str,
+        date: str,
+        cabin: str = "economy",
+        max_stops: int = 1,
+        limit: int = 20
+    ) -> List[Itinerary]:
+        """搜索直飞及一次中转行程（中转由直飞航段拼接）"""
+        start = datetime.strptime(date, "%Y-%m-%d")
+        pairs = location_index.airport_pairs(from_city, to_city)
+        origins = list(dict.fromkeys(o for o, _ in pairs))
+        destinations = list(dict.fromkeys(d for _, d in pairs))
+        return self.connections.search(
+            origins, destinations, cabin_name(cabin),
+            (start, start + timedelta(days=1)), max_stops, limit
+        )
+    
+    def price_calendar(
+        self,
+        from_city: str,
+        to_city: str,
+        cabin: str,
+        start: date_type,
+        days: int
+    ) -> List[Tuple[date_type, Optional[float]]]:
+        """低价日历：从 start 起连续 days 天每天的最低价"""
+        pairs = location_index.airport_pairs(from_city, to_city)
+        return self.fare_calendar.calendar(pairs, cabin_name(cabin), start, days)
+    
+    def update_flight(
+        self,
+        flight_id: str,
+        price: Optional[float] = None,
+        seats_remaining: Optional[int] = None,
+        score: Optional[FlightScore] = None
+    ) -> Optional[FlightWithScore]:
+        """
+        更新航班价格/余座/评分，并增量更新低价日历
+
+        只有值确实变化时才递增库存版本和该航班的版本；价格/余座变化推送给实时订阅者
+        """
+        fws = self.get_flight(flight_id)
+        if not fws:
+            return None
+        fare_changed = False
+        if price is not None and price != fws.flight.price:
+            fws.flight.price = price
+            fare_changed = True
+        if seats_remaining is not None and seats_remaining != fws.flight.seats_remaining:
+            fws.flight.seats_remaining = seats_remaining
+            fare_changed = True
+        score_changed = score is not None and score != fws.score
+        if score_changed:
+            fws.score = score
+        if fare_changed or score_changed:
+            self.fare_calendar.upsert(fws.flight)
+            self.version += 1
+            self._flight_versions[flight_id] = self.version
+        if fare_changed:
+            live_hub.publish_flight(fws.flight, self.version)
+        return fws
+    
+    def flight_version(self, flight_id: str) -> Optional[int]:
+        """航班版本（价格/余座/评分变化时递增），航班不存在时为None"""
+        return self._flight_versions.get(flight_id)
+    
+    def get_flight(self, flight_id: str) -> Optional[FlightWithScore]:
+        """获取航班（含评分和设施，不含价格历史）"""
+        return self._by_id.get(flight_id)
+    
+    def get_flights(self, flight_ids: List[str]) -> List[FlightWithScore]:
+        """批量获取航班，按请求顺序返回，跳过不存在的ID"""
+        by_id = self._by_id
+        return [by_id[flight_id] for flight_id in flight_ids if flight_id in by_id]
+    
+    def top_flights_by_route(self, top_n: int = 5, days: Optional[int] = None) -> List[FlightWithScore]:
+        """每条航线、每个舱位评分最高的 top_n 个航班；指定 days 时只看今天起 days 天内出发的航班"""
+        groups: Dict[tuple, List[FlightWithScore]] = {}
+        flights = self._flights
+        if days is not None:
+            end = datetime.combine(datetime.now().date() + timedelta(days=days), datetime.min.time())
+            flights = [fws for fws in flights if fws.flight.departure_time < end]
+        for fws in flights:
+            key = (fws.flight.departure_city, fws.flight.arrival_city, fws.flight.cabin)
+            groups.setdefault(key, []).append(fws)
+        
+        results = []
+        for flights in groups.values():
+            flights.sort(key=lambda f: f.score.overall_score, reverse=True)
+            results.extend(flights[:top_n])
+        return results
+    
     def get_flight_detail(self, flight_id: str) -> Optional[FlightDetail]:
         """获取航班详情"""
-        for fws in self._flights:
-            if fws.flight.id == flight_id:
-                return FlightDetail(
-                    flight=fws.flight,
-                    score=fws.score,
-                    facilities=fws.facilities,
-                    priceHistory=self._generate_price_history(fws.flight)
-                )
-        return None
+        fws = self._by_id.get(flight_id)
+        if fws is None:
+            return None
+        return FlightDetail(
+            flight=fws.flight,
+            score=fws.score,
+            facilities=fws.facilities,
+            priceHistory=self._price_history(fws.flight)
+        )
     
     def get_price_history(self, flight_id: str) -> Optional[PriceHistory]:
         """获取价格历史"""
-        for fws in self._flights:
-            if fws.flight.id == flight_id:
-                return self._generate_price_history(fws.flight)
-        return None
-
+        fws = self._by_id.get(flight_id)
+        if fws is None:
+            return None
+        return self._price_history(fws.flight)
+    
+    def price_history_tag(self, flight_id: str) -> str:
+        """价格历史的数据版本（最近一次采集的快照时间，内存中），用于 ETag；没有快照时为空"""
+        fws = self._by_id.get(flight_id)
+        latest = fare_history.latest_ts(fws.flight) if fws else None
+        return latest.isoformat() if latest else ""
+    
+    def _price_history(self, flight: Flight) -> PriceHistory:
+        """优先使用采集的票价快照，没有快照时生成模拟价格历史"""
+        return fare_history.price_history(flight) or self._generate_price_history(flight)
 
 # Singleton instance
 mock_flight_service = MockFlightService()
@@ -0,0 +1,227 @@
+"""
+AirEase Backend - AI Query Similarity Index
+近似查询匹配（字符 n-gram MinHash + LSH）
+"""
+
+import random
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.services.query_parser import fold_chars, query_parser
+
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_IGNORED_CHARS = set(" \t\r\n,，.。!！?？、;；:：~～-")
+
+
+class QuerySimilarityIndex:
+    """
+    最近解析过的AI搜索查询的近似匹配索引
+
+    特征 = 查询实体（城市/日期/舱位）+ 剩余文本的字符 1-gram/2-gram。
+    LSH 分桶召回候选，再用精确 Jaccard 校验；实体必须完全一致才复用。
+    本地词典之外的地名不进入实体键，因此还要求缓存结果中的每个 from/to/date/cabin
+    都能在新查询中找到（本地识别一致，或原文出现在查询中），否则换了目的地也会被复用。
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        max_entries: int = 2048,
+        threshold: float = 0.5,
+        ttl_seconds: int = 300
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+
+        rng = random.Random(20240101)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        # key -> entry
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # (band, band_hash) -> {key}
+        self._buckets: Dict[Tuple[int, int], Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------
+    # Features
+    # ------------------------------------------------------------
+
+    @staticmethod
+    def _features(query: str, analysis: Dict[str, Any]) -> FrozenSet[str]:
+        """实体原子特征 + 剩余文本的字符 n-gram（下标与解析器一致，按原查询计）"""
+        covered = [False] * len(query)
+        for start, end, (kind, _) in analysis["tokens"]:
+            if kind in ("city", "cabin", "relative_date"):
+                for i in range(start, end):
+                    covered[i] = True
+        if analysis["date_span"]:
+            for i in range(*analysis["date_span"]):
+                covered[i] = True
+
+        features = set()
+        for key in ("from", "to", "date", "cabin"):
+            if analysis[key] is not None:
+                features.add(f"{key}:{analysis[key]}")
+
+        # 被实体切开的文本片段分别取 n-gram，避免跨实体拼接
+        segment: List[str] = []
+        segments = [segment]
+        for char, is_covered in zip(fold_chars(query, str.lower), covered):
+            if is_covered or char in _IGNORED_CHARS:
+                if segment:
+                    segment = []
+                    segments.append(segment)
+                continue
+            segment.append(char)
+        for chars in segments:
+            features.update(chars)
+            features.update(a + b for a, b in zip(chars, chars[1:]))
+        return frozenset(features)
+
+    @staticmethod
+    def _entity_key(analysis: Dict[str, Any]) -> Tuple[Optional[str], ...]:
+        parsed_date = analysis["date"]
+        return (
+            analysis["from"],
+            analysis["to"],
+            parsed_date.isoformat() if parsed_date else None,
+            analysis["cabin"],
+        )
+
+    @staticmethod
+    def _grounded(parsed_query: Dict[str, Any], query: str, analysis: Dict[str, Any]) -> bool:
+        """缓存结果的每个字段值是否都能在新查询中找到"""
+        text = query.lower()
+        for key in ("from", "to", "date", "cabin"):
+            value = parsed_query.get(key)
+            if value is None:
+                continue
+            local = analysis[key]
+            if key == "date" and local is not None:
+                local = local.isoformat()
+            if value == local or str(value).lower() in text:
+                continue
+            # 查询未提到舱位时解析结果默认为经济舱
+            if key == "cabin" and local is None and value == "economy":
+                continue
+            return False
+        return True
+
+    def _signature(self, features: FrozenSet[str]) -> List[int]:
+        hashes = [zlib.crc32(feature.encode("utf-8")) for feature in features]
+        if not hashes:
+            return [_MAX_HASH] * self.num_perm
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        ]
+
+    def _band_keys(self, signature: List[int]) -> List[Tuple[int, int]]:
+        return [
+            (band, hash(tuple(signature[band * self.rows:(band + 1) * self.rows])))
+            for band in range(self.bands)
+        ]
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+
+    def lookup(self, query: str, today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """查找近似查询，命中时返回缓存的解析结果"""
+        analysis = query_parser.analyze(query, today)
+        entity_key = self._entity_key(analysis)
+        features = self._features(query, analysis)
+        signature = self._signature(features)
+        now = time.monotonic()
+
+        best_key = None
+        best_score = 0.0
+        candidates: Set[str] = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+
+        for key in candidates:
+            entry = self._entries[key]
+            if now - entry["created_at"] > self.ttl_seconds:
+                continue
+            if entry["entity_key"] != entity_key:
+                continue
+            if not self._grounded(entry["result"].get("parsed_query") or {}, query, analysis):
+                continue
+            union = len(features | entry["features"])
+            score = len(features & entry["features"]) / union if union else 1.0
+            if score >= self.threshold and score > best_score:
+                best_key, best_score = key, score
+
+        if best_key is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best_key)
+        result = dict(self._entries[best_key]["result"])
+        result["original_query"] = query
+        return result
+
+    def add(self, query: str, result: Dict[str, Any], today: Optional[date] = None) -> None:
+        """记录一次已解析的查询"""
+        if query in self._entries:
+            self._remove(query)
+
+        analysis = query_parser.analyze(query, today)
+        features = self._features(query, analysis)
+        band_keys = self._band_keys(self._signature(features))
+        self._entries[query] = {
+            "entity_key": self._entity_key(analysis),
+            "features": features,
+            "band_keys": band_keys,
+            "result": result,
+            "created_at": time.monotonic()
+        }
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, set()).add(query)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        for band_key in entry["band_keys"]:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._buckets.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton instance
+query_index = QuerySimilarityIndex(
+    max_entries=settings.ai_query_index_size,
+    threshold=settings.ai_query_similarity_threshold,
+    ttl_seconds=settings.cache_ttl
+)
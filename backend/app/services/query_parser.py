@@ -0,0 +1,379 @@
+"""
+AirEase Backend - Local Query Parser
+本地规则解析器（Aho–Corasick 词典匹配 + 日期语法）
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.services.location_index import location_index
+
+
+# ============================================================
+# Dictionaries
+# ============================================================
+
+CABIN_KEYWORDS = {
+    "经济舱": "economy", "经济": "economy",
+    "公务舱": "business", "公务": "business", "商务舱": "business", "商务": "business",
+    "头等舱": "first", "头等": "first",
+}
+
+# 相对日期 -> 距今天数
+RELATIVE_DAYS = {"今天": 0, "今日": 0, "明天": 1, "明日": 1, "后天": 2, "大后天": 3}
+
+FROM_MARKERS = {"从", "由", "自"}
+TO_MARKERS = {"到", "去", "飞", "至", "往", "飞往", "前往", "抵达"}
+DEPART_SUFFIXES = {"出发", "起飞"}
+
+# 不携带信息但可以被"解释"的词，用于计算覆盖率
+FILLER_WORDS = [
+    "我", "想", "要", "帮我", "请", "查", "查询", "找", "搜索", "看看", "一下", "订",
+    "一张", "张", "的", "航班", "机票", "飞机", "票", "单程", "回", "出差", "旅游",
+] + sorted(FROM_MARKERS | TO_MARKERS | DEPART_SUFFIXES)
+
+WEEKDAY_CHARS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6,
+                 "1": 0, "2": 1, "3": 2, "4": 3, "5": 4, "6": 5, "7": 6}
+
+CN_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5,
+             "六": 6, "七": 7, "八": 8, "九": 9}
+
+_NUM = r"[0-9]{1,2}|[一二三四五六七八九十]{1,3}"
+_WD = r"[一二三四五六日天1-7]"
+
+# 日期语法（按优先级排列）
+DATE_PATTERNS = [
+    ("iso", re.compile(r"(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})")),
+    ("ymd", re.compile(rf"(\d{{4}})年({_NUM})月({_NUM})[日号]?")),
+    ("md", re.compile(rf"({_NUM})月({_NUM})[日号]?")),
+    # "下周" 不能命中 "下下周" 的后半段；"下下下周" 等不识别，交给Gemini
+    ("week_after_next_day", re.compile(rf"(?<!下)下下(?:个)?(?:周|星期|礼拜)({_WD})")),
+    ("next_week_day", re.compile(rf"(?<!下)下(?:个)?(?:周|星期|礼拜)({_WD})")),
+    ("this_week_day", re.compile(rf"(?:这|本)(?:个)?(?:周|星期|礼拜)({_WD})")),
+    ("week_day", re.compile(rf"(?<!下)(?:周|星期|礼拜)({_WD})")),
+    ("week_after_next", re.compile(r"(?<!下)下下(?:个)?(?:周|星期|礼拜)")),
+    ("next_week", re.compile(r"(?<!下)下(?:个)?(?:周|星期|礼拜)")),
+    ("day_of_month", re.compile(rf"({_NUM})[日号]")),
+]
+
+# 出现否定词时（"不要明天要后天"）词典命中不代表用户意图
+NEGATION_WORDS = ("不", "别", "没", "除了")
+
+_PUNCTUATION = set(" \t\r\n,，.。!！?？、;；:：~～")
+
+
+def fold_chars(text: str, fold=str.upper) -> str:
+    """逐字符转换大小写；转换后长度会变的字符（如 ß -> SS）保持原样，保证下标与原文一致"""
+    return "".join(folded if len(folded := fold(char)) == 1 else char for char in text)
+
+
+def _cn_number(text: str) -> Optional[int]:
+    """解析阿拉伯数字或中文数字（1-99）"""
+    if text.isdigit():
+        return int(text)
+    if "十" in text:
+        tens, _, ones = text.partition("十")
+        tens_value = CN_DIGITS.get(tens, 0) if tens else 1
+        ones_value = CN_DIGITS.get(ones, 0) if ones else 0
+        if (tens and tens not in CN_DIGITS) or (ones and ones not in CN_DIGITS):
+            return None
+        return tens_value * 10 + ones_value
+    if len(text) == 1 and text in CN_DIGITS:
+        return CN_DIGITS[text]
+    return None
+
+
+# ============================================================
+# Aho–Corasick Automaton
+# ============================================================
+
+class AhoCorasick:
+    """多模式字符串匹配自动机，单次扫描找出所有词典命中"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, payload: Any) -> None:
+        """添加模式串"""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), payload))
+        self._built = False
+
+    def build(self) -> None:
+        """BFS构建失败指针"""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+        self._built = True
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """返回所有命中 (start, end, payload)"""
+        if not self._built:
+            self.build()
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, payload in self._output[state]:
+                yield index - length + 1, index + 1, payload
+
+
+# ============================================================
+# Query Parser
+# ============================================================
+
+class QueryParser:
+    """本地航班查询解析器 - 无网络调用，微秒级"""
+
+    def __init__(self):
+        self._automaton = AhoCorasick()
+        # 城市名、IATA代码、拼音、英文名、机场名/别名 -> 城市名
+        for alias, city in location_index.aliases():
+            self._automaton.add(alias.upper(), ("city", city))
+        for keyword, cabin in CABIN_KEYWORDS.items():
+            self._automaton.add(keyword, ("cabin", cabin))
+        for keyword, days in RELATIVE_DAYS.items():
+            self._automaton.add(keyword, ("relative_date", days))
+        for word in FILLER_WORDS:
+            self._automaton.add(word, ("filler", word))
+        self._automaton.build()
+
+    def analyze(self, query: str, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        抽取查询中的实体
+
+        返回 from/to/date/cabin（未识别为None）、全部词典命中 tokens
+        以及日期语法命中的 date_span。
+        """
+        today = today or datetime.now().date()
+        tokens = self._tokenize(query)
+        date_span, parsed_date = self._parse_date(query, today)
+
+        # 日期语法优先于词典里的相对日期/填充词
+        if date_span:
+            tokens = [t for t in tokens if t[1] <= date_span[0] or t[0] >= date_span[1]]
+
+        from_city, to_city = self._assign_cities(tokens)
+
+        cabin = None
+        for _, _, (kind, value) in tokens:
+            if kind == "cabin":
+                cabin = value
+                break
+
+        if parsed_date is None:
+            for _, _, (kind, value) in tokens:
+                if kind == "relative_date":
+                    parsed_date = today + timedelta(days=value)
+                    break
+
+        return {
+            "from": from_city,
+            "to": to_city,
+            "date": parsed_date,
+            "cabin": cabin,
+            "tokens": tokens,
+            "date_span": date_span
+        }
+
+    def parse(self, query: str, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        解析自然语言查询
+
+        返回与 GeminiService.parse_flight_query 相同结构的结果，
+        confidence 综合考虑实体完整度、查询文本覆盖率以及否定词/多个日期造成的歧义；
+        没有日期时置信度低于本地解析阈值。
+        """
+        today = today or datetime.now().date()
+        analysis = self.analyze(query, today)
+        from_city, to_city = analysis["from"], analysis["to"]
+        parsed_date = analysis["date"] or today + timedelta(days=3)
+
+        complete = bool(from_city and to_city)
+        confidence = 0.0
+        if complete:
+            coverage = self._coverage(query, analysis["tokens"], analysis["date_span"])
+            # 没有日期时最高 0.7，低于本地解析阈值，不会返回臆造的默认日期
+            confidence = 0.98 if analysis["date"] is not None else 0.7
+            # 每个未解释的字符都明显拉低置信度
+            confidence *= coverage ** 2
+            if self._ambiguous(query, analysis):
+                confidence *= 0.5
+            confidence = round(confidence, 2)
+
+        return {
+            "parsed_query": {
+                "from": from_city,
+                "to": to_city,
+                "date": parsed_date.strftime("%Y-%m-%d"),
+                "cabin": analysis["cabin"] or "economy"
+            } if complete else None,
+            "confidence": confidence,
+            "original_query": query,
+            "suggestions": [] if complete else ["请输入出发城市和目的地城市"]
+        }
+
+    def _tokenize(self, query: str) -> List[Tuple[int, int, Tuple[str, Any]]]:
+        """词典匹配，取最左最长且互不重叠的命中（下标对应原查询）"""
+        text = fold_chars(query)
+        matches = []
+        for start, end, payload in self._automaton.iter(text):
+            if text[start].isascii() and not self._ascii_bounded(text, start, end):
+                continue
+            matches.append((start, end, payload))
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+
+        tokens = []
+        cursor = 0
+        for start, end, payload in matches:
+            if start >= cursor:
+                tokens.append((start, end, payload))
+                cursor = end
+        return tokens
+
+    @staticmethod
+    def _ambiguous(query: str, analysis: Dict[str, Any]) -> bool:
+        """含否定词，或出现多个日期表达"""
+        if any(word in query for word in NEGATION_WORDS):
+            return True
+        dates = sum(kind == "relative_date" for _, _, (kind, _) in analysis["tokens"])
+        return dates + bool(analysis["date_span"]) > 1
+
+    @staticmethod
+    def _ascii_bounded(text: str, start: int, end: int) -> bool:
+        """IATA代码两侧不能紧挨字母数字"""
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        return not (before.isascii() and before.isalnum()) and not (after.isascii() and after.isalnum())
+
+    @staticmethod
+    def _assign_cities(tokens) -> Tuple[Optional[str], Optional[str]]:
+        """根据 从/到/出发 等标记确定出发地和目的地"""
+        from_city = None
+        to_city = None
+        unassigned = []
+        for index, (_, _, (kind, value)) in enumerate(tokens):
+            if kind != "city":
+                continue
+            prev_word = tokens[index - 1][2][1] if index > 0 and tokens[index - 1][2][0] == "filler" else None
+            next_word = tokens[index + 1][2][1] if index + 1 < len(tokens) and tokens[index + 1][2][0] == "filler" else None
+            if prev_word in FROM_MARKERS or next_word in DEPART_SUFFIXES:
+                from_city = from_city or value
+            elif prev_word in TO_MARKERS:
+                to_city = to_city or value
+            else:
+                unassigned.append(value)
+
+        for city in unassigned:
+            if from_city is None and city != to_city:
+                from_city = city
+            elif to_city is None and city != from_city:
+                to_city = city
+        if from_city == to_city:
+            to_city = None
+        return from_city, to_city
+
+    @staticmethod
+    def _parse_date(query: str, today: date) -> Tuple[Optional[Tuple[int, int]], Optional[date]]:
+        """日期语法：周X、下周X、X月X日、YYYY-MM-DD 等"""
+        for kind, pattern in DATE_PATTERNS:
+            match = pattern.search(query)
+            if not match:
+                continue
+            try:
+                resolved = QueryParser._resolve_date(kind, match, today)
+            except ValueError:
+                resolved = None
+            if resolved is not None:
+                return match.span(), resolved
+        return None, None
+
+    @staticmethod
+    def _resolve_date(kind: str, match: re.Match, today: date) -> Optional[date]:
+        monday = today - timedelta(days=today.weekday())
+        if kind == "iso":
+            return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        if kind == "ymd":
+            month, day = _cn_number(match.group(2)), _cn_number(match.group(3))
+            if month is None or day is None:
+                return None
+            return date(int(match.group(1)), month, day)
+        if kind == "md":
+            month, day = _cn_number(match.group(1)), _cn_number(match.group(2))
+            if month is None or day is None:
+                return None
+            resolved = date(today.year, month, day)
+            return resolved if resolved >= today else date(today.year + 1, month, day)
+        if kind == "week_after_next_day":
+            return monday + timedelta(days=14 + WEEKDAY_CHARS[match.group(1)])
+        if kind == "next_week_day":
+            return monday + timedelta(days=7 + WEEKDAY_CHARS[match.group(1)])
+        if kind == "this_week_day":
+            return monday + timedelta(days=WEEKDAY_CHARS[match.group(1)])
+        if kind == "week_day":
+            resolved = monday + timedelta(days=WEEKDAY_CHARS[match.group(1)])
+            return resolved if resolved >= today else resolved + timedelta(days=7)
+        if kind == "week_after_next":
+            return monday + timedelta(days=14)
+        if kind == "next_week":
+            return monday + timedelta(days=7)
+        if kind == "day_of_month":
+            day = _cn_number(match.group(1))
+            if day is None:
+                return None
+            resolved = date(today.year, today.month, day)
+            if resolved >= today:
+                return resolved
+            year, month = (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+            return date(year, month, day)
+        return None
+
+    @staticmethod
+    def _coverage(query: str, tokens, date_span: Optional[Tuple[int, int]]) -> float:
+        """被识别的字符占比（忽略空白和标点）"""
+        covered = [False] * len(query)
+        spans = [(start, end) for start, end, _ in tokens]
+        if date_span:
+            spans.append(date_span)
+        for start, end in spans:
+            for i in range(start, end):
+                covered[i] = True
+
+        total = 0
+        explained = 0
+        for char, is_covered in zip(query, covered):
+            if char in _PUNCTUATION:
+                continue
+            total += 1
+            explained += is_covered
+        return explained / total if total else 0.0
+
+
+# Singleton instance
+query_parser = QueryParser()
@@ -0,0 +1,318 @@
+"""
+AirEase Backend - Upstream Resilience
+熔断器、对冲请求与请求级延迟预算（Gemini / Amadeus）
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple, TypeVar
+
+import httpx
+
+from app.config import settings
+from app.metrics import provider_call_duration
+
+T = TypeVar("T")
+
+# 当前请求的截止时间（perf_counter 时间），None 表示不限
+_request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，直接走降级路径"""
+
+
+class BudgetExhaustedError(asyncio.TimeoutError):
+    """请求级延迟预算已用完"""
+
+
+# ============================================================
+# Latency Budget
+# ============================================================
+
+@contextmanager
+def latency_budget(seconds: float) -> Iterator[None]:
+    """为当前请求设置延迟预算，内部的上游调用共享同一截止时间"""
+    token = _request_deadline.set(time.perf_counter() + seconds)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """当前请求剩余的预算（秒），未设置预算时返回None"""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.perf_counter()
+
+
+# ============================================================
+# Circuit Breaker
+# ============================================================
+
+class CircuitBreaker:
+    """
+    滑动窗口熔断器
+
+    最近 window 次调用中失败率或慢调用率超过阈值即打开；
+    open_seconds 后进入半开状态，放行一个探测请求决定关闭或重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call_ms: float = 5000,
+        slow_call_rate: float = 0.8,
+        window: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_ms / 1000
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        # (failed, slow)
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """是否放行一次调用"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record(self, success: bool, latency: float) -> None:
+        """记录一次调用结果"""
+        slow = latency >= self.slow_call_seconds
+        if self._state == self.HALF_OPEN:
+            self._probe_in_flight = False
+            if success and not slow:
+                self._close()
+            else:
+                self._trip()
+            return
+
+        self._outcomes.append((not success, slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+        calls = len(self._outcomes)
+        failures = sum(failed for failed, _ in self._outcomes)
+        slow_calls = sum(is_slow for _, is_slow in self._outcomes)
+        if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+            self._trip()
+
+    def release(self) -> None:
+        """调用被取消，未产生结果"""
+        if self._state == self.HALF_OPEN:
+            self._probe_in_flight = False
+
+    def _trip(self) -> None:
+        if self._state != self.OPEN:
+            print(f"Circuit '{self.name}' opened")
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def _close(self) -> None:
+        print(f"Circuit '{self.name}' closed")
+        self._state = self.CLOSED
+        self._outcomes.clear()
+
+
+# ============================================================
+# Resilience Policy
+# ============================================================
+
+class LatencyTracker:
+    """最近成功调用的延迟样本"""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResiliencePolicy:
+    """
+    上游调用策略：熔断 + 截止时间 + 可选对冲
+
+    截止时间取 min(单次超时, 请求剩余预算)；开启对冲时，
+    首个请求超过近期 p95 延迟仍未返回则再发一个，取先成功者。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout_ms: float,
+        breaker: CircuitBreaker,
+        hedge: bool = False,
+        hedge_min_delay_ms: float = 50,
+        is_failure: Optional[Callable[[Any], bool]] = None
+    ):
+        self.name = name
+        self.timeout = timeout_ms / 1000
+        self.breaker = breaker
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay_ms / 1000
+        self.is_failure = is_failure
+        self.latency = LatencyTracker()
+        self.hedged_calls = 0
+
+    def _deadline(self) -> float:
+        timeout = self.timeout
+        remaining = remaining_budget()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        if timeout <= 0:
+            raise BudgetExhaustedError(f"{self.name}: request latency budget exhausted")
+        return timeout
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        p95 = self.latency.percentile(0.95)
+        if p95 is None:
+            return None
+        return max(p95, self.hedge_min_delay)
+
+    def _failed(self, result: Any) -> bool:
+        return bool(self.is_failure and self.is_failure(result))
+
+    async def call(self, make_call: Callable[[], Awaitable[T]], allow_hedge: bool = True) -> T:
+        """
+        执行一次上游调用
+
+        熔断打开时抛 CircuitOpenError，超过截止时间抛 asyncio.TimeoutError，
+        调用方应捕获后走自己的降级路径。结果需要显式关闭的调用
+        （如流式响应）应传 allow_hedge=False。
+        """
+        timeout = self._deadline()
+        if not self.breaker.allow():
+            provider_call_duration.observe(0.0, self.name, "circuit_open")
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self._attempt(make_call, timeout, allow_hedge), timeout)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            latency = time.perf_counter() - start
+            self.breaker.record(False, latency)
+            outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+            provider_call_duration.observe(latency, self.name, outcome)
+            raise
+
+        latency = time.perf_counter() - start
+        failed = self._failed(result)
+        self.breaker.record(not failed, latency)
+        provider_call_duration.observe(latency, self.name, "failure" if failed else "success")
+        if not failed:
+            self.latency.add(latency)
+        return result
+
+    async def _attempt(self, make_call: Callable[[], Awaitable[T]], timeout: float, allow_hedge: bool) -> T:
+        delay = self._hedge_delay() if allow_hedge else None
+        if delay is None or delay >= timeout:
+            return await make_call()
+
+        tasks = [asyncio.ensure_future(make_call())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedged_calls += 1
+                tasks.append(asyncio.ensure_future(make_call()))
+
+            pending = set(tasks)
+            fallback_result = None
+            has_fallback = False
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif self._failed(task.result()):
+                        fallback_result, has_fallback = task.result(), True
+                    else:
+                        return task.result()
+            if has_fallback:
+                return fallback_result
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def status(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(0.95)
+        return {
+            "state": self.breaker.state,
+            "p95Ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedgedCalls": self.hedged_calls
+        }
+
+
+def _http_failure(response: Any) -> bool:
+    """上游 5xx / 429 视为失败"""
+    return isinstance(response, httpx.Response) and (
+        response.status_code >= 500 or response.status_code == 429
+    )
+
+
+def _make_policy(name: str, timeout_ms: float, hedge: bool) -> ResiliencePolicy:
+    return ResiliencePolicy(
+        name=name,
+        timeout_ms=timeout_ms,
+        breaker=CircuitBreaker(
+            name,
+            failure_rate=settings.breaker_failure_rate,
+            slow_call_ms=settings.breaker_slow_call_ms,
+            slow_call_rate=settings.breaker_slow_call_rate,
+            window=settings.breaker_window,
+            min_calls=settings.breaker_min_calls,
+            open_seconds=settings.breaker_open_seconds
+        ),
+        hedge=hedge,
+        hedge_min_delay_ms=settings.hedge_min_delay_ms,
+        is_failure=_http_failure
+    )
+
+
+# Singleton instances
+gemini_policy = _make_policy("gemini", settings.gemini_timeout_ms, settings.gemini_hedge_enabled)
+amadeus_policy = _make_policy("amadeus", settings.amadeus_timeout_ms, settings.amadeus_hedge_enabled)
@@ -0,0 +1,75 @@
+"""
+AirEase Backend - Search Cache
+搜索响应缓存：保存编码后的响应体，并按需保存各压缩编码的字节
+
+- 键包含库存版本，价格/库存变化后旧条目自然失效
+- 容量有界，按 LRU 淘汰；超过 TTL 的条目视为未命中
+- 热门搜索只压缩一次，之后直接返回预压缩字节
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from app.config import settings
+from app.metrics import record_cache
+from app.middleware.compression import compress
+
+
+class CachedResponse:
+    """一条缓存的响应（原始字节 + 已生成的压缩版本）"""
+
+    __slots__ = ("body", "media_type", "search_id", "created_at", "_compressed")
+
+    def __init__(self, body: bytes, media_type: str, search_id: Optional[str] = None):
+        self.body = body
+        self.media_type = media_type
+        self.search_id = search_id
+        self.created_at = time.monotonic()
+        self._compressed: Dict[str, bytes] = {}
+
+    def compressed(self, encoding: str) -> bytes:
+        """该编码的压缩字节（首次调用时压缩）"""
+        data = self._compressed.get(encoding)
+        if data is None:
+            data = self._compressed[encoding] = compress(self.body, encoding)
+        return data
+
+
+class SearchCache:
+    """有界 LRU 响应缓存"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.created_at > self.ttl_seconds:
+            del self._entries[key]
+            entry = None
+        record_cache("search_response", entry is not None)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(
+        self, key: Hashable, body: bytes, media_type: str, search_id: Optional[str] = None
+    ) -> CachedResponse:
+        entry = CachedResponse(body, media_type, search_id)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton instance
+search_cache = SearchCache(settings.search_cache_size, settings.cache_ttl)
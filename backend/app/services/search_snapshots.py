@@ -0,0 +1,107 @@
+"""
+AirEase Backend - Search Snapshots
+搜索结果快照：searchId 指向一次搜索返回的航班集合（航班ID -> 价格、余座）
+
+- 客户端用 since=<searchId> 轮询时只返回新增、移除和价格/余座变化的航班
+- 容量有界，按 LRU 淘汰；被淘汰的 searchId 需要重新完整搜索
+- 快照记录库存版本，版本未变时无需重新搜索即可返回空增量
+"""
+
+import uuid
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.metrics import record_cache
+from app.models import FlightChange, FlightWithScore
+
+
+def fingerprint(flights: Iterable[FlightWithScore]) -> Dict[str, Tuple[float, int]]:
+    """航班ID -> (价格, 余座)"""
+    return {fws.flight.id: (fws.flight.price, fws.flight.seats_remaining) for fws in flights}
+
+
+class SearchSnapshot:
+    """一次搜索的结果快照"""
+
+    __slots__ = ("search_id", "query", "version", "total", "flights")
+
+    def __init__(
+        self,
+        search_id: str,
+        query: Hashable,
+        version: int,
+        total: int,
+        flights: Dict[str, Tuple[float, int]]
+    ):
+        self.search_id = search_id
+        self.query = query
+        self.version = version
+        self.total = total
+        self.flights = flights
+
+    def diff(
+        self, flights: List[FlightWithScore]
+    ) -> Tuple[List[FlightWithScore], List[str], List[FlightChange]]:
+        """当前结果相对快照的 (新增, 移除的ID, 价格/余座变化)"""
+        added: List[FlightWithScore] = []
+        changed: List[FlightChange] = []
+        current = set()
+        for fws in flights:
+            flight = fws.flight
+            current.add(flight.id)
+            previous = self.flights.get(flight.id)
+            if previous is None:
+                added.append(fws)
+            elif previous != (flight.price, flight.seats_remaining):
+                changed.append(FlightChange(
+                    id=flight.id, price=flight.price, seatsRemaining=flight.seats_remaining
+                ))
+        removed = [flight_id for flight_id in self.flights if flight_id not in current]
+        return added, removed, changed
+
+
+class SearchSnapshotStore:
+    """有界 LRU 快照存储"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, SearchSnapshot]" = OrderedDict()
+
+    def create(
+        self, query: Hashable, version: int, total: int, flights: Iterable[FlightWithScore]
+    ) -> SearchSnapshot:
+        """保存新快照并分配 searchId"""
+        snapshot = SearchSnapshot(f"search-{uuid.uuid4().hex[:12]}", query, version, total, fingerprint(flights))
+        self._entries[snapshot.search_id] = snapshot
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return snapshot
+
+    def get(self, search_id: str) -> Optional[SearchSnapshot]:
+        snapshot = self._entries.get(search_id)
+        record_cache("search_snapshot", snapshot is not None)
+        if snapshot is not None:
+            self._entries.move_to_end(search_id)
+        return snapshot
+
+    def touch(self, search_id: str) -> bool:
+        """
+        标记为最近使用（搜索缓存命中时调用，热门搜索的快照不被淘汰）
+
+        快照已被淘汰时返回 False
+        """
+        if search_id not in self._entries:
+            return False
+        self._entries.move_to_end(search_id)
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton instance
+search_snapshots = SearchSnapshotStore(settings.search_snapshot_size)
@@ -0,0 +1,111 @@
+"""
+AirEase Backend - Compression Benchmark
+搜索响应在各压缩编码/级别下的体积与压缩/解压耗时（CPU 换带宽）
+
+    cd backend
+    python -m benchmarks.compression                   # 20 / 200 / 2000 个航班的 JSON 响应
+    python -m benchmarks.compression --sizes 200 --fields list
+
+br / zstd 需要安装 brotli / zstandard，未安装时跳过
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.middleware.compression import brotli, zstandard
+from app.models import FlightWithScore
+from app.projection import compile_fields, project
+from app.services.mock_service import MockFlightService
+
+DEFAULT_SIZES = (20, 200, 2000)
+
+Codec = Tuple[str, Callable[[bytes], bytes], Callable[[bytes], bytes]]
+
+
+def codecs() -> List[Codec]:
+    """(名称, 压缩, 解压)"""
+    results: List[Codec] = [
+        (f"gzip-{level}", lambda d, level=level: gzip.compress(d, compresslevel=level, mtime=0), gzip.decompress)
+        for level in (1, 6, 9)
+    ]
+    if brotli is not None:
+        results += [
+            (f"br-{quality}", lambda d, quality=quality: brotli.compress(d, quality=quality), brotli.decompress)
+            for quality in (1, 4, 11)
+        ]
+    if zstandard is not None:
+        decompressor = zstandard.ZstdDecompressor()
+        results += [
+            (f"zstd-{level}", zstandard.ZstdCompressor(level=level).compress, decompressor.decompress)
+            for level in (1, 3, 19)
+        ]
+    return results
+
+
+def _median_us(func: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    func()
+    number = max(1, int(0.05 / max(time.perf_counter() - start, 1e-6)))
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return statistics.median(rounds) * 1e6
+
+
+def payload(size: int, fields: Optional[str] = None) -> bytes:
+    """size 个合成航班的搜索响应 JSON"""
+    flights = MockFlightService().generate_synthetic_inventory(size, seed=size)
+    if fields:
+        rows = project(flights, compile_fields(fields, FlightWithScore))
+    else:
+        rows = [fws.model_dump(mode="json", by_alias=True) for fws in flights]
+    body = {"flights": rows, "meta": {"total": size, "searchId": "search-bench"}}
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def run(sizes: List[int], fields: Optional[str] = None, repeat: int = 5) -> Dict[str, Dict[str, Dict]]:
+    """{规模: {编码: {bytes, ratio, compressUs, decompressUs}}}"""
+    results: Dict[str, Dict[str, Dict]] = {}
+    for size in sizes:
+        body = payload(size, fields)
+        results[str(size)] = {"identity": {"bytes": len(body), "ratio": 1.0, "compressUs": 0.0, "decompressUs": 0.0}}
+        for name, compress, decompress in codecs():
+            compressed = compress(body)
+            results[str(size)][name] = {
+                "bytes": len(compressed),
+                "ratio": round(len(compressed) / len(body), 4),
+                "compressUs": round(_median_us(lambda: compress(body), repeat), 1),
+                "decompressUs": round(_median_us(lambda: decompress(compressed), repeat), 1),
+            }
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="航班数，逗号分隔")
+    parser.add_argument("--fields", help="稀疏字段集（如 list）")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = run(sizes, args.fields, args.repeat)
+
+    print(f"{'flights':>8} {'codec':<10}{'bytes':>12}{'ratio':>8}{'compress µs':>14}{'decompress µs':>15}")
+    for size, by_codec in results.items():
+        for name, stats in by_codec.items():
+            print(
+                f"{size:>8} {name:<10}{stats['bytes']:>12,}{stats['ratio']:>8.1%}"
+                f"{stats['compressUs']:>14,.0f}{stats['decompressUs']:>15,.0f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,343 @@
+"""
+AirEase Backend - End-to-End Load Test
+端到端压测：搜索 / 详情 / 登录 / AI 搜索的混合流量，输出吞吐与 p50/p95/p99
+
+    cd backend
+    python -m benchmarks.load_test --inventory 100000 --concurrency 50 --requests 5000
+    python -m benchmarks.load_test --mode uvicorn --output results.json
+    python -m benchmarks.load_test --baseline results.json --threshold 0.15
+
+- inprocess: 通过 ASGITransport 直接调用应用（不经过网络）
+- uvicorn:   在本地端口启动 uvicorn，经 HTTP 访问
+- Gemini / Amadeus 由本地桩服务替代，完全离线；限流关闭；用户数据写入临时数据库
+- 指定 --baseline 时与历史结果比较，p95 变慢或吞吐下降超过阈值则以状态码 1 退出
+"""
+
+import os
+
+# 必须在导入 app 之前设置：压测流量全部来自同一 IP
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, UserDB, get_db
+from app.main import app
+from app.services.amadeus_service import amadeus_service
+from app.services.auth_service import auth_service
+from app.services.gemini_service import gemini_service
+from app.services.mock_service import mock_flight_service
+from tests.stubs import FakeAmadeus, FakeGemini, serve
+
+BENCH_EMAIL = "loadtest@airease.dev"
+BENCH_PASSWORD = "loadtest-password"
+
+# 端点权重（近似线上流量构成）
+MIX = [("search", 60), ("detail", 25), ("ai_search", 10), ("login", 5)]
+
+CABIN_WEIGHTS = [("economy", 70), ("business", 20), ("first", 10)]
+
+# 本地解析器能直接处理的查询
+LOCAL_QUERIES = [
+    "明天北京到上海的公务舱",
+    "后天从深圳飞成都，经济舱",
+    "下周三广州去北京",
+    "{date}杭州到西安头等舱",
+    "{date}从南京飞重庆",
+]
+
+# 需要调用 Gemini（桩）的模糊查询
+VAGUE_QUERIES = [
+    "想找个周末去海边的便宜航班",
+    "帮我看看过几天回老家的票",
+    "国庆出去玩有什么推荐",
+]
+
+
+def _weighted(rng: random.Random, choices: List[Tuple[str, int]]) -> str:
+    names, weights = zip(*choices)
+    return rng.choices(names, weights=weights)[0]
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# ============================================================
+# Environment
+# ============================================================
+
+def _gemini_responder(prompt: str) -> str:
+    date = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+    return json.dumps({
+        "fromCity": "北京", "toCity": "三亚", "date": date, "cabin": "经济舱", "confidence": 0.9
+    }, ensure_ascii=False)
+
+
+def setup_environment(stack: ExitStack, inventory: int, seed: int) -> Dict:
+    """
+    准备压测环境：合成库存、临时用户库、上游桩服务
+
+    返回压测流量需要的上下文（航线、航班ID、日期、登录token）
+    """
+    flights = mock_flight_service.generate_synthetic_inventory(inventory, seed=seed)
+    mock_flight_service.replace_inventory(flights)
+
+    db_dir = stack.enter_context(tempfile.TemporaryDirectory())
+    engine = create_engine(f"sqlite:///{db_dir}/loadtest.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    stack.callback(app.dependency_overrides.pop, get_db, None)
+    stack.callback(engine.dispose)
+
+    with Session() as db:
+        user = UserDB(
+            email=BENCH_EMAIL,
+            username="loadtest",
+            hashed_password=auth_service.hash_password(BENCH_PASSWORD)
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        token, _ = auth_service.create_access_token(user_id=user.id, email=user.email)
+
+    gemini_url = stack.enter_context(serve(FakeGemini(responder=_gemini_responder).app))
+    amadeus_url = stack.enter_context(serve(FakeAmadeus().app))
+    for service, url in ((gemini_service, gemini_url), (amadeus_service, amadeus_url)):
+        previous = service.base_url
+        service.base_url = url
+        stack.callback(setattr, service, "base_url", previous)
+
+    routes = sorted({
+        (fws.flight.departure_city, fws.flight.arrival_city) for fws in flights
+    })
+    return {
+        "routes": routes,
+        "flight_ids": [fws.flight.id for fws in flights],
+        "date": flights[0].flight.departure_time.strftime("%Y-%m-%d"),
+        "token": token,
+    }
+
+
+def make_request(rng: random.Random, context: Dict) -> Tuple[str, str, str, Dict]:
+    """按流量构成生成一个请求：(端点, 方法, 路径, httpx 参数)"""
+    endpoint = _weighted(rng, MIX)
+    headers = {}
+    if endpoint in ("search", "detail") and rng.random() < 0.5:
+        headers["Authorization"] = f"Bearer {context['token']}"
+
+    if endpoint == "search":
+        from_city, to_city = rng.choice(context["routes"])
+        params = {
+            "from": from_city, "to": to_city, "date": context["date"],
+            "cabin": _weighted(rng, CABIN_WEIGHTS)
+        }
+        return endpoint, "GET", "/v1/flights/search", {"params": params, "headers": headers}
+
+    if endpoint == "detail":
+        # 约5%请求不存在的航班
+        if rng.random() < 0.05:
+            flight_id = f"flight-missing-{rng.randint(1, 10 ** 6)}"
+        else:
+            flight_id = rng.choice(context["flight_ids"])
+        return endpoint, "GET", f"/v1/flights/{flight_id}", {"headers": headers}
+
+    if endpoint == "ai_search":
+        if rng.random() < 0.8:
+            query = rng.choice(LOCAL_QUERIES).format(date=context["date"])
+        else:
+            query = rng.choice(VAGUE_QUERIES)
+        return endpoint, "POST", "/v1/ai/search", {"json": {"query": query}}
+
+    return endpoint, "POST", "/v1/auth/login", {
+        "json": {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+    }
+
+
+# ============================================================
+# Load Generation
+# ============================================================
+
+async def run_load(
+    client: httpx.AsyncClient,
+    context: Dict,
+    requests: int,
+    concurrency: int,
+    seed: int,
+    warmup: int
+) -> Dict:
+    """固定并发的闭环压测，返回各端点统计"""
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        _, method, path, kwargs = make_request(rng, context)
+        await client.request(method, path, **kwargs)
+
+    latencies: Dict[str, List[float]] = {name: [] for name, _ in MIX}
+    errors: Dict[str, int] = {name: 0 for name, _ in MIX}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            endpoint, method, path, kwargs = make_request(rng, context)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                failed = response.status_code >= 500 or (
+                    response.status_code >= 400 and endpoint != "detail"
+                )
+            except httpx.HTTPError:
+                failed = True
+            latencies[endpoint].append(time.perf_counter() - start)
+            if failed:
+                errors[endpoint] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stats = {}
+    everything = []
+    for endpoint, samples in latencies.items():
+        everything.extend(samples)
+        stats[endpoint] = _summarize(samples, errors[endpoint], elapsed)
+    stats["total"] = _summarize(everything, sum(errors.values()), elapsed)
+    return stats
+
+
+def _summarize(samples: List[float], errors: int, elapsed: float) -> Dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50Ms": round(_percentile(ordered, 0.50) * 1000, 2),
+        "p95Ms": round(_percentile(ordered, 0.95) * 1000, 2),
+        "p99Ms": round(_percentile(ordered, 0.99) * 1000, 2),
+    }
+
+
+async def run_mode(mode: str, context: Dict, args: argparse.Namespace) -> Dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if mode == "inprocess":
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60.0) as client:
+            return await run_load(client, context, args.requests, args.concurrency, args.seed, args.warmup)
+
+    with serve(app) as base_url:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+            return await run_load(client, context, args.requests, args.concurrency, args.seed, args.warmup)
+
+
+async def run_modes(modes: List[str], context: Dict, args: argparse.Namespace) -> Dict:
+    # 所有模式共享一个事件循环（上游服务的 httpx 客户端绑定在循环上）
+    return {mode: await run_mode(mode, context, args) for mode in modes}
+
+
+# ============================================================
+# Reporting
+# ============================================================
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """与基线比较，返回回归描述列表"""
+    regressions = []
+    for mode, endpoints in results["results"].items():
+        for endpoint, current in endpoints.items():
+            previous = baseline.get("results", {}).get(mode, {}).get(endpoint)
+            if not previous or not previous["count"] or not current["count"]:
+                continue
+            if previous["p95Ms"] and current["p95Ms"] > previous["p95Ms"] * (1 + threshold):
+                regressions.append(
+                    f"{mode}/{endpoint}: p95 {previous['p95Ms']}ms -> {current['p95Ms']}ms"
+                )
+            if previous["rps"] and current["rps"] < previous["rps"] * (1 - threshold):
+                regressions.append(
+                    f"{mode}/{endpoint}: throughput {previous['rps']} -> {current['rps']} r/s"
+                )
+    return regressions
+
+
+def print_table(results: Dict) -> None:
+    for mode, endpoints in results["results"].items():
+        print(f"\n[{mode}]")
+        print(f"{'endpoint':<12}{'count':>8}{'errors':>8}{'r/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for endpoint, row in endpoints.items():
+            print(
+                f"{endpoint:<12}{row['count']:>8}{row['errors']:>8}{row['rps']:>10.1f}"
+                f"{row['p50Ms']:>10.2f}{row['p95Ms']:>10.2f}{row['p99Ms']:>10.2f}"
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn", "both"], default="inprocess")
+    parser.add_argument("--inventory", type=int, default=10000, help="合成航班数量")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="基线结果 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=0.15, help="允许的相对退化（0.15 = 15%%）")
+    args = parser.parse_args()
+
+    modes = ["inprocess", "uvicorn"] if args.mode == "both" else [args.mode]
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "inventory": args.inventory, "requests": args.requests,
+            "concurrency": args.concurrency, "seed": args.seed,
+            "mix": dict(MIX)
+        },
+        "results": {}
+    }
+
+    with ExitStack() as stack:
+        context = setup_environment(stack, args.inventory, args.seed)
+        results["results"] = asyncio.run(run_modes(modes, context, args))
+
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions (threshold {args.threshold:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,265 @@
+"""
+AirEase Backend - Micro Benchmarks
+热点函数的单函数基准，结果按提交保存并与历史结果比较
+
+    cd backend
+    python -m benchmarks.micro                           # 默认库存 1k / 100k
+    python -m benchmarks.micro --sizes 1000,100000,1000000
+    python -m benchmarks.micro --filter search --against <commit> --fail-on-regression
+
+- 每个用例自动校准循环次数（单轮约 --min-time 秒），重复 --repeat 轮取中位数
+- 结果写入 benchmarks/results/<commit>.json（工作区有改动时追加 -dirty）
+- 默认与最近一次其他提交的结果比较，中位数变慢超过 --threshold 记为回归
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.amadeus_service import amadeus_service
+from app.services.auth_service import auth_service
+from app.services.gemini_service import gemini_service
+from app.services.mock_service import MockFlightService
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+DEFAULT_SIZES = (1000, 100000)
+
+PARSE_QUERIES = [
+    "下周三北京到上海的公务舱",
+    "明天去广州的航班",
+    "后天从深圳飞成都，经济舱",
+    "1月15日杭州到西安头等舱",
+    "想找个周末去海边的便宜航班",
+]
+
+# 依赖库存规模的用例（名称后缀 [size]）
+INVENTORY_CASES = ("mock.search_flights", "mock.get_flight_detail", "mock.search_itineraries")
+
+Case = Tuple[str, Callable[[], object]]
+
+
+# ============================================================
+# Fixtures
+# ============================================================
+
+def load_amadeus_payload() -> Dict:
+    """录制的 Amadeus Flight Offers 响应（50 个报价）"""
+    with open(os.path.join(FIXTURE_DIR, "amadeus_flight_offers.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def inventory_service(size: int, seed: int = 0) -> MockFlightService:
+    """库存为 size 条合成航班的独立服务实例"""
+    service = MockFlightService()
+    service.replace_inventory(service.generate_synthetic_inventory(size, seed=seed))
+    return service
+
+
+# ============================================================
+# Cases
+# ============================================================
+
+def inventory_cases(service: MockFlightService, size: int) -> List[Case]:
+    """依赖库存规模的用例（详情查询取最后一个航班）"""
+    rng = random.Random(size)
+    flights = service._flights
+    sample = rng.choice(flights).flight
+    last_id = flights[-1].flight.id
+    search, detail, itineraries = INVENTORY_CASES
+    date = sample.departure_time.strftime("%Y-%m-%d")
+    return [
+        (
+            f"{search}[{size}]",
+            lambda: service.search_flights(sample.departure_city, sample.arrival_city, "", "economy")
+        ),
+        (f"{detail}[{size}]", lambda: service.get_flight_detail(last_id)),
+        (
+            f"{itineraries}[{size}]",
+            lambda: service.search_itineraries(sample.departure_city, sample.arrival_city, date)
+        ),
+    ]
+
+
+def fixed_cases() -> List[Case]:
+    """与库存规模无关的用例"""
+    service = MockFlightService()
+    flight = service._flights[0].flight
+    payload = load_amadeus_payload()
+    token, _ = auth_service.create_access_token(user_id=1, email="bench@airease.dev")
+    queries = itertools.cycle(PARSE_QUERIES)
+    return [
+        ("mock._generate_score", lambda: service._generate_score(flight)),
+        (
+            "amadeus._transform_amadeus_response[50]",
+            lambda: amadeus_service._transform_amadeus_response(payload, "北京", "上海", "经济舱")
+        ),
+        ("auth.create_access_token", lambda: auth_service.create_access_token(1, "bench@airease.dev")),
+        ("auth.decode_token", lambda: auth_service.decode_token(token)),
+        ("gemini._fallback_parse", lambda: gemini_service._fallback_parse(next(queries))),
+    ]
+
+
+# ============================================================
+# Timing
+# ============================================================
+
+def time_case(func: Callable[[], object], min_time: float, repeat: int) -> Dict:
+    """返回单次调用耗时（微秒）：中位数、最小值、循环次数"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 10 ** 7:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return {
+        "medianUs": round(statistics.median(rounds) * 1e6, 3),
+        "minUs": round(min(rounds) * 1e6, 3),
+        "loops": number,
+        "repeat": repeat,
+    }
+
+
+def run(
+    sizes: List[int],
+    min_time: float = 0.2,
+    repeat: int = 5,
+    name_filter: Optional[str] = None
+) -> Dict[str, Dict]:
+    """运行全部用例，返回 {用例名: 统计}"""
+    results = {}
+
+    def measure(cases: List[Case]) -> None:
+        for name, func in cases:
+            if name_filter and name_filter not in name:
+                continue
+            results[name] = time_case(func, min_time, repeat)
+            print(f"{name:<44}{results[name]['medianUs']:>14.2f} µs")
+
+    measure(fixed_cases())
+    for size in sizes:
+        if name_filter and not any(name_filter in f"{name}[{size}]" for name in INVENTORY_CASES):
+            continue
+        measure(inventory_cases(inventory_service(size), size))
+    return results
+
+
+# ============================================================
+# Result Storage
+# ============================================================
+
+def current_commit() -> str:
+    """当前提交的短哈希，工作区有改动时追加 -dirty"""
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, text=True
+        ).strip()
+        dirty = subprocess.run(
+            ["git", "diff", "--quiet", "HEAD", "--", "."], cwd=os.path.dirname(BENCH_DIR)
+        ).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def save_results(commit: str, results: Dict[str, Dict]) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{commit}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "results": results
+        }, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_baseline(commit: str, against: Optional[str]) -> Optional[Dict]:
+    """指定提交的结果；未指定时取最近一次其他提交的结果"""
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    if against:
+        path = os.path.join(RESULTS_DIR, f"{against}.json")
+        if not os.path.exists(path):
+            return None
+    else:
+        candidates = [
+            os.path.join(RESULTS_DIR, name) for name in os.listdir(RESULTS_DIR)
+            if name.endswith(".json") and name != f"{commit}.json"
+        ]
+        if not candidates:
+            return None
+        path = max(candidates, key=os.path.getmtime)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """中位数变慢超过阈值的用例"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous["medianUs"]:
+            continue
+        ratio = current["medianUs"] / previous["medianUs"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {previous['medianUs']:.2f} µs -> {current['medianUs']:.2f} µs (+{(ratio - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="库存规模，逗号分隔")
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--against", help="与指定提交的结果比较")
+    parser.add_argument("--threshold", type=float, default=0.10, help="允许的相对退化（0.10 = 10%%）")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = run(sizes, args.min_time, args.repeat, args.filter)
+
+    commit = current_commit()
+    if not args.no_save:
+        print(f"\nResults written to {save_results(commit, results)}")
+
+    baseline = load_baseline(commit, args.against)
+    if baseline is None:
+        print("No baseline to compare against")
+        return 0
+    regressions = compare(results, baseline["results"], args.threshold)
+    if not regressions:
+        print(f"No regressions against {baseline['commit']}")
+        return 0
+    print(f"\nRegressions against {baseline['commit']} (threshold {args.threshold:.0%}):")
+    for line in regressions:
+        print(f"  {line}")
+    return 1 if args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+"""
+AirEase Backend - Middleware Overhead Benchmark
+对比 BaseHTTPMiddleware 与纯 ASGI 中间件的吞吐
+
+    cd backend
+    python -m benchmarks.middleware_overhead --requests 5000 --concurrency 50
+
+直接以 ASGI 调用应用（不经过网络和 HTTP 客户端），两组应用只有中间件实现不同。
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from fastapi import FastAPI, Request
+
+from app.config import settings
+from app.middleware import LatencyBudgetMiddleware, ProcessTimeMiddleware
+from app.routes.flights import router as flights_router
+from app.services.resilience import latency_budget
+
+# 搜索日期相对今天计算，落在 Mock 库存的滚动窗口（MOCK_INVENTORY_DAYS）内，结果集不为空
+SEARCH_DATE = (date.today() + timedelta(days=7)).strftime("%Y-%m-%d")
+
+ENDPOINTS = [
+    ("/health", b""),
+    ("/v1/flights/search", f"from=北京&to=上海&date={SEARCH_DATE}&cabin=economy".encode("utf-8")),
+]
+
+
+def build_app(legacy: bool) -> FastAPI:
+    """legacy=True 时使用 @app.middleware("http")（BaseHTTPMiddleware）"""
+    app = FastAPI()
+    app.include_router(flights_router)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    if legacy:
+        @app.middleware("http")
+        async def add_process_time_header(request: Request, call_next):
+            start_time = time.time()
+            response = await call_next(request)
+            response.headers["X-Process-Time"] = str(round((time.time() - start_time) * 1000, 2))
+            return response
+
+        @app.middleware("http")
+        async def apply_latency_budget(request: Request, call_next):
+            with latency_budget(settings.request_latency_budget_ms / 1000):
+                return await call_next(request)
+    else:
+        app.add_middleware(ProcessTimeMiddleware)
+        app.add_middleware(LatencyBudgetMiddleware)
+
+    return app
+
+
+async def asgi_get(app: Callable, path: str, query: bytes) -> int:
+    """发起一次 ASGI GET 请求，返回状态码"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query, "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80), "root_path": "",
+    }
+    status = 0
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_done.set()
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app: Callable, path: str, query: bytes, requests: int, concurrency: int) -> float:
+    """返回每秒请求数"""
+    for _ in range(min(200, requests)):
+        await asgi_get(app, path, query)
+
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            status = await asgi_get(app, path, query)
+            assert status == 200, status
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+async def run(requests: int, concurrency: int, rounds: int) -> List[Dict]:
+    apps = {"BaseHTTPMiddleware": build_app(legacy=True), "pure ASGI": build_app(legacy=False)}
+    results = []
+    for path, query in ENDPOINTS:
+        best: Dict[str, float] = {}
+        for _ in range(rounds):
+            for name, app in apps.items():
+                rps = await measure(app, path, query, requests, concurrency)
+                best[name] = max(best.get(name, 0.0), rps)
+        results.append({"path": path, **best})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3, help="每组取最好的一轮")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.concurrency, args.rounds))
+    print(f"{'endpoint':<22}{'BaseHTTPMiddleware':>20}{'pure ASGI':>14}{'gain':>9}")
+    for row in results:
+        legacy, pure = row["BaseHTTPMiddleware"], row["pure ASGI"]
+        print(f"{row['path']:<22}{legacy:>16.0f} r/s{pure:>10.0f} r/s{(pure / legacy - 1) * 100:>8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
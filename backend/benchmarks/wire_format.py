@@ -0,0 +1,118 @@
+"""
+AirEase Backend - Wire Format Benchmark
+搜索响应各编码格式的体积与编码/解码耗时
+
+    cd backend
+    python -m benchmarks.wire_format                  # 20 / 200 / 2000 个航班
+    python -m benchmarks.wire_format --sizes 20,2000 --fields list
+
+编码耗时从模型开始计（model_dump + 行转列 + 序列化），与接口中的路径一致；
+JSON 与 Starlette JSONResponse 使用相同的 json.dumps 参数。
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.encoding import msgpack, to_columns
+from app.models import FlightWithScore
+from app.projection import compile_fields, project
+from app.services.mock_service import MockFlightService
+
+DEFAULT_SIZES = (20, 200, 2000)
+
+
+def _json_bytes(content: Any) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def formats() -> List[Tuple[str, bool, Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    """(名称, 是否列式, 编码, 解码)"""
+    results = [
+        ("json", False, _json_bytes, json.loads),
+        ("columnar+json", True, _json_bytes, json.loads),
+    ]
+    if msgpack is not None:
+        unpack = lambda data: msgpack.unpackb(data, raw=False)
+        results += [
+            ("msgpack", False, lambda c: msgpack.packb(c, use_bin_type=True), unpack),
+            ("columnar+msgpack", True, lambda c: msgpack.packb(c, use_bin_type=True), unpack),
+        ]
+    return results
+
+
+def _median_us(func: Callable[[], Any], repeat: int) -> float:
+    number = max(1, int(0.05 / max(_once(func), 1e-6)))
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return statistics.median(rounds) * 1e6
+
+
+def _once(func: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(sizes: List[int], fields: Optional[str] = None, repeat: int = 5) -> Dict[str, Dict[str, Dict]]:
+    """{规模: {格式: {bytes, encodeUs, decodeUs}}}"""
+    service = MockFlightService()
+    projection = compile_fields(fields, FlightWithScore) if fields else None
+    meta = {"total": 0, "searchId": "search-bench", "cachedAt": None, "restrictedCount": 0, "isAuthenticated": True}
+    results: Dict[str, Dict[str, Dict]] = {}
+
+    for size in sizes:
+        flights = service.generate_synthetic_inventory(size, seed=size)
+
+        def rows() -> List[Dict]:
+            if projection is not None:
+                return project(flights, projection)
+            return [fws.model_dump(mode="json", by_alias=True) for fws in flights]
+
+        results[str(size)] = {}
+        for name, columnar, encode, decode in formats():
+            def build(columnar=columnar, encode=encode) -> bytes:
+                data = rows()
+                body = {"columns": to_columns(data)} if columnar else {"flights": data}
+                return encode({**body, "meta": meta})
+
+            payload = build()
+            results[str(size)][name] = {
+                "bytes": len(payload),
+                "encodeUs": round(_median_us(build, repeat), 1),
+                "decodeUs": round(_median_us(lambda: decode(payload), repeat), 1),
+            }
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="航班数，逗号分隔")
+    parser.add_argument("--fields", help="稀疏字段集（如 list）")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if msgpack is None:
+        print("msgpack not installed, binary formats skipped")
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = run(sizes, args.fields, args.repeat)
+
+    print(f"{'flights':>8} {'format':<18}{'bytes':>12}{'vs json':>9}{'encode µs':>12}{'decode µs':>12}")
+    for size, by_format in results.items():
+        baseline = by_format["json"]["bytes"]
+        for name, stats in by_format.items():
+            print(
+                f"{size:>8} {name:<18}{stats['bytes']:>12,}{stats['bytes'] / baseline:>8.0%}"
+                f"{stats['encodeUs']:>12,.0f}{stats['decodeUs']:>12,.0f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
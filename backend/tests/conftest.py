@@ -0,0 +1,31 @@
+"""
+AirEase Backend Tests
+共享测试夹具
+"""
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app
+from app.middleware.rate_limit import rate_limit_backend
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    """In-process client for the full application"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Every test starts with full token buckets"""
+    if hasattr(rate_limit_backend, "clear"):
+        rate_limit_backend.clear()
+    yield
@@ -0,0 +1,172 @@
+"""
+AirEase Backend Tests
+本地上游桩服务（替代 Gemini / Amadeus 等外部 API，离线可用）
+"""
+
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+class FakeGemini:
+    """Gemini generateContent / streamGenerateContent 桩"""
+
+    def __init__(
+        self,
+        chunks: List[str] = None,
+        chunk_delay: float = 0.05,
+        responder: Optional[Callable[[str], str]] = None
+    ):
+        self.chunks = chunks or ["这个航班", "准点率高，", "座椅宽敞。"]
+        self.chunk_delay = chunk_delay
+        # 自定义 generateContent 的回复文本（参数为提示词）
+        self.responder = responder
+        self.requests = 0
+        self.prompts: List[str] = []
+        self.streams_started = 0
+        self.streams_completed = 0
+        self.streams_cancelled = 0
+        self.app = Starlette(routes=[
+            Route("/models/{model_action:path}", self.handle, methods=["POST"])
+        ])
+
+    @staticmethod
+    def _payload(text: str) -> dict:
+        return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+    async def handle(self, request: Request):
+        self.requests += 1
+        body = await request.json()
+        prompt = body["contents"][0]["parts"][0]["text"]
+        self.prompts.append(prompt)
+        action = request.path_params["model_action"].rsplit(":", 1)[-1]
+        if action == "streamGenerateContent":
+            return StreamingResponse(self._stream(), media_type="text/event-stream")
+        text = self.responder(prompt) if self.responder else "".join(self.chunks)
+        return JSONResponse(self._payload(text))
+
+    async def _stream(self):
+        self.streams_started += 1
+        try:
+            for chunk in self.chunks:
+                await asyncio.sleep(self.chunk_delay)
+                yield f"data: {json.dumps(self._payload(chunk), ensure_ascii=False)}\r\n\r\n"
+            self.streams_completed += 1
+        except asyncio.CancelledError:
+            self.streams_cancelled += 1
+            raise
+
+
+class FakeAmadeus:
+    """Amadeus OAuth2 token / Flight Offers Search 桩"""
+
+    CARRIERS = ["CA", "MU", "CZ", "HU", "3U", "ZH"]
+
+    def __init__(self, offers: int = 20, delay: float = 0.0):
+        self.offers = offers
+        self.delay = delay
+        self.token_requests = 0
+        self.search_requests = 0
+        self.searches: List[dict] = []
+        self.app = Starlette(routes=[
+            Route("/v1/security/oauth2/token", self.token, methods=["POST"]),
+            Route("/v2/shopping/flight-offers", self.flight_offers, methods=["GET"]),
+        ])
+
+    async def token(self, request: Request):
+        self.token_requests += 1
+        return JSONResponse({"access_token": "stub-token", "token_type": "Bearer", "expires_in": 1799})
+
+    async def flight_offers(self, request: Request):
+        self.search_requests += 1
+        params = dict(request.query_params)
+        self.searches.append(params)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return JSONResponse(self.payload(
+            params["originLocationCode"],
+            params["destinationLocationCode"],
+            params["departureDate"],
+            min(self.offers, int(params.get("max", self.offers)))
+        ))
+
+    def payload(self, origin: str, destination: str, date: str, count: int) -> dict:
+        """同一 (航线, 日期) 总是返回相同报价"""
+        rng = random.Random(f"{origin}-{destination}-{date}")
+        day = datetime.strptime(date, "%Y-%m-%d")
+        offers = []
+        for i in range(count):
+            departure = day + timedelta(hours=rng.randint(6, 21), minutes=rng.choice([0, 15, 30, 45]))
+            arrival = departure + timedelta(minutes=rng.randint(100, 240))
+            carrier = rng.choice(self.CARRIERS)
+            offers.append({
+                "type": "flight-offer",
+                "id": str(i + 1),
+                "numberOfBookableSeats": rng.randint(1, 9),
+                "itineraries": [{
+                    "duration": f"PT{(arrival - departure).seconds // 3600}H",
+                    "segments": [{
+                        "departure": {"iataCode": origin, "at": departure.isoformat()},
+                        "arrival": {"iataCode": destination, "at": arrival.isoformat()},
+                        "carrierCode": carrier,
+                        "number": str(rng.randint(1000, 9999)),
+                        "aircraft": {"code": rng.choice(["320", "321", "333", "359", "789"])},
+                    }]
+                }],
+                "price": {"currency": "CNY", "total": f"{rng.randint(600, 3000)}.00"},
+            })
+        return {"meta": {"count": count}, "data": offers}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve(app, port: int = None) -> Iterator[str]:
+    """在后台线程中运行 uvicorn，返回 base URL"""
+    port = port or _free_port()
+    # loop="asyncio"：不安装全局 uvloop 策略，测试线程仍可使用默认事件循环
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", loop="asyncio"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("stub server did not start")
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    # 单独运行桩服务，例如让后台票价采集离线运行：
+    #   python -m tests.stubs amadeus --port 8001
+    #   AMADEUS_BASE_URL=http://127.0.0.1:8001 FARE_INGEST_ENABLED=true uvicorn app.main:app
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AirEase 上游桩服务")
+    parser.add_argument("service", choices=["amadeus", "gemini"])
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--offers", type=int, default=20, help="Amadeus 每次查询返回的报价数")
+    args = parser.parse_args()
+
+    stub = FakeAmadeus(offers=args.offers) if args.service == "amadeus" else FakeGemini()
+    uvicorn.run(stub.app, host="127.0.0.1", port=args.port, log_level="info")
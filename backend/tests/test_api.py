@@ -4,21 +4,9 @@ API测试
 """
 
 import pytest
-from httpx import AsyncClient, ASGITransport
-from app.main import app
-
-
-@pytest.fixture
-def anyio_backend():
-    return "asyncio"
-
-
-@pytest.fixture
-async def client():
-    """Create test client"""
-    transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url="http://test") as ac:
-        yield ac
+from httpx import AsyncClient
+from app.config import settings
+from app.services.mock_service import mock_flight_service
 
 
 @pytest.mark.anyio
@@ -84,6 +72,40 @@ async def test_flight_detail_not_found(client: AsyncClient):
     assert response.status_code == 404
 
 
+@pytest.mark.anyio
+async def test_flights_batch(client: AsyncClient):
+    """Test batch flight lookup keeps request order and reports missing IDs"""
+    ids = [f.flight.id for f in mock_flight_service._flights[:3]]
+    response = await client.post(
+        "/v1/flights/batch",
+        json={"ids": [ids[2], "nonexistent-flight", ids[0], ids[2]]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [f["flight"]["id"] for f in data["flights"]] == [ids[2], ids[0]]
+    assert data["missing"] == ["nonexistent-flight"]
+    assert data["flights"][0]["priceHistory"] is None
+
+    response = await client.post(
+        "/v1/flights/batch", params={"include": "priceHistory"}, json={"ids": ids}
+    )
+    assert response.status_code == 200
+    assert all(len(f["priceHistory"]["points"]) == 7 for f in response.json()["flights"])
+
+
+@pytest.mark.anyio
+async def test_flights_batch_limits(client: AsyncClient):
+    """Test batch size cap and include validation"""
+    too_many = [f"flight-{i}" for i in range(settings.flight_batch_max_size + 1)]
+    response = await client.post("/v1/flights/batch", json={"ids": too_many})
+    assert response.status_code == 400
+
+    response = await client.post(
+        "/v1/flights/batch", params={"include": "reviews"}, json={"ids": ["flight-1"]}
+    )
+    assert response.status_code == 400
+
+
 @pytest.mark.anyio
 async def test_ai_search(client: AsyncClient):
     """Test AI search endpoint"""
@@ -105,3 +127,11 @@ async def test_ai_health(client: AsyncClient):
     data = response.json()
     assert "status" in data
     assert data["service"] == "gemini"
+
+
+@pytest.mark.anyio
+async def test_process_time_header(client: AsyncClient):
+    """Timing middleware adds X-Process-Time in milliseconds"""
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert float(response.headers["x-process-time"]) >= 0
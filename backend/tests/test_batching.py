@@ -0,0 +1,89 @@
+"""
+AirEase Backend Tests
+Gemini评分解释微批处理测试
+"""
+
+import asyncio
+import json
+import re
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services.gemini_service import gemini_service
+from tests.stubs import FakeGemini, serve
+
+
+def batch_responder(prompt: str) -> str:
+    """Answer combined prompts with a JSON array, single prompts with plain text"""
+    ids = re.findall(r"\[id=(\d+)\]", prompt)
+    if not ids:
+        return "single"
+    return json.dumps([{"id": int(i), "explanation": f"batched-{i}"} for i in ids])
+
+
+@pytest.fixture
+async def fake_gemini(monkeypatch):
+    fake = FakeGemini(responder=batch_responder)
+    with serve(fake.app) as base_url:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            monkeypatch.setattr(gemini_service, "base_url", base_url)
+            monkeypatch.setattr(gemini_service, "client", client)
+            monkeypatch.setattr(settings, "ai_explain_batch_window_ms", 30)
+            monkeypatch.setattr(settings, "ai_explain_batch_max_size", 8)
+            gemini_service._explanation_cache.clear()
+            yield fake
+    gemini_service._explanation_cache.clear()
+
+
+async def _explain_many(count: int) -> list:
+    return await asyncio.gather(*(
+        gemini_service.generate_score_explanation(f"flight-{i}", "8.0", "business")
+        for i in range(count)
+    ))
+
+
+@pytest.mark.anyio
+async def test_concurrent_requests_share_one_call(fake_gemini):
+    """Requests inside the window become one combined Gemini call"""
+    replies = await _explain_many(5)
+    assert replies == [f"batched-{i}" for i in range(5)]
+    assert fake_gemini.requests == 1
+
+
+@pytest.mark.anyio
+async def test_batch_size_cap_splits_batches(fake_gemini, monkeypatch):
+    """A full batch is flushed without waiting for the window"""
+    monkeypatch.setattr(settings, "ai_explain_batch_max_size", 3)
+    replies = await _explain_many(7)
+    assert len(replies) == 7
+    assert fake_gemini.requests == 3
+
+
+@pytest.mark.anyio
+async def test_lone_request_uses_single_prompt(fake_gemini):
+    """A window with one request sends the normal prompt"""
+    reply = await gemini_service.generate_score_explanation("solo", "7.0", "family")
+    assert reply == "single"
+    assert "[id=" not in fake_gemini.prompts[0]
+
+
+@pytest.mark.anyio
+async def test_unparseable_batch_falls_back_to_individual_calls(fake_gemini):
+    """Malformed combined output triggers per-item requests"""
+    fake_gemini.responder = lambda prompt: "not json" if "[id=" in prompt else "single"
+    replies = await _explain_many(3)
+    assert replies == ["single"] * 3
+    assert fake_gemini.requests == 4
+
+
+@pytest.mark.anyio
+async def test_partial_batch_retries_only_missing_items(fake_gemini):
+    """Items missing from the combined answer are fetched individually"""
+    fake_gemini.responder = lambda prompt: (
+        json.dumps([{"id": 0, "explanation": "batched-0"}]) if "[id=" in prompt else "single"
+    )
+    replies = await _explain_many(3)
+    assert replies == ["batched-0", "single", "single"]
+    assert fake_gemini.requests == 3
@@ -0,0 +1,75 @@
+"""
+AirEase Backend Tests
+压测工具：合成库存与回归判定
+"""
+
+from benchmarks import compression, micro, wire_format
+from benchmarks.load_test import compare
+from app.services.mock_service import MockFlightService
+
+
+def test_synthetic_inventory_is_deterministic():
+    service = MockFlightService()
+    first = service.generate_synthetic_inventory(50, seed=7)
+    second = service.generate_synthetic_inventory(50, seed=7)
+
+    assert len(first) == 50
+    assert [f.flight.flight_number for f in first] == [f.flight.flight_number for f in second]
+    assert all(f.flight.departure_city != f.flight.arrival_city for f in first)
+
+
+def test_replace_inventory_is_searchable():
+    service = MockFlightService()
+    flights = service.generate_synthetic_inventory(200, seed=1)
+    service.replace_inventory(flights)
+
+    target = flights[0].flight
+    results = service.search_flights(target.departure_city, target.arrival_city, "", target.cabin)
+    assert target.id in {f.flight.id for f in results}
+    assert service.get_flight(flights[-1].flight.id) is flights[-1]
+
+
+def _results(p95: float, rps: float) -> dict:
+    row = {"count": 100, "errors": 0, "rps": rps, "p50Ms": 1.0, "p95Ms": p95, "p99Ms": p95}
+    return {"results": {"inprocess": {"search": row}}}
+
+
+def test_compare_flags_latency_and_throughput_regressions():
+    baseline = _results(p95=10.0, rps=100.0)
+
+    assert compare(_results(p95=11.0, rps=95.0), baseline, threshold=0.15) == []
+    regressions = compare(_results(p95=12.0, rps=80.0), baseline, threshold=0.15)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("inprocess/search: p95")
+
+
+def test_micro_benchmarks_cover_hot_functions():
+    results = micro.run([100], min_time=0.001, repeat=1)
+
+    assert "amadeus._transform_amadeus_response[50]" in results
+    assert "mock.search_flights[100]" in results
+    assert "mock.get_flight_detail[100]" in results
+    assert all(row["medianUs"] > 0 for row in results.values())
+
+
+def test_micro_compare_flags_slower_median():
+    baseline = {"auth.decode_token": {"medianUs": 50.0}}
+
+    assert micro.compare({"auth.decode_token": {"medianUs": 54.0}}, baseline, 0.10) == []
+    assert micro.compare({"auth.decode_token": {"medianUs": 60.0}}, baseline, 0.10)
+
+
+def test_wire_format_benchmark_reports_each_format():
+    results = wire_format.run([5], repeat=1)
+
+    formats = results["5"]
+    assert {"json", "columnar+json"} <= formats.keys()
+    assert formats["columnar+json"]["bytes"] < formats["json"]["bytes"]
+
+
+def test_compression_benchmark_reports_ratios():
+    results = compression.run([5], repeat=1)
+
+    by_codec = results["5"]
+    assert by_codec["identity"]["ratio"] == 1.0
+    assert 0 < by_codec["gzip-6"]["ratio"] < 1
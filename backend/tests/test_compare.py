@@ -0,0 +1,82 @@
+"""
+AirEase Backend Tests
+航班PK对比
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+
+from app.models import Flight, FlightFacilities, FlightScore, FlightWithScore, ScoreDimensions
+from app.services.compare_service import compare_flights
+from app.services.mock_service import mock_flight_service
+
+
+def _flight(flight_id: str, price: float, minutes: int, safety: float, comfort: float,
+            service: float, value: float) -> FlightWithScore:
+    departure = datetime(2026, 11, 1, 8, 0)
+    flight = Flight(
+        id=flight_id, flightNumber="CA1234", airline="中国国航", airlineCode="CA",
+        departureCity="北京", departureCityCode="PEK", departureAirport="首都国际机场",
+        departureAirportCode="PEK", departureTime=departure,
+        arrivalCity="上海", arrivalCityCode="SHA", arrivalAirport="虹桥国际机场",
+        arrivalAirportCode="SHA", arrivalTime=departure + timedelta(minutes=minutes),
+        durationMinutes=minutes, stops=0, cabin="经济舱", price=price, currency="CNY"
+    )
+    score = FlightScore(
+        overallScore=8.0,
+        dimensions=ScoreDimensions(safety=safety, comfort=comfort, service=service, value=value)
+    )
+    facilities = FlightFacilities(hasWifi=False, hasPower=False, hasIFE=False, mealIncluded=False)
+    return FlightWithScore(flight=flight, score=score, facilities=facilities)
+
+
+def test_compare_winners_deltas_and_rank():
+    comfy = _flight("comfy", 1800, 130, 9.0, 9.0, 9.0, 6.0)
+    cheap = _flight("cheap", 600, 150, 8.0, 6.0, 7.0, 9.0)
+
+    result = compare_flights([comfy, cheap], "business")
+    metrics = {m.name: m for m in result.metrics}
+
+    assert result.flight_ids == ["comfy", "cheap"]
+    assert metrics["comfort"].winners == ["comfy"]
+    assert metrics["comfort"].deltas == [0.0, 3.0]
+    assert metrics["price"].winners == ["cheap"]
+    assert metrics["price"].deltas == [1200.0, 0.0]
+    assert metrics["durationMinutes"].winners == ["comfy"]
+    assert result.weighted_totals == [8.55, 7.2]
+    assert result.rank == ["comfy", "cheap"]
+
+    # 学生画像重视性价比
+    assert compare_flights([comfy, cheap], "student").rank == ["cheap", "comfy"]
+
+
+def test_compare_ties_break_on_price():
+    a = _flight("a", 900, 120, 8.0, 8.0, 8.0, 8.0)
+    b = _flight("b", 800, 120, 8.0, 8.0, 8.0, 8.0)
+
+    result = compare_flights([a, b])
+
+    assert result.persona == "default"
+    assert {m.name: m.winners for m in result.metrics}["safety"] == ["a", "b"]
+    assert result.rank == ["b", "a"]
+
+
+@pytest.mark.anyio
+async def test_compare_endpoint(client: AsyncClient):
+    ids = [f.flight.id for f in mock_flight_service._flights[:3]]
+    response = await client.get("/v1/flights/compare", params={"ids": ",".join(ids), "persona": "family"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["flightIds"] == ids
+    assert sorted(data["rank"]) == sorted(ids)
+    assert {m["name"] for m in data["metrics"]} >= {"safety", "comfort", "service", "value", "price"}
+    assert all(len(m["values"]) == 3 for m in data["metrics"])
+
+    response = await client.get("/v1/flights/compare", params={"ids": ids[0]})
+    assert response.status_code == 400
+    response = await client.get("/v1/flights/compare", params={"ids": f"{ids[0]},{ids[1]}", "persona": "pilot"})
+    assert response.status_code == 400
+    response = await client.get("/v1/flights/compare", params={"ids": f"{ids[0]},nonexistent-flight"})
+    assert response.status_code == 404
@@ -0,0 +1,126 @@
+"""
+AirEase Backend Tests
+响应压缩与搜索响应缓存
+"""
+
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app
+from app.middleware import compression
+from app.middleware.compression import CompressionMiddleware, choose_encoding
+from app.services.mock_service import mock_flight_service
+from app.services.search_cache import SearchCache, search_cache
+
+
+def _sample_app() -> FastAPI:
+    sample = FastAPI()
+    sample.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @sample.get("/big")
+    async def big():
+        return {"items": ["airease"] * 200}
+
+    @sample.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @sample.get("/stream")
+    async def stream():
+        async def events():
+            for i in range(3):
+                yield f"data: {'x' * 400}{i}\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return sample
+
+
+def test_choose_encoding_honors_quality_and_server_preference():
+    assert choose_encoding(None) is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("*") == next(iter(compression.CODECS))
+    assert choose_encoding("gzip, br;q=0.5") == "gzip"
+
+
+@pytest.mark.anyio
+async def test_middleware_compresses_large_single_body_responses():
+    transport = ASGITransport(app=_sample_app())
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        big = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert big.headers["content-encoding"] == "gzip"
+        assert big.headers["vary"] == "Accept-Encoding"
+        assert int(big.headers["content-length"]) < 500
+        assert big.json() == {"items": ["airease"] * 200}
+
+        small = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+
+        plain = await client.get("/big", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+
+        stream = await client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in stream.headers
+        assert stream.text.count("data:") == 3
+
+
+def test_search_cache_evicts_least_recently_used_and_expired():
+    cache = SearchCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", b"1", "application/json")
+    cache.put("b", b"2", "application/json")
+    assert cache.get("a") is not None
+    cache.put("c", b"3", "application/json")
+
+    assert cache.get("b") is None
+    assert cache.get("a").body == b"1"
+    assert len(cache) == 2
+
+    expired = SearchCache(max_entries=2, ttl_seconds=-1)
+    expired.put("a", b"1", "application/json")
+    assert expired.get("a") is None
+
+
+def test_cached_entry_compresses_once(monkeypatch):
+    cache = SearchCache(max_entries=2, ttl_seconds=60)
+    entry = cache.put("a", b"x" * 2000, "application/json")
+    calls = []
+    monkeypatch.setitem(compression.CODECS, "gzip", lambda data: calls.append(1) or gzip.compress(data))
+
+    assert gzip.decompress(entry.compressed("gzip")) == b"x" * 2000
+    entry.compressed("gzip")
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_search_serves_precompressed_cached_body():
+    search_cache.clear()
+    flight = mock_flight_service._flights[0].flight
+    params = {
+        "from": flight.departure_city,
+        "to": flight.arrival_city,
+        "date": flight.departure_time.strftime("%Y-%m-%d"),
+        "cabin": flight.cabin,
+        "flexDays": 3,
+    }
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get("/v1/flights/search", params=params, headers={"Accept-Encoding": "gzip"})
+        second = await client.get("/v1/flights/search", params=params, headers={"Accept-Encoding": "gzip"})
+        plain = await client.get("/v1/flights/search", params=params, headers={"Accept-Encoding": "identity"})
+
+        assert first.headers["content-encoding"] == "gzip"
+        assert second.content == first.content
+        assert "content-encoding" not in plain.headers
+        assert json.loads(plain.content) == first.json()
+        assert first.json()["meta"]["cachedAt"] is not None
+
+        # 价格变化后库存版本递增，缓存条目不再命中
+        mock_flight_service.update_flight(flight.id, price=flight.price + 1)
+        third = await client.get("/v1/flights/search", params=params, headers={"Accept-Encoding": "gzip"})
+        assert third.json()["meta"]["searchId"] != first.json()["meta"]["searchId"]
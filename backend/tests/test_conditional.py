@@ -0,0 +1,95 @@
+"""
+AirEase Backend Tests
+ETag 与条件 GET（航班详情、价格历史）
+"""
+
+import pytest
+
+from app.middleware.compression import etag_with_encoding, strip_etag_encoding
+from app.services.mock_service import mock_flight_service
+
+
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+def test_etag_encoding_suffix_round_trip():
+    assert etag_with_encoding('"abc"', "gzip") == '"abc-gzip"'
+    assert etag_with_encoding('W/"abc"', "br") == 'W/"abc-br"'
+    assert strip_etag_encoding('"abc-zstd"') == '"abc"'
+    assert strip_etag_encoding('"abc"') == '"abc"'
+
+
+@pytest.mark.anyio
+async def test_detail_returns_304_without_building_models(client, monkeypatch):
+    flight_id = mock_flight_service._flights[0].flight.id
+    first = await client.get(f"/v1/flights/{flight_id}", headers=IDENTITY)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert first.headers["cache-control"].startswith("public, max-age=")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("304 不应构建模型")
+
+    monkeypatch.setattr(mock_flight_service, "get_flight_detail", fail)
+    monkeypatch.setattr(mock_flight_service, "get_flight", fail)
+    second = await client.get(f"/v1/flights/{flight_id}", headers={**IDENTITY, "If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert "cache-control" in second.headers
+
+
+@pytest.mark.anyio
+async def test_etag_changes_only_when_flight_changes(client):
+    flight = mock_flight_service._flights[1].flight
+    url = f"/v1/flights/{flight.id}/price-history"
+    first = await client.get(url, headers=IDENTITY)
+    again = await client.get(url, headers=IDENTITY)
+    assert again.headers["etag"] == first.headers["etag"]
+    assert again.json() == first.json()
+
+    # 相同价格不算变化
+    mock_flight_service.update_flight(flight.id, price=flight.price)
+    unchanged = await client.get(url, headers={**IDENTITY, "If-None-Match": first.headers["etag"]})
+    assert unchanged.status_code == 304
+
+    mock_flight_service.update_flight(flight.id, seats_remaining=flight.seats_remaining + 1)
+    changed = await client.get(url, headers={**IDENTITY, "If-None-Match": first.headers["etag"]})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != first.headers["etag"]
+
+
+@pytest.mark.anyio
+async def test_etag_differs_per_representation(client):
+    flight_id = mock_flight_service._flights[2].flight.id
+    url = f"/v1/flights/{flight_id}"
+    full = await client.get(url, headers=IDENTITY)
+    partial = await client.get(url, params={"fields": "flight.price"}, headers=IDENTITY)
+    history = await client.get(f"{url}/price-history", headers=IDENTITY)
+    assert len({full.headers["etag"], partial.headers["etag"], history.headers["etag"]}) == 3
+
+    stale = await client.get(url, headers={**IDENTITY, "If-None-Match": partial.headers["etag"]})
+    assert stale.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_compressed_representation_has_suffixed_etag(client):
+    flight_id = mock_flight_service._flights[3].flight.id
+    url = f"/v1/flights/{flight_id}"
+    plain = await client.get(url, headers=IDENTITY)
+    gzipped = await client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == etag_with_encoding(plain.headers["etag"], "gzip")
+
+    revalidated = await client.get(
+        url, headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == gzipped.headers["etag"]
+
+
+@pytest.mark.anyio
+async def test_conditional_get_unknown_flight_is_404(client):
+    response = await client.get("/v1/flights/no-such-flight", headers={"If-None-Match": "*"})
+    assert response.status_code == 404
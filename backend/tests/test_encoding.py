@@ -0,0 +1,90 @@
+"""
+AirEase Backend Tests
+响应格式协商（JSON / MessagePack / 列式）
+"""
+
+from collections import Counter
+
+import pytest
+from httpx import AsyncClient
+
+from app.encoding import COLUMNAR_JSON, JSON, MSGPACK, negotiate, to_columns
+from app.services.auth_service import auth_service
+from app.services.mock_service import mock_flight_service
+
+msgpack = pytest.importorskip("msgpack")
+
+
+def test_negotiate_prefers_highest_quality_offer():
+    assert negotiate(None) == JSON
+    assert negotiate("application/msgpack") == MSGPACK
+    assert negotiate("application/x-msgpack") == MSGPACK
+    assert negotiate("application/json;q=0.9, application/msgpack") == MSGPACK
+    assert negotiate("application/msgpack;q=0.5, application/json") == JSON
+    assert negotiate("text/html, */*;q=0.1") == JSON
+    assert negotiate("application/msgpack;q=0") == JSON
+    # 列式格式只在允许的接口上提供
+    assert negotiate(COLUMNAR_JSON) == JSON
+    assert negotiate(COLUMNAR_JSON, columnar=True) == COLUMNAR_JSON
+
+
+def test_to_columns_flattens_and_pads_missing_paths():
+    rows = [
+        {"flight": {"id": "a", "price": 1.0}, "tags": ["x"]},
+        {"flight": {"id": "b"}, "extra": True},
+    ]
+
+    assert to_columns(rows) == {
+        "flight.id": ["a", "b"],
+        "flight.price": [1.0, None],
+        "tags": [["x"], None],
+        "extra": [None, True],
+    }
+    assert to_columns([]) == {}
+
+
+@pytest.mark.anyio
+async def test_search_encodings_carry_the_same_data(client: AsyncClient):
+    # 列式只在多行时更小：选一个当天有多个航班的航线（模拟库存随机生成）
+    routes = Counter(
+        (f.flight.departure_city, f.flight.arrival_city, f.flight.cabin, f.flight.departure_time.date())
+        for f in mock_flight_service._flights
+    )
+    flight = next(
+        f.flight for f in mock_flight_service._flights
+        if routes[(f.flight.departure_city, f.flight.arrival_city, f.flight.cabin, f.flight.departure_time.date())] >= 3
+    )
+    token, _ = auth_service.create_access_token(user_id=1, email="wire@airease.dev")
+    params = {
+        "from": flight.departure_city,
+        "to": flight.arrival_city,
+        "date": flight.departure_time.strftime("%Y-%m-%d"),
+        "cabin": flight.cabin,
+    }
+    headers = {"Authorization": f"Bearer {token}"}
+
+    as_json = await client.get("/v1/flights/search", params=params, headers=headers)
+    as_msgpack = await client.get("/v1/flights/search", params=params, headers={**headers, "Accept": MSGPACK})
+    as_columns = await client.get("/v1/flights/search", params=params, headers={**headers, "Accept": COLUMNAR_JSON})
+
+    assert "Accept" in [v.strip() for v in as_json.headers["vary"].split(",")]
+    assert as_msgpack.headers["content-type"] == MSGPACK
+    assert as_columns.headers["content-type"].startswith(COLUMNAR_JSON)
+
+    flights = as_json.json()["flights"]
+    assert msgpack.unpackb(as_msgpack.content)["flights"] == flights
+    columns = as_columns.json()["columns"]
+    assert columns["flight.id"] == [f["flight"]["id"] for f in flights]
+    assert columns["score.overallScore"] == [f["score"]["overallScore"] for f in flights]
+    assert len(as_msgpack.content) < len(as_json.content)
+    assert len(as_columns.content) < len(as_json.content)
+
+
+@pytest.mark.anyio
+async def test_detail_supports_msgpack(client: AsyncClient):
+    flight_id = mock_flight_service._flights[0].flight.id
+
+    response = await client.get(f"/v1/flights/{flight_id}", headers={"Accept": MSGPACK})
+
+    assert response.status_code == 200
+    assert msgpack.unpackb(response.content)["flight"]["id"] == flight_id
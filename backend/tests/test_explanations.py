@@ -0,0 +1,131 @@
+"""
+AirEase Backend Tests
+AI评分解释缓存与批量接口测试
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+
+from app.config import settings
+from app.services import explanation_service
+from app.services.gemini_service import gemini_service, EXPLANATION_UNAVAILABLE
+from app.services.mock_service import mock_flight_service
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    """Replace the Gemini call with a counting stub"""
+    calls = []
+
+    async def fake_request(flight_info, score_info, persona):
+        calls.append((flight_info, score_info, persona))
+        await asyncio.sleep(0.01)
+        return f"{persona}:{flight_info}"
+
+    gemini_service._explanation_cache.clear()
+    monkeypatch.setattr(gemini_service, "_request_score_explanation", fake_request)
+    yield calls
+    gemini_service._explanation_cache.clear()
+
+
+@pytest.mark.anyio
+async def test_explanation_is_cached_by_content(fake_gemini):
+    """Same (flight, score, persona) only calls Gemini once"""
+    first = await gemini_service.generate_score_explanation("CA1234", "8.5", "family")
+    second = await gemini_service.generate_score_explanation("CA1234", "8.5", "family")
+    other = await gemini_service.generate_score_explanation("CA1234", "8.5", "student")
+
+    assert first == second
+    assert other != first
+    assert len(fake_gemini) == 2
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_requests_share_one_call(fake_gemini):
+    """In-flight requests are deduplicated"""
+    replies = await asyncio.gather(*(
+        gemini_service.generate_score_explanation("MU5101", "7.9", "business")
+        for _ in range(5)
+    ))
+    assert len(set(replies)) == 1
+    assert len(fake_gemini) == 1
+
+
+@pytest.mark.anyio
+async def test_unavailable_reply_is_not_cached(monkeypatch):
+    """Failures are retried on the next request"""
+    async def failing_request(flight_info, score_info, persona):
+        return EXPLANATION_UNAVAILABLE
+
+    gemini_service._explanation_cache.clear()
+    monkeypatch.setattr(gemini_service, "_request_score_explanation", failing_request)
+    await gemini_service.generate_score_explanation("X", "Y", "business")
+    assert not gemini_service._explanation_cache
+
+
+@pytest.mark.anyio
+async def test_explain_batch_preserves_order(client: AsyncClient, fake_gemini):
+    """Batch endpoint returns one reply per item in order"""
+    flight_id = mock_flight_service.top_flights_by_route(1)[0].flight.id
+    response = await client.post(
+        "/v1/ai/explain/batch",
+        json={"items": [
+            {"message": "A", "persona": "family"},
+            {"flightId": flight_id, "persona": "student"},
+            {"message": "A", "persona": "family"}
+        ]}
+    )
+    assert response.status_code == 200
+    replies = response.json()["replies"]
+    assert len(replies) == 3
+    assert replies[0] == replies[2] == "family:A"
+    assert replies[1].startswith("student:")
+    assert len(fake_gemini) == 2
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(settings, "admin_secret", "admin-test")
+    return {"X-Admin-Token": "admin-test"}
+
+
+@pytest.mark.anyio
+async def test_precompute_warms_cache_for_flight_id(client: AsyncClient, fake_gemini, admin):
+    """Explain by flightId hits entries produced by the precompute job"""
+    response = await client.post(
+        "/v1/ai/explain/precompute", params={"topN": 1, "personas": "business"}, headers=admin
+    )
+    assert response.status_code == 202
+    await explanation_service._precompute_task
+
+    top = mock_flight_service.top_flights_by_route(1, days=settings.ai_precompute_days)
+    calls_after_precompute = len(fake_gemini)
+    assert calls_after_precompute == len(top)
+
+    response = await client.post("/v1/ai/explain", json={"flightId": top[0].flight.id, "persona": "business"})
+    assert response.status_code == 200
+    assert len(fake_gemini) == calls_after_precompute
+
+
+@pytest.mark.anyio
+async def test_precompute_requires_admin_and_runs_once(client: AsyncClient, fake_gemini, admin):
+    """Anonymous callers cannot trigger paid upstream calls; a running job is not started twice"""
+    url = "/v1/ai/explain/precompute"
+    assert (await client.post(url)).status_code == 403
+    assert (await client.post(url, headers={"X-Admin-Token": "wrong"})).status_code == 403
+
+    assert (await client.post(url, params={"topN": 1}, headers=admin)).status_code == 202
+    assert (await client.post(url, params={"topN": 1}, headers=admin)).status_code == 409
+    await explanation_service._precompute_task
+    assert (await client.post(url, params={"topN": 1}, headers=admin)).status_code == 202
+    await explanation_service._precompute_task
+
+
+def test_precompute_covers_near_term_departures_only():
+    end = datetime.combine(datetime.now().date() + timedelta(days=2), datetime.min.time())
+    flights = mock_flight_service.top_flights_by_route(3, days=2)
+    assert flights
+    assert all(fws.flight.departure_time < end for fws in flights)
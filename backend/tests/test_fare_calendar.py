@@ -0,0 +1,123 @@
+"""
+AirEase Backend Tests
+灵活日期搜索与低价日历
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+
+from app.models import Flight
+from app.services.fare_calendar import FareCalendar
+from app.services.mock_service import MockFlightService
+
+
+def _flight(flight_id: str, price: float, day: date = date(2026, 11, 1)) -> Flight:
+    departure = datetime.combine(day, datetime.min.time()) + timedelta(hours=8)
+    return Flight(
+        id=flight_id, flightNumber="CA1234", airline="中国国航", airlineCode="CA",
+        departureCity="北京", departureCityCode="PEK", departureAirport="首都国际机场",
+        departureAirportCode="PEK", departureTime=departure,
+        arrivalCity="上海", arrivalCityCode="SHA", arrivalAirport="虹桥国际机场",
+        arrivalAirportCode="SHA", arrivalTime=departure + timedelta(hours=2),
+        durationMinutes=120, stops=0, cabin="经济舱", price=price, currency="CNY"
+    )
+
+
+def test_fare_calendar_updates_incrementally():
+    calendar = FareCalendar()
+    calendar.rebuild([_flight("a", 900), _flight("b", 1000)])
+    day = date(2026, 11, 1)
+    assert calendar.min_price("PEK", "SHA", "经济舱", day) == 900
+
+    calendar.upsert(_flight("b", 800))
+    assert calendar.min_price("PEK", "SHA", "经济舱", day) == 800
+
+    # 最低价航班涨价后重算
+    calendar.upsert(_flight("b", 1200))
+    assert calendar.min_price("PEK", "SHA", "经济舱", day) == 900
+
+    # 改期后旧日期重算，新日期出现
+    calendar.upsert(_flight("a", 700, date(2026, 11, 2)))
+    assert calendar.min_price("PEK", "SHA", "经济舱", day) == 1200
+    assert calendar.min_price("PEK", "SHA", "经济舱", date(2026, 11, 2)) == 700
+
+    calendar.remove("b")
+    assert calendar.calendar([("PEK", "SHA")], "经济舱", day, 2) == [
+        (day, None), (date(2026, 11, 2), 700)
+    ]
+
+
+def test_search_filters_by_date_and_flex_window():
+    service = MockFlightService()
+    day = (datetime.now() + timedelta(days=5)).strftime("%Y-%m-%d")
+
+    exact = service.search_flights("北京", "上海", day, "economy")
+    flexible = service.search_flights("北京", "上海", day, "economy", flex_days=2)
+    assert {f.flight.departure_time.strftime("%Y-%m-%d") for f in exact} <= {day}
+    assert {f.flight.id for f in exact} < {f.flight.id for f in flexible}
+    spread = {f.flight.departure_time.date() for f in flexible}
+    assert max(spread) - min(spread) <= timedelta(days=4)
+
+    with pytest.raises(ValueError):
+        service.search_flights("北京", "上海", "2026/11/01", "economy")
+
+
+def test_price_calendar_matches_search_minimum():
+    service = MockFlightService()
+    start = datetime.now().date()
+    days = service.price_calendar("北京", "上海", "business", start, 5)
+
+    for day, price in days:
+        flights = service.search_flights("北京", "上海", day.strftime("%Y-%m-%d"), "business")
+        assert price == (min(f.flight.price for f in flights) if flights else None)
+
+    cheapest = min(
+        service.search_flights("北京", "上海", start.strftime("%Y-%m-%d"), "business"),
+        key=lambda f: f.flight.price,
+        default=None
+    )
+    if cheapest:
+        service.update_flight(cheapest.flight.id, price=1.0)
+        assert service.price_calendar("北京", "上海", "business", start, 1)[0][1] == 1.0
+
+
+@pytest.mark.anyio
+async def test_calendar_endpoint(client: AsyncClient):
+    response = await client.get(
+        "/v1/flights/calendar", params={"from": "北京", "to": "上海", "month": "2026-02"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["month"] == "2026-02"
+    assert len(data["days"]) == 28
+    assert data["days"][0] == {"date": "2026-02-01", "minPrice": None}
+
+    response = await client.get("/v1/flights/calendar", params={"from": "北京", "to": "上海"})
+    assert response.status_code == 200
+    assert any(day["minPrice"] for day in response.json()["days"])
+
+    response = await client.get(
+        "/v1/flights/calendar", params={"from": "北京", "to": "上海", "month": "2026-13"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_search_flex_days_parameter(client: AsyncClient):
+    day = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+    response = await client.get(
+        "/v1/flights/search", params={"from": "北京", "to": "上海", "date": day, "flexDays": 2}
+    )
+    assert response.status_code == 200
+
+    response = await client.get(
+        "/v1/flights/search", params={"from": "北京", "to": "上海", "date": day, "flexDays": 99}
+    )
+    assert response.status_code == 422
+
+    response = await client.get(
+        "/v1/flights/search", params={"from": "北京", "to": "上海", "date": "tomorrow"}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,222 @@
+"""
+AirEase Backend Tests
+票价快照采集与基于快照的价格历史
+"""
+
+import asyncio
+import threading
+from datetime import date, datetime, timedelta
+
+import httpx
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine, inspect
+
+from app.database import Base
+from app.main import app
+from app.models import PriceTrend
+from app.services import fare_history as fare_history_module
+from app.services.amadeus_service import AmadeusService
+from app.services.fare_history import FareHistoryStore, fare_key
+from app.services.fare_ingestion import FareIngestionJob, parse_routes
+from app.services.mock_service import mock_flight_service
+from app.services.resilience import CircuitBreaker, amadeus_policy
+from tests.stubs import FakeAmadeus, serve
+
+
+@pytest.fixture
+def store(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fares.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return FareHistoryStore(engine, batch_size=3)
+
+
+class CountingSource:
+    """记录最大并发数的 search_flights 桩"""
+
+    def __init__(self, flights, delay=0.01):
+        self.flights = flights
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    async def search_flights(self, from_city, to_city, date, cabin):
+        self.calls.append((from_city, to_city, date, cabin))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        if from_city == "失败":
+            raise RuntimeError("upstream error")
+        return self.flights
+
+
+def test_fare_snapshots_table_has_flight_ts_index(store):
+    indexes = inspect(store.engine).get_indexes("fare_snapshots")
+    assert {"name": "ix_fare_snapshots_fare_key_ts", "columns": ["fare_key", "ts"]} in [
+        {"name": i["name"], "columns": i["column_names"]} for i in indexes
+    ]
+
+
+def test_price_history_uses_last_snapshot_per_day(store):
+    flight = mock_flight_service._flights[0].flight.model_copy()
+    today = datetime.combine(date.today(), datetime.min.time())
+    for days_ago, price in ((8, 500.0), (2, 1000.0), (1, 1010.0), (0, 1200.0)):
+        flight.price = price - 100
+        store.insert_snapshots([flight], today - timedelta(days=days_ago) + timedelta(hours=9))
+        flight.price = price
+        store.insert_snapshots([flight], today - timedelta(days=days_ago) + timedelta(hours=18))
+
+    history = store.price_history(flight)
+
+    assert [(p.date, p.price) for p in history.points] == [
+        ((today - timedelta(days=d)).strftime("%Y-%m-%d"), price)
+        for d, price in ((2, 1000.0), (1, 1010.0), (0, 1200.0))
+    ]
+    assert history.trend == PriceTrend.RISING
+    assert store.latest_ts(flight) == today + timedelta(hours=18)
+
+    other = next(fws.flight for fws in mock_flight_service._flights if fare_key(fws.flight) != fare_key(flight))
+    assert store.price_history(other) is None
+
+
+def test_price_history_is_lowest_fare_of_the_market(store):
+    """同一航线/日期/舱位的不同航班号共享价格历史，取该轮采集的最低价"""
+    flight = mock_flight_service._flights[0].flight
+    offers = [
+        flight.model_copy(update={"flight_number": number, "price": price})
+        for number, price in (("MU5101", 900.0), ("CA1501", 760.0))
+    ]
+    store.insert_snapshots(offers, datetime.now())
+
+    history = store.price_history(flight)
+
+    assert [p.price for p in history.points] == [760.0]
+    assert history.flight_id == flight.id
+    assert history.current_price == flight.price
+
+
+@pytest.mark.anyio
+async def test_run_once_bounds_concurrency_and_batches_inserts(store):
+    flights = [fws.flight for fws in mock_flight_service._flights[:7]]
+    source = CountingSource([fws for fws in mock_flight_service._flights[:7]])
+    job = FareIngestionJob(
+        source, store, parse_routes("北京-上海, 失败-上海, bogus"), ["economy", "business"],
+        days_ahead=3, interval_seconds=60, concurrency=2
+    )
+
+    count = await job.run_once(today=date(2026, 11, 1))
+
+    assert len(source.calls) == 2 * 3 * 2
+    assert {call[3] for call in source.calls} == {"经济舱", "公务舱"}
+    assert source.max_in_flight == 2
+    # 失败的航线不影响其他查询
+    assert count == 6 * len(flights)
+    same_market = sum(fare_key(flight) == fare_key(flights[0]) for flight in flights)
+    assert len(store.snapshots(flights[0], datetime(2000, 1, 1))) == 6 * same_market
+
+
+@pytest.mark.anyio
+async def test_ingests_from_amadeus_stub(store, monkeypatch):
+    stub = FakeAmadeus(offers=4)
+    service = AmadeusService()
+    monkeypatch.setattr(amadeus_policy, "breaker", CircuitBreaker("amadeus-ingest-test"))
+    with serve(stub.app) as base_url:
+        service.base_url = base_url
+        service.client = httpx.AsyncClient()
+        job = FareIngestionJob(service, store, [("PEK", "SHA")], ["economy"], 2, 60, 2)
+        count = await job.run_once(today=date(2026, 11, 1))
+        await service.client.aclose()
+
+    assert count == 8
+    assert stub.search_requests == 2
+    with store.engine.connect() as conn:
+        keys = {row[0] for row in conn.exec_driver_sql("SELECT fare_key FROM fare_snapshots")}
+    assert keys == {"PEK|SHA|2026-11-01|经济舱", "PEK|SHA|2026-11-02|经济舱"}
+
+
+@pytest.mark.anyio
+async def test_ingested_fares_reach_price_history_endpoint(store, monkeypatch):
+    """采集的真实报价（航班号/时刻与库存无关）按航线市场出现在库存航班的价格历史中"""
+    monkeypatch.setattr(fare_history_module.fare_history, "engine", store.engine)
+    monkeypatch.setattr(fare_history_module.fare_history, "_latest", {})
+    flight = mock_flight_service._flights[9].flight
+    origin, destination = flight.departure_airport_code, flight.arrival_airport_code
+    departure = flight.departure_time.date()
+    stub = FakeAmadeus(offers=4)
+    service = AmadeusService()
+    monkeypatch.setattr(amadeus_policy, "breaker", CircuitBreaker("amadeus-e2e-test"))
+    job = FareIngestionJob(
+        service, fare_history_module.fare_history, [(origin, destination)], [flight.cabin], 1, 60, 1
+    )
+    url = f"/v1/flights/{flight.id}/price-history"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        before = await client.get(url, headers={"Accept-Encoding": "identity"})
+
+        with serve(stub.app) as base_url:
+            service.base_url = base_url
+            service.client = httpx.AsyncClient()
+            assert await job.run_once(today=departure) == 4
+            await service.client.aclose()
+
+        after = await client.get(
+            url, headers={"Accept-Encoding": "identity", "If-None-Match": before.headers["etag"]}
+        )
+
+    offers = stub.payload(origin, destination, departure.strftime("%Y-%m-%d"), 4)["data"]
+    # 新快照使 ETag 失效，价格为该市场本轮采集的最低价
+    assert after.status_code == 200
+    assert after.json()["points"] == [{
+        "date": date.today().strftime("%Y-%m-%d"),
+        "price": min(float(o["price"]["total"]) for o in offers)
+    }]
+
+
+@pytest.mark.anyio
+async def test_conditional_and_unsnapshotted_requests_skip_database(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("不应查询数据库")
+
+    store = fare_history_module.fare_history
+    monkeypatch.setattr(store, "_latest", {})
+    monkeypatch.setattr(store, "snapshots", fail)
+    flight = mock_flight_service._flights[12].flight
+    url = f"/v1/flights/{flight.id}/price-history"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        # 没有快照的航班不查询
+        assert (await client.get(url)).status_code == 200
+
+        store._latest[fare_key(flight)] = datetime.now()
+        monkeypatch.setattr(store, "snapshots", lambda *args: [])
+        etag = (await client.get(url)).headers["etag"]
+
+        # 条件请求只用内存中的最近快照时间
+        monkeypatch.setattr(store, "snapshots", fail)
+        assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 304
+
+
+@pytest.mark.anyio
+async def test_batch_price_history_reads_snapshots_off_the_event_loop(monkeypatch):
+    store = fare_history_module.fare_history
+    threads = []
+
+    def snapshots(*args):
+        threads.append(threading.get_ident())
+        return []
+
+    monkeypatch.setattr(store, "_latest", {})
+    monkeypatch.setattr(store, "snapshots", snapshots)
+    flights = [fws.flight for fws in mock_flight_service._flights[:3]]
+    store._latest[fare_key(flights[1])] = datetime.now()
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/v1/flights/batch", params={"include": "priceHistory"}, json={"ids": [f.id for f in flights]}
+        )
+
+    assert response.status_code == 200
+    assert all(item["priceHistory"]["points"] for item in response.json()["flights"])
+    assert threads and threading.get_ident() not in threads
@@ -0,0 +1,158 @@
+"""
+AirEase Backend Tests
+中转行程构建
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Flight, FlightWithScore
+from app.services.amadeus_service import amadeus_service
+from app.services.itinerary_service import pareto_front
+from app.services.mock_service import MockFlightService, mock_flight_service
+
+DAY = datetime(2026, 11, 1)
+
+
+def _leg(flight_id: str, origin: str, destination: str, departs: str, minutes: int, price: float,
+         score: float = 8.0) -> FlightWithScore:
+    """DAY 当天 departs（HH:MM）起飞的经济舱直飞航段"""
+    service = MockFlightService.__new__(MockFlightService)
+    departure = datetime.combine(DAY.date(), datetime.strptime(departs, "%H:%M").time())
+    flight = Flight(
+        id=flight_id, flightNumber="CA1234", airline="中国国航", airlineCode="CA",
+        departureCity=origin, departureCityCode=origin, departureAirport=origin,
+        departureAirportCode=origin, departureTime=departure,
+        arrivalCity=destination, arrivalCityCode=destination, arrivalAirport=destination,
+        arrivalAirportCode=destination, arrivalTime=departure + timedelta(minutes=minutes),
+        durationMinutes=minutes, stops=0, cabin="经济舱", price=price, currency="CNY"
+    )
+    scored = service._generate_score(flight)
+    scored.overall_score = score
+    return FlightWithScore(flight=flight, score=scored, facilities=service._generate_facilities("经济舱"))
+
+
+def _service(*legs: FlightWithScore) -> MockFlightService:
+    service = MockFlightService()
+    service.replace_inventory(list(legs))
+    return service
+
+
+def test_pareto_front_drops_dominated_items():
+    items = [(1, 5, 0), (2, 2, 0), (3, 3, 0), (1, 5, 1), (4, 1, 0)]
+    assert pareto_front(items, key=lambda item: item) == [(1, 5, 0), (2, 2, 0), (4, 1, 0)]
+
+
+def test_connections_respect_minimum_connection_time():
+    service = _service(
+        _leg("a", "CAN", "WUH", "08:00", 90, 500),
+        _leg("too-tight", "WUH", "SHA", "09:50", 90, 300),   # 衔接20分钟
+        _leg("ok", "WUH", "SHA", "10:30", 90, 400),          # 衔接60分钟
+        _leg("too-late", "WUH", "SHA", "20:00", 90, 100),    # 衔接10.5小时
+    )
+
+    itineraries = service.search_itineraries("广州", "虹桥", "2026-11-01")
+
+    assert [i.id for i in itineraries] == ["a+ok"]
+    itinerary = itineraries[0]
+    assert itinerary.stops == 1
+    assert itinerary.connection_airports == ["WUH"]
+    assert itinerary.layover_minutes == [60]
+    assert itinerary.total_price == 900
+    assert itinerary.total_duration_minutes == 240
+
+
+def test_results_are_pareto_optimal_across_direct_and_connecting():
+    service = _service(
+        _leg("direct", "CAN", "SHA", "08:00", 130, 1500, score=7.0),
+        _leg("slow-direct", "CAN", "SHA", "09:00", 200, 1600, score=6.0),
+        _leg("first", "CAN", "WUH", "07:00", 90, 400, score=8.0),
+        _leg("second", "WUH", "SHA", "09:30", 90, 400, score=8.0),
+    )
+
+    ids = {i.id for i in service.search_itineraries("广州", "虹桥", "2026-11-01")}
+    # 慢且贵的直飞被支配；中转更便宜但更慢，与快速直飞互不支配
+    assert ids == {"direct", "first+second"}
+
+    direct_only = service.search_itineraries("广州", "虹桥", "2026-11-01", max_stops=0)
+    assert [i.id for i in direct_only] == ["direct"]
+
+
+def test_search_matches_exhaustive_enumeration():
+    service = MockFlightService()
+    inventory = service.generate_synthetic_inventory(3000, seed=7, days=1)
+    service.replace_inventory(inventory)
+    date = inventory[0].flight.departure_time.strftime("%Y-%m-%d")
+    rng = random.Random(7)
+    pairs = rng.sample([(f.flight.departure_city, f.flight.arrival_city) for f in inventory], 5)
+
+    def key(segments):
+        return (
+            sum(s.flight.price for s in segments),
+            (segments[-1].flight.arrival_time - segments[0].flight.departure_time).total_seconds(),
+            -sum(s.score.overall_score for s in segments) / len(segments),
+        )
+
+    economy = [f for f in inventory if f.flight.cabin == "经济舱"]
+    for from_city, to_city in pairs:
+        candidates = [(f,) for f in economy
+                      if f.flight.departure_city == from_city and f.flight.arrival_city == to_city]
+        for first in economy:
+            if first.flight.departure_city != from_city or first.flight.arrival_city in (from_city, to_city):
+                continue
+            for second in economy:
+                layover = second.flight.departure_time - first.flight.arrival_time
+                if (second.flight.departure_airport_code == first.flight.arrival_airport_code
+                        and second.flight.arrival_city == to_city
+                        and timedelta(minutes=45) <= layover <= timedelta(minutes=360)):
+                    candidates.append((first, second))
+        expected = sorted(key(c) for c in pareto_front(candidates, key))
+
+        by_id = {f.flight.id: f for f in inventory}
+        found = service.search_itineraries(from_city, to_city, date, limit=10 ** 6)
+        assert sorted(key([by_id[i] for i in it.id.split("+")]) for it in found) == expected
+
+
+def test_amadeus_transform_reads_all_segments():
+    payload = {"data": [{
+        "id": "1",
+        "price": {"total": "980.00"},
+        "itineraries": [{"segments": [
+            {"departure": {"iataCode": "CAN", "at": "2026-11-01T08:00:00"},
+             "arrival": {"iataCode": "WUH", "at": "2026-11-01T09:30:00"},
+             "carrierCode": "CZ", "number": "3301"},
+            {"departure": {"iataCode": "WUH", "at": "2026-11-01T10:30:00"},
+             "arrival": {"iataCode": "SHA", "at": "2026-11-01T12:00:00"},
+             "carrierCode": "CZ", "number": "3302"},
+        ]}]
+    }]}
+
+    flight = amadeus_service._transform_amadeus_response(payload, "广州", "上海", "经济舱")[0].flight
+
+    assert flight.departure_airport_code == "CAN"
+    assert flight.arrival_airport_code == "SHA"
+    assert flight.duration_minutes == 240
+    assert flight.stops == 1
+    assert flight.stop_cities == ["武汉"]
+
+
+@pytest.mark.anyio
+async def test_itineraries_endpoint(client):
+    flight = mock_flight_service._flights[0].flight
+    response = await client.get("/v1/flights/itineraries", params={
+        "from": flight.departure_city,
+        "to": flight.arrival_city,
+        "date": flight.departure_time.strftime("%Y-%m-%d"),
+        "cabin": flight.cabin,
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == len(data["itineraries"]) > 0
+    assert {"segments", "totalPrice", "layoverMinutes"} <= data["itineraries"][0].keys()
+
+    response = await client.get(
+        "/v1/flights/itineraries", params={"from": "北京", "to": "上海", "date": "2026/11/01"}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,147 @@
+"""
+AirEase Backend Tests
+实时价格推送（WebSocket 发布订阅）
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.database import Base
+from app.main import app
+from app.services.fare_history import FareHistoryStore
+from app.services.fare_ingestion import FareIngestionJob
+from app.services.live_prices import LiveHub, flight_topic, route_topic
+from app.services.mock_service import mock_flight_service
+
+
+@pytest.mark.anyio
+async def test_hub_fans_out_once_per_subscriber():
+    hub = LiveHub(queue_size=4, max_topics=10)
+    flight = mock_flight_service._flights[0].flight
+    both = hub.connect()
+    other = hub.connect()
+    hub.subscribe(both, [flight_topic(flight.id), route_topic(flight.departure_airport_code, flight.arrival_airport_code)])
+    hub.subscribe(other, [flight_topic("flight-unrelated")])
+
+    hub.publish_flight(flight, version=1)
+
+    assert both.queue.qsize() == 1
+    assert other.queue.empty()
+    assert '"flightId": "%s"' % flight.id in await both.next_message()
+
+    hub.disconnect(both)
+    hub.disconnect(other)
+    assert hub.stats() == {"connections": 0, "topics": 0}
+
+
+@pytest.mark.anyio
+async def test_hub_drops_slow_consumer_without_blocking_others():
+    hub = LiveHub(queue_size=2, max_topics=10)
+    flight = mock_flight_service._flights[0].flight
+    slow = hub.connect()
+    fast = hub.connect()
+    hub.subscribe(slow, [flight_topic(flight.id)])
+    hub.subscribe(fast, [flight_topic(flight.id)])
+
+    for version in range(3):
+        hub.publish_flight(flight, version)
+        await fast.next_message()
+
+    assert slow.dropped
+    assert await slow.next_message() is None
+    assert hub.stats()["connections"] == 1
+
+    with pytest.raises(ValueError):
+        hub.subscribe(fast, [flight_topic(f"flight-{i}") for i in range(11)])
+
+
+def test_websocket_pushes_price_and_seat_changes():
+    flight = mock_flight_service._flights[8].flight
+    route = f"{flight.departure_airport_code}-{flight.arrival_airport_code}"
+    client = TestClient(app)
+    with client.websocket_connect("/v1/flights/live") as ws:
+        ws.send_json({"action": "subscribe", "flightIds": [flight.id, "flight-missing"], "routes": [route]})
+        ack = ws.receive_json()
+        assert ack["type"] == "subscribed"
+        assert flight_topic(flight.id) in ack["topics"]
+        assert ack["flights"][0]["price"] == flight.price
+        assert ack["missing"] == ["flight-missing"]
+
+        mock_flight_service.update_flight(flight.id, seats_remaining=flight.seats_remaining + 1)
+        pushed = ws.receive_json()
+        assert pushed["type"] == "price"
+        assert pushed["flightId"] == flight.id
+        assert pushed["seatsRemaining"] == flight.seats_remaining
+
+        ws.send_json({"action": "refresh"})
+        assert ws.receive_json()["type"] == "error"
+
+        ws.send_json({"action": "unsubscribe", "flightIds": [flight.id], "routes": [route]})
+        assert ws.receive_json() == {"type": "unsubscribed", "topics": []}
+
+
+def test_websocket_rejects_malformed_payloads_without_closing():
+    client = TestClient(app)
+    with client.websocket_connect("/v1/flights/live") as ws:
+        for payload in ('{"action": "subscribe", "flightIds": 42}', '{"action": "subscribe", "routes": [1]}', "[]", "not json"):
+            ws.send_text(payload)
+            assert ws.receive_json()["type"] == "error"
+
+        ws.send_json({"action": "subscribe", "flightIds": []})
+        assert ws.receive_json()["type"] == "subscribed"
+
+
+def test_websocket_closes_binary_frames_with_1003():
+    client = TestClient(app)
+    with client.websocket_connect("/v1/flights/live") as ws:
+        ws.send_bytes(b'{"action": "subscribe"}')
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 1003
+
+
+class PricedSource:
+    """每次采集返回同一航线市场的两个报价，价格由测试设置"""
+
+    def __init__(self, flight):
+        self.flight = flight
+        self.prices = (0.0, 0.0)
+
+    async def search_flights(self, from_city, to_city, date, cabin):
+        return [
+            SimpleNamespace(flight=self.flight.model_copy(update={"flight_number": f"MU{5100 + i}", "price": price}))
+            for i, price in enumerate(self.prices)
+        ]
+
+
+def test_fare_ingestion_pushes_market_price_changes(tmp_path):
+    flight = mock_flight_service._flights[5].flight
+    route = f"{flight.departure_airport_code}-{flight.arrival_airport_code}"
+    engine = create_engine(f"sqlite:///{tmp_path / 'fares.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    source = PricedSource(flight)
+    job = FareIngestionJob(
+        source, FareHistoryStore(engine, batch_size=10),
+        [(flight.departure_airport_code, flight.arrival_airport_code)], [flight.cabin], 1, 60, 1
+    )
+    client = TestClient(app)
+    with client.websocket_connect("/v1/flights/live") as ws:
+        ws.send_json({"action": "subscribe", "routes": [route]})
+        assert ws.receive_json()["type"] == "subscribed"
+
+        # 第二轮最低价不变，不推送
+        for prices in ((900.0, 760.0), (880.0, 760.0), (700.0, 820.0)):
+            source.prices = prices
+            asyncio.run(job.run_once(today=flight.departure_time.date()))
+
+        first, second = ws.receive_json(), ws.receive_json()
+
+    assert first["type"] == "fare"
+    assert first["route"] == route
+    assert first["date"] == flight.departure_time.strftime("%Y-%m-%d")
+    assert (first["lowestPrice"], second["lowestPrice"]) == (760.0, 700.0)
@@ -0,0 +1,58 @@
+"""
+AirEase Backend Tests
+城市/机场解析索引
+"""
+
+from app.services.location_index import location_index
+from app.services.mock_service import mock_flight_service
+from app.services.query_parser import query_parser
+
+
+def _resolved(text):
+    location = location_index.resolve(text)
+    if location is None:
+        return None
+    return location.city.name, location.airport.code if location.airport else None
+
+
+def test_exact_lookup_across_name_kinds():
+    assert _resolved("北京") == ("北京", None)
+    assert _resolved("北京市") == ("北京", None)
+    assert _resolved("BJS") == ("北京", None)
+    assert _resolved("beijing") == ("北京", None)
+    assert _resolved("Peking") == ("北京", None)
+    assert _resolved("Xi'an") == ("西安", None)
+    assert _resolved("pvg") == ("上海", "PVG")
+    assert _resolved("浦东") == ("上海", "PVG")
+    # SHA 既是城市代码也是虹桥机场代码，按机场解析
+    assert _resolved("SHA") == ("上海", "SHA")
+
+
+def test_prefix_and_typo_tolerant_lookup():
+    assert _resolved("Shanghia") == ("上海", None)
+    assert _resolved("beijng") == ("北京", None)
+    assert _resolved("zhengzou") == ("郑州", None)
+    assert _resolved("火星") is None
+    assert {loc.city.name for loc in location_index.prefix("sh")} == {"上海", "深圳", "沈阳"}
+    assert {loc.city.name for loc in location_index.prefix("上")} == {"上海"}
+
+
+def test_search_does_not_guess_from_prefixes():
+    """Prefixes are for autocomplete only; searching them must not hit another city's route"""
+    assert _resolved("上") is None
+    assert _resolved("dali") is None
+    assert _resolved("上海虹") is None
+    assert mock_flight_service.search_flights("上", "北京", "", "economy") == []
+    assert mock_flight_service.search_flights("北京", "dali", "", "economy") == []
+
+
+def test_services_share_resolution():
+    parsed = query_parser.parse("明天从beijing飞Shanghai的公务舱")["parsed_query"]
+    assert (parsed["from"], parsed["to"]) == ("北京", "上海")
+
+    by_name = mock_flight_service.search_flights("北京", "上海", "", "economy")
+    by_pinyin = mock_flight_service.search_flights("beijing", "shanghai", "", "economy")
+    assert [f.flight.id for f in by_name] == [f.flight.id for f in by_pinyin]
+
+    pudong = mock_flight_service.search_flights("北京", "PVG", "", "economy")
+    assert all(f.flight.arrival_airport_code == "PVG" for f in pudong)
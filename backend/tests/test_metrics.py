@@ -0,0 +1,54 @@
+"""
+AirEase Backend Tests
+指标测试
+"""
+
+import pytest
+from httpx import AsyncClient
+
+from app.metrics import Histogram, MetricsRegistry, http_request_duration
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "test", labels=("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+
+
+def test_duplicate_metric_names_rejected():
+    registry = MetricsRegistry()
+    registry.counter("x_total", "test")
+    with pytest.raises(ValueError):
+        registry.counter("x_total", "test")
+
+
+@pytest.mark.anyio
+async def test_requests_recorded_by_route_template(client: AsyncClient):
+    """Path parameters collapse into the route template"""
+    before = http_request_duration.count("GET", "/v1/flights/{flight_id}", "404")
+    await client.get("/v1/flights/nonexistent-1")
+    await client.get("/v1/flights/nonexistent-2")
+    assert http_request_duration.count("GET", "/v1/flights/{flight_id}", "404") == before + 2
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint(client: AsyncClient):
+    await client.get("/health")
+    await client.post("/v1/ai/search", json={"query": "明天北京到上海"})
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'airease_http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+    assert 'airease_cache_requests_total{cache="ai_local_parse",result="hit"}' in body
+    assert "airease_http_requests_in_flight" in body
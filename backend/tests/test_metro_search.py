@@ -0,0 +1,59 @@
+"""
+AirEase Backend Tests
+城市群多机场搜索展开
+"""
+
+import time
+
+import httpx
+import pytest
+
+from app.services.amadeus_service import amadeus_service
+from app.services.location_index import location_index
+from app.services.mock_service import mock_flight_service
+from app.services.resilience import CircuitBreaker, amadeus_policy
+from tests.stubs import FakeAmadeus, serve
+
+
+def test_airport_pairs_expand_metro_areas():
+    assert set(location_index.airport_pairs("上海", "北京")) == {
+        ("SHA", "PEK"), ("SHA", "PKX"), ("PVG", "PEK"), ("PVG", "PKX")
+    }
+    assert location_index.airport_pairs("浦东", "北京") == [("PVG", "PEK"), ("PVG", "PKX")]
+    assert location_index.airport_pairs("XYZ", "SHA") == [("XYZ", "SHA")]
+
+
+def test_mock_search_covers_all_airports_sorted():
+    results = mock_flight_service.search_flights("北京", "上海", "", "economy")
+    expected = [
+        f for f in mock_flight_service._flights
+        if f.flight.departure_city == "北京" and f.flight.arrival_city == "上海"
+        and f.flight.cabin == "经济舱"
+    ]
+
+    assert {f.flight.id for f in results} == {f.flight.id for f in expected}
+    times = [f.flight.departure_time for f in results]
+    assert times == sorted(times)
+
+
+@pytest.mark.anyio
+async def test_amadeus_search_fans_out_concurrently(monkeypatch):
+    stub = FakeAmadeus(offers=3, delay=0.2)
+    with serve(stub.app) as base_url:
+        monkeypatch.setattr(amadeus_service, "base_url", base_url)
+        monkeypatch.setattr(amadeus_service, "client", httpx.AsyncClient())
+        monkeypatch.setattr(amadeus_service, "access_token", None)
+        monkeypatch.setattr(amadeus_policy, "breaker", CircuitBreaker("amadeus-test"))
+
+        start = time.perf_counter()
+        results = await amadeus_service.search_flights("上海", "北京", "2026-11-01")
+        elapsed = time.perf_counter() - start
+        await amadeus_service.client.aclose()
+
+    pairs = {(s["originLocationCode"], s["destinationLocationCode"]) for s in stub.searches}
+    assert pairs == {("SHA", "PEK"), ("SHA", "PKX"), ("PVG", "PEK"), ("PVG", "PKX")}
+    assert elapsed < 0.2 * 4
+    assert len(results) == 12
+    assert len({f.flight.id for f in results}) == 12
+    times = [f.flight.departure_time for f in results]
+    assert times == sorted(times)
@@ -0,0 +1,58 @@
+"""
+AirEase Backend Tests
+单请求性能剖析测试
+"""
+
+import pstats
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app as main_app
+from app.middleware.profiling import ProfilingMiddleware
+from app.routes.flights import router as flights_router
+
+
+@pytest.fixture
+async def client(tmp_path):
+    app = FastAPI()
+    app.include_router(flights_router)
+    app.add_middleware(ProfilingMiddleware, secret="s3cret", profile_dir=str(tmp_path))
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+
+SEARCH = {"from": "北京", "to": "上海", "date": "2025-01-15"}
+
+
+@pytest.mark.anyio
+async def test_cprofile_mode_writes_pstats(client: AsyncClient):
+    response = await client.get("/v1/flights/search", params=SEARCH, headers={"X-Profile": "s3cret"})
+    assert response.status_code == 200
+    path = response.headers["x-profile-path"]
+    assert path.endswith(".pstats")
+    stats = pstats.Stats(path)
+    assert any(func[2] == "search_flights" for func in stats.stats)
+
+
+@pytest.mark.anyio
+async def test_sampling_mode_writes_collapsed_stacks(client: AsyncClient):
+    response = await client.get(
+        "/v1/flights/search", params=SEARCH,
+        headers={"X-Profile": "s3cret", "X-Profile-Mode": "sampling"}
+    )
+    assert response.status_code == 200
+    assert response.headers["x-profile-path"].endswith(".collapsed")
+
+
+@pytest.mark.anyio
+async def test_wrong_secret_is_not_profiled(client: AsyncClient):
+    response = await client.get("/v1/flights/search", params=SEARCH, headers={"X-Profile": "guess"})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_not_registered_without_secret():
+    """Default settings leave the middleware out of the stack entirely"""
+    assert all(m.cls is not ProfilingMiddleware for m in main_app.user_middleware)
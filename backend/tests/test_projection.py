@@ -0,0 +1,88 @@
+"""
+AirEase Backend Tests
+稀疏字段集
+"""
+
+import pytest
+from httpx import AsyncClient
+
+from app.models import FlightDetail, FlightWithScore
+from app.projection import compile_fields
+from app.services.auth_service import auth_service
+from app.services.mock_service import mock_flight_service
+
+
+def test_projection_matches_full_serialization():
+    fws = mock_flight_service._flights[0]
+    full = fws.model_dump(mode="json", by_alias=True)
+
+    projection = compile_fields("flight.price,flight.departureTime,score.overallScore,facilities", FlightWithScore)
+
+    assert projection.apply(fws) == {
+        "flight": {"price": full["flight"]["price"], "departureTime": full["flight"]["departureTime"]},
+        "score": {"overallScore": full["score"]["overallScore"]},
+        "facilities": full["facilities"],
+    }
+    assert compile_fields("flight.price,flight.departureTime,score.overallScore,facilities",
+                          FlightWithScore) is projection
+
+
+def test_projection_into_lists_and_whole_fields():
+    fws = mock_flight_service._flights[0]
+    projection = compile_fields("score.explanations.title,flight.price,flight", FlightWithScore)
+    result = projection.apply(fws)
+
+    assert result["flight"] == fws.flight.model_dump(mode="json", by_alias=True)
+    assert result["score"]["explanations"] == [{"title": e.title} for e in fws.score.explanations]
+
+
+def test_list_profile_drops_explanations():
+    result = compile_fields("list", FlightWithScore).apply(mock_flight_service._flights[0])
+
+    assert "explanations" not in result["score"]
+    assert {"price", "departureTime", "flightNumber"} <= result["flight"].keys()
+
+
+@pytest.mark.parametrize("spec", ["flight.nope", "flight.price.amount", "", "bogus"])
+def test_invalid_fields_are_rejected(spec):
+    with pytest.raises(ValueError):
+        compile_fields(spec, FlightWithScore)
+
+
+@pytest.mark.anyio
+async def test_search_and_detail_honor_fields(client: AsyncClient):
+    flight = mock_flight_service._flights[0].flight
+    token, _ = auth_service.create_access_token(user_id=1, email="fields@airease.dev")
+    params = {
+        "from": flight.departure_city,
+        "to": flight.arrival_city,
+        "date": flight.departure_time.strftime("%Y-%m-%d"),
+        "cabin": flight.cabin,
+    }
+    headers = {"Authorization": f"Bearer {token}"}
+
+    full = await client.get("/v1/flights/search", params=params, headers=headers)
+    lean = await client.get("/v1/flights/search", params={**params, "fields": "list"}, headers=headers)
+    assert lean.status_code == 200
+    assert lean.json()["meta"]["total"] == full.json()["meta"]["total"]
+    assert len(lean.content) * 2 < len(full.content)
+
+    response = await client.get("/v1/flights/search", params={**params, "fields": "flight.nope"})
+    assert response.status_code == 400
+
+    response = await client.get(f"/v1/flights/{flight.id}", params={"fields": "flight.price,priceHistory.trend"})
+    assert response.json() == {
+        "flight": {"price": flight.price},
+        "priceHistory": {"trend": response.json()["priceHistory"]["trend"]},
+    }
+    response = await client.get(f"/v1/flights/{flight.id}", params={"fields": "score.overallScore"})
+    assert response.json() == {"score": {"overallScore": mock_flight_service._flights[0].score.overall_score}}
+
+    response = await client.post(
+        "/v1/flights/batch", params={"fields": "flight.id"}, json={"ids": [flight.id, "nonexistent-flight"]}
+    )
+    assert response.json() == {"flights": [{"flight": {"id": flight.id}}], "missing": ["nonexistent-flight"]}
+
+
+def test_detail_projection_compiles_against_detail_model():
+    assert "priceHistory" in compile_fields("priceHistory", FlightDetail).keys
@@ -0,0 +1,82 @@
+"""
+AirEase Backend Tests
+近似查询索引测试
+"""
+
+from datetime import date
+
+from app.services.query_index import QuerySimilarityIndex
+
+TODAY = date(2026, 10, 19)
+
+PARSED = {
+    "parsed_query": {"from": "北京", "to": "上海", "date": "2026-10-20", "cabin": "economy"},
+    "confidence": 0.9,
+    "original_query": "北京飞上海明天",
+    "suggestions": []
+}
+
+
+def test_paraphrase_reuses_cached_result():
+    """Reordered wording with the same entities hits the index"""
+    index = QuerySimilarityIndex()
+    index.add("北京飞上海明天", PARSED, today=TODAY)
+
+    result = index.lookup("明天从北京去上海", today=TODAY)
+    assert result is not None
+    assert result["parsed_query"] == PARSED["parsed_query"]
+    assert result["original_query"] == "明天从北京去上海"
+    assert index.hits == 1
+
+
+def test_different_entities_never_match():
+    """Reversed direction or different date must miss"""
+    index = QuerySimilarityIndex()
+    index.add("北京飞上海明天", PARSED, today=TODAY)
+
+    assert index.lookup("明天上海飞北京", today=TODAY) is None
+    assert index.lookup("后天北京飞上海", today=TODAY) is None
+
+
+def test_unknown_destination_is_not_reused():
+    """Place names outside the local dictionary must match literally"""
+    index = QuerySimilarityIndex()
+    lijiang = {
+        **PARSED,
+        "parsed_query": {"from": "北京", "to": "丽江", "date": "2026-10-20", "cabin": "economy"},
+    }
+    index.add("我想订一张明天从北京出发去丽江的经济舱机票", lijiang, today=TODAY)
+
+    assert index.lookup("我想订一张明天从北京出发去大理的经济舱机票", today=TODAY) is None
+    assert index.lookup("我想订一张明天从北京出发去桂林的经济舱机票", today=TODAY) is None
+    result = index.lookup("明天从北京出发去丽江，想订一张经济舱机票", today=TODAY)
+    assert result is not None and result["parsed_query"]["to"] == "丽江"
+
+
+def test_case_folding_keeps_offsets():
+    """ß / ﬃ lengthen under str.upper/lower; features must not index past the query"""
+    index = QuerySimilarityIndex()
+    index.add("北京到上海ß明天", PARSED, today=TODAY)
+
+    assert index.lookup("ﬃ北京飞上海明天", today=TODAY) is None
+    assert index.lookup("北京到上海ß明天", today=TODAY)["parsed_query"] == PARSED["parsed_query"]
+
+
+def test_dissimilar_wording_misses():
+    """Same entities but different intent text stays below threshold"""
+    index = QuerySimilarityIndex()
+    index.add("明天北京到上海，最好便宜又舒服", PARSED, today=TODAY)
+
+    assert index.lookup("明天北京去上海 最好便宜舒服一点", today=TODAY) is not None
+    assert index.lookup("明天北京到上海，最好是晚上的航班", today=TODAY) is None
+
+
+def test_capacity_evicts_least_recently_used():
+    """Index is bounded"""
+    index = QuerySimilarityIndex(max_entries=2)
+    index.add("北京飞上海明天", PARSED, today=TODAY)
+    index.add("广州飞成都明天", PARSED, today=TODAY)
+    index.add("杭州飞武汉明天", PARSED, today=TODAY)
+
+    assert len(index) == 2
+    assert index.lookup("明天北京飞上海", today=TODAY) is None
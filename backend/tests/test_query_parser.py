@@ -0,0 +1,97 @@
+"""
+AirEase Backend Tests
+本地查询解析器测试
+"""
+
+from datetime import date
+
+from app.config import settings
+from app.services.query_parser import AhoCorasick, query_parser
+
+# 2026-10-19 是周一
+TODAY = date(2026, 10, 19)
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    """Automaton reports every dictionary hit"""
+    automaton = AhoCorasick()
+    for word in ["he", "she", "his", "hers"]:
+        automaton.add(word, word)
+    hits = sorted((start, word) for start, _, word in automaton.iter("ushers"))
+    assert hits == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_parse_relative_date_and_cabin():
+    """明天 / 公务舱 resolved locally with high confidence"""
+    result = query_parser.parse("明天北京到上海的公务舱", today=TODAY)
+    assert result["parsed_query"] == {
+        "from": "北京", "to": "上海", "date": "2026-10-20", "cabin": "business"
+    }
+    assert result["confidence"] >= 0.85
+
+
+def test_parse_weekday_grammar():
+    """周X / 下周X"""
+    assert query_parser.parse("周五北京飞上海", today=TODAY)["parsed_query"]["date"] == "2026-10-23"
+    assert query_parser.parse("下周三北京飞上海", today=TODAY)["parsed_query"]["date"] == "2026-10-28"
+
+
+def test_parse_month_day_rolls_over_year():
+    """X月X日 already past this year means next year"""
+    result = query_parser.parse("三月五号上海到成都", today=TODAY)
+    assert result["parsed_query"]["date"] == "2027-03-05"
+
+
+def test_parse_direction_markers():
+    """从/出发 override positional order"""
+    result = query_parser.parse("到上海，从北京出发", today=TODAY)
+    assert result["parsed_query"]["from"] == "北京"
+    assert result["parsed_query"]["to"] == "上海"
+
+
+def test_parse_iata_codes():
+    """IATA codes map to cities"""
+    result = query_parser.parse("PEK到PVG 2026-11-02", today=TODAY)
+    assert result["parsed_query"]["from"] == "北京"
+    assert result["parsed_query"]["to"] == "上海"
+    assert result["parsed_query"]["date"] == "2026-11-02"
+
+
+def test_parse_incomplete_query_has_zero_confidence():
+    """Missing origin cannot be answered locally"""
+    result = query_parser.parse("明天去广州的航班", today=TODAY)
+    assert result["parsed_query"] is None
+    assert result["confidence"] == 0.0
+
+
+def test_unexplained_text_lowers_confidence():
+    """Free text the grammar cannot explain is deferred to Gemini"""
+    simple = query_parser.parse("明天北京到上海", today=TODAY)["confidence"]
+    vague = query_parser.parse("明天北京到上海，最好是便宜又舒服靠窗还有餐食", today=TODAY)["confidence"]
+    assert vague < simple
+
+
+def test_case_folding_keeps_offsets():
+    """ß / ﬃ upper-case to several characters; spans must still index the original query"""
+    result = query_parser.parse("北京到上海ß明天", today=TODAY)
+    assert result["parsed_query"]["date"] == "2026-10-20"
+    assert query_parser.parse("ﬃ北京飞上海", today=TODAY)["parsed_query"]["to"] == "上海"
+
+
+def test_week_after_next_is_not_next_week():
+    """下下周五 must not be read as 下周五"""
+    result = query_parser.parse("北京到上海下下周五", today=TODAY)
+    assert result["parsed_query"]["date"] == "2026-11-06"
+    assert query_parser.parse("下下下周五北京到上海", today=TODAY)["confidence"] < settings.local_parse_threshold
+
+
+def test_negation_and_conflicting_dates_defer_to_gemini():
+    """不要明天要后天: dictionary hits alone cannot tell which date is meant"""
+    result = query_parser.parse("北京到上海不要明天要后天", today=TODAY)
+    assert result["confidence"] < settings.local_parse_threshold
+
+
+def test_missing_date_stays_below_threshold():
+    """No date means the default today+3 is a guess, not a parse"""
+    result = query_parser.parse("北京到上海", today=TODAY)
+    assert 0 < result["confidence"] < settings.local_parse_threshold
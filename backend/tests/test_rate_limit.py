@@ -0,0 +1,113 @@
+"""
+AirEase Backend Tests
+令牌桶限流测试
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app as main_app
+from app.middleware.rate_limit import (
+    InMemoryRateLimitBackend, RateLimitMiddleware, RateLimitRule, parse_rules
+)
+from app.services.auth_service import auth_service
+
+
+def make_client(rules: str, backend=None) -> AsyncClient:
+    app = FastAPI()
+
+    @app.get("/v1/ai/search")
+    async def ai():
+        return {"ok": True}
+
+    @app.get("/v1/flights/search")
+    async def search():
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, rules=parse_rules(rules), backend=backend or InMemoryRateLimitBackend())
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def test_parse_rules_longest_prefix_first():
+    rules = parse_rules("/v1=20:60,/v1/ai=0.5:10")
+    assert [r.prefix for r in rules] == ["/v1/ai", "/v1"]
+    assert rules[0].rate == 0.5 and rules[0].burst == 10
+
+
+@pytest.mark.anyio
+async def test_burst_then_429_with_retry_after():
+    """Requests beyond the burst are rejected with Retry-After"""
+    async with make_client("/v1/ai=1:3") as client:
+        for remaining in (2, 1, 0):
+            response = await client.get("/v1/ai/search")
+            assert response.status_code == 200
+            assert response.headers["x-ratelimit-limit"] == "3"
+            assert response.headers["x-ratelimit-remaining"] == str(remaining)
+
+        response = await client.get("/v1/ai/search")
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+        assert response.json()["code"] == 429
+
+
+@pytest.mark.anyio
+async def test_route_groups_have_separate_buckets():
+    """Exhausting the AI group does not affect flight search; unmatched paths are exempt"""
+    async with make_client("/v1/ai=0.1:1,/v1/flights/search=10:5") as client:
+        assert (await client.get("/v1/ai/search")).status_code == 200
+        assert (await client.get("/v1/ai/search")).status_code == 429
+        assert (await client.get("/v1/flights/search")).status_code == 200
+        response = await client.get("/health")
+        assert response.status_code == 200
+        assert "x-ratelimit-limit" not in response.headers
+
+
+@pytest.mark.anyio
+async def test_authenticated_users_are_keyed_by_user_id():
+    """Each JWT user gets its own bucket regardless of IP"""
+    token_a, _ = auth_service.create_access_token(user_id=1, email="a@example.com")
+    token_b, _ = auth_service.create_access_token(user_id=2, email="b@example.com")
+    async with make_client("/v1/ai=0.1:1") as client:
+        headers_a = {"Authorization": f"Bearer {token_a}"}
+        headers_b = {"Authorization": f"Bearer {token_b}"}
+        assert (await client.get("/v1/ai/search", headers=headers_a)).status_code == 200
+        assert (await client.get("/v1/ai/search", headers=headers_a)).status_code == 429
+        assert (await client.get("/v1/ai/search", headers=headers_b)).status_code == 200
+        assert (await client.get("/v1/ai/search")).status_code == 200
+
+
+@pytest.mark.anyio
+async def test_tokens_refill_over_time():
+    async with make_client("/v1/ai=20:1") as client:
+        assert (await client.get("/v1/ai/search")).status_code == 200
+        assert (await client.get("/v1/ai/search")).status_code == 429
+        await asyncio.sleep(0.06)
+        assert (await client.get("/v1/ai/search")).status_code == 200
+
+
+@pytest.mark.anyio
+async def test_idle_full_buckets_are_evicted():
+    """Buckets that have refilled completely are swept"""
+    backend = InMemoryRateLimitBackend(shards=1, sweep_interval=0.0)
+    rule = RateLimitRule("/v1", rate=100, burst=1)
+    for i in range(50):
+        await backend.acquire(f"ip:{i}", rule)
+    await asyncio.sleep(0.02)
+    await backend.acquire("ip:new", rule)
+    assert len(backend) == 1
+
+
+@pytest.mark.anyio
+async def test_main_app_sends_rate_limit_headers():
+    transport = ASGITransport(app=main_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/v1/ai/health")
+    assert response.status_code == 200
+    assert "x-ratelimit-remaining" in response.headers
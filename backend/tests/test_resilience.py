@@ -0,0 +1,116 @@
+"""
+AirEase Backend Tests
+熔断器、对冲请求与延迟预算测试
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services.amadeus_service import amadeus_service
+from app.services.resilience import (
+    CircuitBreaker, CircuitOpenError, ResiliencePolicy, amadeus_policy, latency_budget
+)
+
+
+def make_policy(**kwargs) -> ResiliencePolicy:
+    breaker = CircuitBreaker("test", window=10, min_calls=4, open_seconds=0.1, slow_call_ms=100)
+    return ResiliencePolicy("test", timeout_ms=kwargs.pop("timeout_ms", 1000), breaker=breaker, **kwargs)
+
+
+async def ok():
+    return "ok"
+
+
+async def boom():
+    raise httpx.ConnectError("down")
+
+
+@pytest.mark.anyio
+async def test_breaker_opens_on_errors_and_recovers():
+    """Errors open the circuit; a successful probe closes it again"""
+    policy = make_policy()
+    for _ in range(4):
+        with pytest.raises(httpx.ConnectError):
+            await policy.call(boom)
+    assert policy.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await policy.call(ok)
+
+    await asyncio.sleep(0.12)
+    assert policy.breaker.state == CircuitBreaker.HALF_OPEN
+    assert await policy.call(ok) == "ok"
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.anyio
+async def test_breaker_opens_on_slow_calls():
+    """Latency alone can trip the breaker"""
+    policy = make_policy()
+
+    async def slow():
+        await asyncio.sleep(0.11)
+        return "ok"
+
+    for _ in range(4):
+        await policy.call(slow)
+    assert policy.breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.anyio
+async def test_request_budget_caps_call_deadline():
+    """The per-call deadline never exceeds the remaining request budget"""
+    policy = make_policy(timeout_ms=5000)
+
+    async def hang():
+        await asyncio.sleep(5)
+
+    start = time.perf_counter()
+    with latency_budget(0.1):
+        with pytest.raises(asyncio.TimeoutError):
+            await policy.call(hang)
+    assert time.perf_counter() - start < 0.5
+
+
+@pytest.mark.anyio
+async def test_hedged_request_wins_over_slow_primary():
+    """A duplicate request is sent after the p95 delay and the first success wins"""
+    policy = make_policy(hedge=True, hedge_min_delay_ms=10)
+    for _ in range(policy.latency.min_samples):
+        policy.latency.add(0.02)
+
+    attempts = []
+
+    async def sometimes_slow():
+        attempts.append(1)
+        if len(attempts) == 1:
+            await asyncio.sleep(1)
+            return "slow"
+        return "fast"
+
+    start = time.perf_counter()
+    assert await policy.call(sometimes_slow) == "fast"
+    assert time.perf_counter() - start < 0.5
+    assert policy.hedged_calls == 1
+
+
+@pytest.mark.anyio
+async def test_amadeus_brownout_returns_empty_within_budget(monkeypatch):
+    """A hanging Amadeus returns the empty-list path instead of waiting 30s"""
+    async def hanging(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={})
+
+    monkeypatch.setattr(amadeus_service, "access_token", None)
+    monkeypatch.setattr(amadeus_policy, "breaker", CircuitBreaker("amadeus-test"))
+
+    start = time.perf_counter()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(hanging)) as client:
+        monkeypatch.setattr(amadeus_service, "client", client)
+        with latency_budget(0.2):
+            results = await amadeus_service.search_flights("北京", "上海", "2026-11-01")
+    assert results == []
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,144 @@
+"""
+AirEase Backend Tests
+搜索结果快照与增量搜索（since=searchId）
+"""
+
+import pytest
+
+from app.services.auth_service import auth_service
+from app.services.mock_service import MockFlightService, mock_flight_service
+from app.services.search_snapshots import SearchSnapshotStore, search_snapshots
+
+
+def test_snapshot_diff_reports_added_removed_and_changed():
+    flights = MockFlightService().generate_synthetic_inventory(5, seed=7)
+    store = SearchSnapshotStore(max_entries=4)
+    snapshot = store.create(("q",), version=1, total=4, flights=flights[:4])
+
+    flights[1].flight.price += 100
+    added, removed, changed = snapshot.diff(flights[1:])
+
+    assert [fws.flight.id for fws in added] == [flights[4].flight.id]
+    assert removed == [flights[0].flight.id]
+    assert [(c.id, c.price) for c in changed] == [(flights[1].flight.id, flights[1].flight.price)]
+
+
+def test_snapshot_diff_allows_unknown_seats():
+    flights = MockFlightService().generate_synthetic_inventory(1, seed=3)
+    snapshot = SearchSnapshotStore(max_entries=1).create("q", 1, 1, flights)
+
+    flights[0].flight.seats_remaining = None
+    _, _, changed = snapshot.diff(flights)
+
+    assert changed[0].seats_remaining is None
+
+
+def test_snapshot_store_evicts_least_recently_used():
+    store = SearchSnapshotStore(max_entries=2)
+    a = store.create("a", 1, 0, [])
+    b = store.create("b", 1, 0, [])
+    assert store.touch(a.search_id)
+    store.create("c", 1, 0, [])
+
+    assert store.get(b.search_id) is None
+    assert not store.touch(b.search_id)
+    assert store.get(a.search_id) is a
+    assert len(store) == 2
+
+
+@pytest.mark.anyio
+async def test_since_returns_only_price_and_seat_changes(client):
+    flight = mock_flight_service._flights[5].flight
+    params = {
+        "from": flight.departure_city,
+        "to": flight.arrival_city,
+        "date": flight.departure_time.strftime("%Y-%m-%d"),
+        "cabin": flight.cabin,
+    }
+    token, _ = auth_service.create_access_token(user_id=1, email="delta@airease.dev")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    full = await client.get("/v1/flights/search", params=params, headers=headers)
+    search_id = full.json()["meta"]["searchId"]
+    assert flight.id in [f["flight"]["id"] for f in full.json()["flights"]]
+
+    # 没有变化：空增量，沿用原 searchId
+    unchanged = await client.get("/v1/flights/search", params={**params, "since": search_id}, headers=headers)
+    body = unchanged.json()
+    assert (body["since"], body["added"], body["removed"], body["changed"]) == (search_id, [], [], [])
+    assert body["meta"]["searchId"] == search_id
+
+    mock_flight_service.update_flight(flight.id, price=flight.price + 50)
+    delta = await client.get("/v1/flights/search", params={**params, "since": search_id}, headers=headers)
+    body = delta.json()
+    assert body["changed"] == [
+        {"id": flight.id, "price": flight.price, "seatsRemaining": flight.seats_remaining}
+    ]
+    assert body["added"] == [] and body["removed"] == []
+    assert body["meta"]["searchId"] != search_id
+    assert len(delta.content) < len(full.content)
+
+    chained = await client.get(
+        "/v1/flights/search", params={**params, "since": body["meta"]["searchId"]}, headers=headers
+    )
+    assert chained.json()["changed"] == []
+
+
+@pytest.mark.anyio
+async def test_since_rejects_expired_or_mismatched_search(client):
+    flight = mock_flight_service._flights[6].flight
+    params = {
+        "from": flight.departure_city,
+        "to": flight.arrival_city,
+        "date": flight.departure_time.strftime("%Y-%m-%d"),
+        "cabin": flight.cabin,
+    }
+    expired = await client.get("/v1/flights/search", params={**params, "since": "search-unknown"})
+    assert expired.status_code == 410
+
+    search_id = (await client.get("/v1/flights/search", params=params)).json()["meta"]["searchId"]
+    assert search_snapshots.get(search_id) is not None
+    mismatched = await client.get("/v1/flights/search", params={**params, "flexDays": 1, "since": search_id})
+    assert mismatched.status_code == 400
+
+
+def _params(flight):
+    return {
+        "from": flight.departure_city,
+        "to": flight.arrival_city,
+        "date": flight.departure_time.strftime("%Y-%m-%d"),
+        "cabin": flight.cabin,
+    }
+
+
+@pytest.mark.anyio
+async def test_unchanged_polls_do_not_create_snapshots(client):
+    flight = mock_flight_service._flights[10].flight
+    params = _params(flight)
+    search_id = (await client.get("/v1/flights/search", params=params)).json()["meta"]["searchId"]
+    before = len(search_snapshots)
+
+    for _ in range(5):
+        # 无关航班的变化使库存版本递增，但本次搜索结果不变
+        other = next(
+            f.flight for f in mock_flight_service._flights
+            if f.flight.departure_city != flight.departure_city
+        )
+        mock_flight_service.update_flight(other.id, price=other.price + 1)
+        delta = await client.get("/v1/flights/search", params={**params, "since": search_id})
+        assert delta.json()["meta"]["searchId"] == search_id
+
+    assert len(search_snapshots) == before
+
+
+@pytest.mark.anyio
+async def test_cache_hit_with_evicted_snapshot_issues_live_search_id(client):
+    flight = mock_flight_service._flights[11].flight
+    params = _params(flight)
+    first = (await client.get("/v1/flights/search", params=params)).json()["meta"]["searchId"]
+    search_snapshots.clear()
+
+    second = (await client.get("/v1/flights/search", params=params)).json()["meta"]["searchId"]
+    assert second != first
+    delta = await client.get("/v1/flights/search", params={**params, "since": second})
+    assert delta.status_code == 200
@@ -0,0 +1,103 @@
+"""
+AirEase Backend Tests
+流式AI评分解释测试（本地 Gemini 桩服务）
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.main import app
+from app.services.gemini_service import gemini_service
+from tests.stubs import FakeGemini, serve
+
+
+@pytest.fixture
+async def fake_gemini(monkeypatch):
+    """Point GeminiService at a local fake streaming server"""
+    fake = FakeGemini()
+    with serve(fake.app) as base_url:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            monkeypatch.setattr(gemini_service, "base_url", base_url)
+            monkeypatch.setattr(gemini_service, "client", client)
+            gemini_service._explanation_cache.clear()
+            yield fake
+    gemini_service._explanation_cache.clear()
+
+
+def _events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.anyio
+async def test_stream_relays_chunks_then_done(fake_gemini):
+    """Chunks arrive as SSE events followed by the full reply"""
+    with serve(app) as api_url:
+        async with httpx.AsyncClient(base_url=api_url, timeout=5.0) as client:
+            response = await client.post(
+                "/v1/ai/explain/stream",
+                json={"message": "CA1234", "context": "8.5", "persona": "family"}
+            )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [e for e, _ in events] == ["chunk", "chunk", "chunk", "done"]
+    assert events[-1][1]["reply"] == "".join(fake_gemini.chunks)
+    assert fake_gemini.streams_completed == 1
+
+
+@pytest.mark.anyio
+async def test_stream_first_chunk_before_generation_finishes(fake_gemini):
+    """Time-to-first-token is well below total generation time"""
+    fake_gemini.chunk_delay = 0.2
+    loop = asyncio.get_running_loop()
+    with serve(app) as api_url:
+        async with httpx.AsyncClient(base_url=api_url, timeout=5.0) as client:
+            start = loop.time()
+            async with client.stream(
+                "POST", "/v1/ai/explain/stream", json={"message": "MU5101"}
+            ) as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("event: chunk"):
+                        first_chunk = loop.time() - start
+                        break
+    assert first_chunk < 0.2 * len(fake_gemini.chunks)
+
+
+@pytest.mark.anyio
+async def test_stream_result_is_cached(fake_gemini):
+    """A completed stream populates the explanation cache"""
+    chunks = [c async for c in gemini_service.stream_score_explanation("CZ3101", "7.0", "student")]
+    assert chunks == fake_gemini.chunks
+
+    again = await gemini_service.generate_score_explanation("CZ3101", "7.0", "student")
+    assert again == "".join(fake_gemini.chunks)
+    assert fake_gemini.requests == 1
+
+
+@pytest.mark.anyio
+async def test_client_disconnect_cancels_upstream(fake_gemini):
+    """Closing the client stream closes the upstream Gemini stream"""
+    fake_gemini.chunks = [f"第{i}段。" for i in range(20)]
+    fake_gemini.chunk_delay = 0.05
+    with serve(app) as api_url:
+        async with httpx.AsyncClient(base_url=api_url, timeout=5.0) as client:
+            async with client.stream(
+                "POST", "/v1/ai/explain/stream", json={"message": "HU7601"}
+            ) as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("event: chunk"):
+                        break
+        for _ in range(40):
+            if fake_gemini.streams_cancelled:
+                break
+            await asyncio.sleep(0.05)
+
+    assert fake_gemini.streams_cancelled == 1
+    assert fake_gemini.streams_completed == 0